@@ -1,113 +1,444 @@
-import yaml
-import os
-import user_Login as UL
-
-lager = {}  # Fyldes fra main.py når brugeren logger ind
-opskrifter = {}
-
-opskrift_mappe = r"C:\Users\oller\OneDrive\Desktop\KOD - Food saver\DB\Opskrifter"
-def load_opskrifter():
-    global opskrifter
-    opskrifter = {}
-    for fil in os.listdir(opskrift_mappe):
-        if fil.endswith(".yml"):
-            with open(os.path.join(opskrift_mappe, fil), "r", encoding="utf-8-sig") as f:
-                data = yaml.safe_load(f)
-                navn = fil.replace(".yml", "").replace("_", " ")
-                opskrifter[navn] = data
-
-def tilføj_ingredient(navn, mængde, bruger_data=None):
-    navn = navn.lower()
-    if navn in lager:
-        lager[navn] += mængde
-    else:
-        lager[navn] = mængde
-    print(f"{mængde} af {navn} er tilføjet til lageret.")
-
-    if bruger_data:
-        bruger_data["lager"] = lager
-        UL.gem_bruger(bruger_data)
-
-def slet_ingredient(navn, bruger_data=None):
-    navn = navn.lower()
-    if navn in lager:
-        del lager[navn]
-        print(f"{navn} er slettet fra lageret.")
-    else:
-        print(f"{navn} findes ikke i lageret.")
-
-    if bruger_data:
-        bruger_data["lager"] = lager
-        UL.gem_bruger(bruger_data)
-
-def vis_lager():
-    if not lager:
-        print("Dit lager er tomt.")
-    else:
-        print("Dit lager:")
-        for ing, mængde in lager.items():
-            print(f"- {ing}: {mængde}")
-
-
-
-def find_opskrifter(antal_personer=1):
-    """Find opskrifter der kan laves med lageret"""
-    if not lager:
-        print("Ingen ingredienser i lageret.\n")
-        return
-
-    load_opskrifter()
-    fundet = False
-    print(f"\nOpskrifter du kan lave til {antal_personer} person(er):")
-
-    for navn, data in opskrifter.items():
-        ingreds = data["ingredienser"]
-        mangler = {}
-        for ing, mængde in ingreds.items():
-            total_mængde = mængde * antal_personer
-            if ing not in lager or lager[ing] < total_mængde:
-                mangler[ing] = max(total_mængde - lager.get(ing, 0), 0)
-
-        if len(mangler) == 0:
-            print(f"- {navn} (du har alle ingredienser)")
-            fundet = True
-        elif 0 < len(mangler) < len(ingreds):
-            mangler_str = ", ".join(f"{k}: {v}" for k, v in mangler.items())
-            print(f"- {navn} (mangler: {mangler_str})")
-            fundet = True
-
-    if not fundet:
-        print("Ingen opskrifter kan laves med det lager, du har.\n")
-
-def tilføj_opskrift_yml():
-    """Tilføj en ny opskrift som .yml fil"""
-    navn = input("Navn på opskrift: ").strip()
-    ingred_input = input("Ingredienser med mængde (fx pasta:100, tomat:2): ").strip()
-
-    if not navn or not ingred_input:
-        print("Ugyldigt input.\n")
-        return
-
-    ingreds = {}
-    for del_str in ingred_input.split(","):
-        try:
-            ing, mængde = del_str.split(":")
-            ingreds[ing.strip().lower()] = float(mængde.strip())
-        except:
-            print(f"Fejl i input: '{del_str}' springes over.")
-
-    tid = input("Hvor lang tid tager opskriften (minutter)? ").strip()
-    beskrivelse = input("Skriv selve opskriften: ").strip()
-
-    data = {
-        "ingredienser": ingreds,
-        "tid": tid,
-        "opskrift": beskrivelse
-    }
-
-    filnavn = navn.replace(" ", "_") + ".yml"
-    filsti = os.path.join(opskrift_mappe, filnavn)
-    with open(filsti, "w", encoding="utf-8") as f:
-        yaml.dump(data, f, allow_unicode=True)
-
-    print(f"Opskrift '{navn}' er tilføjet!\n")
+import collections
+import functools
+import heapq
+import itertools
+import math
+import threading
+import katalog
+import lagring
+import enheder
+import matrix_match
+from ingrediens_parser import kanonisk_navn
+from ingrediens_match import Ordbog
+
+lager = {}  # Fyldes fra main.py når brugeren logger ind
+opskrifter = {}
+
+# Ingrediensnavne -> heltals-ID'er; navne med samme stamme ("tomat", "hakkede tomater")
+# får samme ID, og lagernavne slås op med synonymer og fuzzy-match (se ingrediens_match)
+ordbog = Ordbog()
+
+# Inverteret index, bygges når kataloget indlæses:
+# ingrediens-ID -> {opskriftsnavn: behov pr. person}
+# hvor behov er {dimension: mængde i basisenhed} (se enheder.behov), eller None hvis ukendt
+ingrediens_index = {}
+# opskriftsnavn -> {ingrediens-ID: behov pr. person}
+opskrift_krav = {}
+# opskriftsnavn -> samlet behov pr. person i basisenheder / tid i minutter (til sortering)
+opskrift_total = {}
+opskrift_tid = {}
+
+# Lagre omregnet til basisenheder, genberegnes kun når et lager eller indexet ændrer sig.
+# De senest brugte huskes, så flere brugere i samme proces (server.py) ikke skubber hinanden ud
+LAGER_CACHE_STØRRELSE = 64
+_lager_cache = collections.OrderedDict()
+
+# "python" = inverteret index, "numpy" = vektoriseret matrix,
+# "auto" = numpy hvis den er installeret og kataloget er stort nok til at det betaler sig
+MATCH_BACKEND = "auto"
+NUMPY_GRÆNSE = 20000
+# Matrixen bygges først når den skal bruges, og igen når indexet er ændret
+_index_version = 0
+_matrix = (None, None)
+
+# Holder opskrifter og index opdateret med deltaer efter første indlæsning
+_watcher = None
+# Opskrifts-bundlet i mappen; husker hvor langt hver shard er læst
+_bundle = None
+
+# GUI'en søger i en baggrundstråd, mens hovedtråden kan gemme opskrifter;
+# alt der læser eller ændrer indexet tager låsen
+indeks_lås = threading.RLock()
+
+def _låst(funktion):
+    @functools.wraps(funktion)
+    def med_lås(*args, **kwargs):
+        with indeks_lås:
+            return funktion(*args, **kwargs)
+    return med_lås
+
+opskrift_mappe = lagring.OPSKRIFT_MAPPE
+@_låst
+def load_opskrifter():
+    """
+    Indlæser opskrifter fra den valgte lagring (se lagring.BACKEND). Med YAML sker
+    det via det kompilerede katalog, så kun ændrede .yml filer parses.
+    Et opskrifts-bundle (WebScraber --format jsonl) i mappen streames ind bagefter,
+    én linje ad gangen.
+    """
+    global _watcher, _bundle
+    kilde = lagring.aktiv()
+    filer = kilde.load_opskrifter(opskrift_mappe)
+    _bundle = lagring.JsonlBundle(opskrift_mappe)
+    bundle = (post for _, post in _bundle.læs())
+    byg_index(itertools.chain(filer.values(), bundle))
+    if _watcher:
+        _watcher.luk()
+    _watcher = kilde.watcher(opskrift_mappe, filer)
+
+@_låst
+def opdater_opskrifter():
+    """
+    Anvender nye, ændrede og slettede .yml filer og nye linjer i opskrifts-bundlet
+    som deltaer (fuld indlæsning første gang)
+    """
+    if _watcher is None or _watcher.mappe != opskrift_mappe:
+        load_opskrifter()
+        return
+    ændrede, slettede = _watcher.ændringer()
+    for fil in slettede:
+        _fjern_opskrift(katalog.opskrift_navn(fil))
+    for post in itertools.chain(ændrede.values(), (post for _, post in _bundle.læs_nye())):
+        _fjern_opskrift(post[2])
+        _indekser_opskrift(post)
+
+def gem_opskrift(navn, data):
+    """Gemmer en opskrift i lagringen og tilføjer den til indexet"""
+    filnavn = navn.replace(" ", "_") + ".yml"
+    filsti = lagring.aktiv().gem_opskrift(opskrift_mappe, filnavn, data)
+    registrer_opskrift(filsti)
+    return filsti
+
+@_låst
+def registrer_opskrift(filsti):
+    """Registrerer en netop gemt opskrift uden at genindlæse hele kataloget"""
+    if _watcher is None or _watcher.mappe != opskrift_mappe:
+        load_opskrifter()
+        return
+    _, post = _watcher.registrer(filsti)
+    _fjern_opskrift(post[2])
+    _indekser_opskrift(post)
+
+def byg_index(poster):
+    """Bygger opskrifter og det inverterede ingrediens-index ud fra katalogets poster"""
+    global opskrifter, ingrediens_index, opskrift_krav, opskrift_total, opskrift_tid, ordbog, _index_version
+    _index_version += 1
+    ordbog = Ordbog()
+    opskrifter = {}
+    ingrediens_index = {}
+    opskrift_krav = {}
+    opskrift_total = {}
+    opskrift_tid = {}
+    for post in poster:
+        if post[2] in opskrifter:  # samme opskrift både som fil og i bundlet
+            _fjern_opskrift(post[2])
+        _indekser_opskrift(post)
+
+def _indekser_opskrift(post):
+    global _index_version
+    _index_version += 1
+    _, _, navn, data, ingredienser = post
+    opskrifter[navn] = data
+    krav = {}
+    for navn_ing, _, _, behov in ingredienser:
+        if not navn_ing:
+            continue
+        ing = ordbog.id(navn_ing)
+        if ing not in krav:
+            krav[ing] = behov
+        else:  # samme ingrediens flere gange i opskriften
+            krav[ing] = enheder.læg_behov_sammen(krav[ing], behov)
+    opskrift_krav[navn] = krav
+    opskrift_total[navn] = sum(behov[None] for behov in krav.values() if behov)
+    tid = _minutter((data or {}).get("tid"))
+    if tid is not None:
+        opskrift_tid[navn] = tid
+    for ing, behov in krav.items():
+        ingrediens_index.setdefault(ing, {})[navn] = behov
+
+def _minutter(tid):
+    """tid kan være et tal, en tekst som "20" eller "rich"-formatets dict"""
+    if isinstance(tid, dict):
+        tid = tid.get("total_min") or tid.get("tilberedning_min") or tid.get("forberedelse_min")
+    try:
+        return float(tid)
+    except (TypeError, ValueError):
+        return None
+
+def _fjern_opskrift(navn):
+    global _index_version
+    _index_version += 1
+    opskrifter.pop(navn, None)
+    opskrift_total.pop(navn, None)
+    opskrift_tid.pop(navn, None)
+    for ing in opskrift_krav.pop(navn, {}):
+        poster = ingrediens_index.get(ing)
+        if poster is not None:
+            poster.pop(navn, None)
+            if not poster:
+                del ingrediens_index[ing]
+
+def tilføj_ingredient(navn, mængde, bruger_data=None):
+    """mængde er et tal eller en tekst med enhed, fx "500 g" eller "1,5 l" """
+    navn = navn.lower()
+    lager[navn] = enheder.læg_sammen(lager.get(navn), mængde)
+    print(f"{mængde} af {navn} er tilføjet til lageret.")
+
+    if bruger_data:
+        bruger_data["lager"] = lager
+        lagring.aktiv().gem_lager_post(bruger_data, navn)
+
+def slet_ingredient(navn, bruger_data=None):
+    navn = navn.lower()
+    if navn in lager:
+        del lager[navn]
+        print(f"{navn} er slettet fra lageret.")
+    else:
+        print(f"{navn} findes ikke i lageret.")
+
+    if bruger_data:
+        bruger_data["lager"] = lager
+        lagring.aktiv().gem_lager_post(bruger_data, navn)
+
+def vis_lager():
+    if not lager:
+        print("Dit lager er tomt.")
+    else:
+        print("Dit lager:")
+        for ing, mængde in lager.items():
+            print(f"- {ing}: {mængde}")
+
+
+
+def _matrix_backend():
+    """Giver en OpskriftMatrix der svarer til det nuværende index"""
+    global _matrix
+    if _matrix[0] != _index_version:
+        _matrix = (_index_version, matrix_match.OpskriftMatrix(opskrift_krav))
+    return _matrix[1]
+
+def _brug_numpy(backend):
+    backend = backend or MATCH_BACKEND
+    if backend == "numpy" and not matrix_match.TILGÆNGELIG:
+        raise RuntimeError("NumPy-backend valgt, men numpy er ikke installeret")
+    if backend == "auto":
+        return matrix_match.TILGÆNGELIG and len(opskrift_krav) >= NUMPY_GRÆNSE
+    return backend == "numpy"
+
+def _statistik(lager_, antal_personer, backend=None):
+    """
+    {opskriftsnavn: (dækkede, manglende, manglende mængde)} for alle opskrifter hvor
+    lageret dækker mindst én ingrediens. Manglende mængde er i basisenheder.
+    Kun opskrifter der deler en ingrediens med lageret bliver besøgt.
+    """
+    if _brug_numpy(backend):
+        return _matrix_backend().statistik(lager_, antal_personer)
+
+    stat = {}  # navn -> [dækkede, justering af opskriftens samlede mængde]
+    for ing, (har, dim) in lager_.items():
+        for navn, behov in ingrediens_index.get(ing, {}).items():
+            s = stat.get(navn)
+            if s is None:
+                s = stat[navn] = [0, 0.0]
+            if behov is None:
+                s[0] += 1
+                continue
+            pr_person = behov.get(dim)
+            if pr_person is None:
+                continue  # lagerets mængde kan ikke omregnes til opskriftens: hele mængden mangler
+            s[1] -= behov[None] * antal_personer
+            underskud = pr_person * antal_personer - har
+            if underskud <= 0:
+                s[0] += 1
+            else:
+                s[1] += underskud
+    return {navn: (d, len(opskrift_krav[navn]) - d, opskrift_total[navn] * antal_personer + justering)
+            for navn, (d, justering) in stat.items() if d > 0}
+
+def _mangler(navn, lager_, antal_personer):
+    """{ingrediensnavn: (manglende mængde, enhed) eller None} for én opskrift"""
+    mangler = {}
+    for ing, behov in opskrift_krav[navn].items():
+        har, dim = lager_.get(ing, (None, None))
+        if behov is None:
+            if har is None:
+                mangler[ordbog.navn(ing)] = None
+            continue
+        pr_person = behov.get(dim)
+        if har is None or pr_person is None:
+            # Ikke på lager, eller lagerets enhed kan ikke omregnes (fx g mod ml): hele mængden mangler
+            mangler[ordbog.navn(ing)] = (round(behov[None] * antal_personer, 2), enheder.egen_dimension(behov))
+        elif har < pr_person * antal_personer:
+            enhed = dim or enheder.egen_dimension(behov)
+            mangler[ordbog.navn(ing)] = (round(pr_person * antal_personer - har, 2), enhed)
+    return mangler
+
+@_låst
+def match_opskrifter(antal_personer=1, lager_=None, backend=None):
+    """
+    Returnerer [(navn, mangler)] for alle opskrifter der kan laves helt eller delvist.
+    mangler er tom for opskrifter hvor man har alt, ellers {ingrediens: (manglende mængde, enhed)}
+    (None hvis opskriftens mængde er ukendt).
+    Mængder sammenlignes i lagerets dimension; kan opskriftens mængde ikke omregnes
+    dertil (fx g mod ml), tæller ingrediensen som manglende med hele opskriftens mængde.
+    backend: se MATCH_BACKEND.
+    """
+    lager_ = forbered_lager(lager if lager_ is None else lager_)
+    stat = _statistik(lager_, antal_personer, backend)
+    # Klassificér kun kandidaterne: alt dækket = klar, ellers list det der mangler
+    return [(navn, _mangler(navn, lager_, antal_personer) if stat[navn][1] else {})
+            for navn in sorted(stat)]
+
+# Sorteringer til søg_opskrifter. Nøglen er (score..., navn); lavest er bedst.
+SORTERINGER = {
+    "mangler": "Færrest manglende ingredienser",
+    "mængde": "Mindst manglende mængde",
+    "tid": "Kortest tid",
+    "forbrug": "Bruger mest af lageret",
+}
+_SCORE = {
+    "mangler": lambda navn, s: (s[1], round(s[2], 6), navn),
+    "mængde": lambda navn, s: (round(s[2], 6), s[1], navn),
+    "tid": lambda navn, s: (opskrift_tid.get(navn, math.inf), s[1], navn),
+    "forbrug": lambda navn, s: (-s[0], s[1], navn),
+}
+
+@_låst
+def søg_opskrifter(antal_personer=1, antal=10, sortering="mangler", cursor=None, lager_=None, backend=None):
+    """
+    Returnerer (side, cursor) med de `antal` bedste opskrifter efter `sortering`
+    (se SORTERINGER) som [(navn, mangler)]. Giv cursor med igen for at få næste side;
+    den er None når der ikke er flere. Der bruges en begrænset heap, så hele
+    kataloget aldrig bliver sorteret.
+    """
+    if sortering not in _SCORE:
+        raise ValueError(f"Ukendt sortering: {sortering}")
+    if antal < 1:
+        raise ValueError(f"antal skal være mindst 1, ikke {antal}")
+    if cursor is not None and cursor[:2] != (sortering, antal_personer):
+        raise ValueError("Cursoren hører til en anden søgning")
+
+    lager_ = forbered_lager(lager if lager_ is None else lager_)
+    score = _SCORE[sortering]
+    nøgler = (score(navn, s) for navn, s in _statistik(lager_, antal_personer, backend).items())
+    if cursor is not None:
+        nøgler = (n for n in nøgler if n > cursor[2])
+
+    bedste = heapq.nsmallest(antal + 1, nøgler)  # én ekstra for at vide om der er flere
+    næste = (sortering, antal_personer, bedste[antal - 1]) if len(bedste) > antal else None
+    side = [(n[-1], _mangler(n[-1], lager_, antal_personer)) for n in bedste[:antal]]
+    return side, næste
+
+def søg_trinvis(antal_personer=1, sortering="mangler", bid=100, lager_=None, backend=None, stop=None):
+    """
+    Hele det rangerede søgeresultat i bidder: giver ([(navn, mangler)], antal i alt)
+    med de bedste først. Alle opskrifter scores én gang, og derefter poppes en
+    heap en bid ad gangen, så de første resultater kan vises før resten er
+    sorteret, og kalderen kan stoppe mellem to bidder (GUI'ens baggrundssøgning).
+    Låsen holdes kun mens en bid beregnes.
+    stop er en threading.Event: er den sat, stopper søgningen før scoringen og
+    før hver bid, så en annulleret søgning ikke holder låsen for den næste.
+    """
+    if sortering not in _SCORE:
+        raise ValueError(f"Ukendt sortering: {sortering}")
+    with indeks_lås:
+        if stop is not None and stop.is_set():
+            return  # annulleret mens der blev ventet på låsen
+        lager_ = forbered_lager(dict(lager if lager_ is None else lager_))
+        score = _SCORE[sortering]
+        nøgler = [score(navn, s) for navn, s in _statistik(lager_, antal_personer, backend).items()]
+    heapq.heapify(nøgler)
+    i_alt = len(nøgler)
+    while nøgler:
+        if stop is not None and stop.is_set():
+            return
+        with indeks_lås:
+            side = []
+            while nøgler and len(side) < bid:
+                navn = heapq.heappop(nøgler)[-1]
+                if navn in opskrift_krav:  # kan være slettet siden scoringen
+                    side.append((navn, _mangler(navn, lager_, antal_personer)))
+        yield side, i_alt
+
+def forbered_lager(lager_):
+    """
+    Lageret med ingrediens-ID'er som nøgler ('fx pasta', 'spagetti' -> pastas ID) og
+    mængder omregnet til (værdi i basisenhed, dimension). Ingredienser som ingen
+    opskrift bruger, springes over. Resultatet caches indtil lageret eller indexet ændres.
+    """
+    nøgle = (_index_version, tuple(lager_.items()))
+    forberedt = _lager_cache.get(nøgle)
+    if forberedt is not None:
+        _lager_cache.move_to_end(nøgle)
+        return forberedt
+    forberedt = {}
+    for ing, mængde in lager_.items():
+        try:
+            værdi, dim = enheder.lager_mængde(mængde)
+        except ValueError:
+            continue
+        ing_id = ordbog.slå_op(kanonisk_navn(ing))
+        if ing_id is None:
+            continue
+        if ing_id in forberedt and forberedt[ing_id][1] == dim:
+            værdi += forberedt[ing_id][0]
+        forberedt[ing_id] = (værdi, dim)
+    _lager_cache[nøgle] = forberedt
+    if len(_lager_cache) > LAGER_CACHE_STØRRELSE:
+        _lager_cache.popitem(last=False)
+    return forberedt
+
+def mangler_tekst(mangler):
+    dele = []
+    for ing, v in mangler.items():
+        if v is None:
+            dele.append(ing)
+        else:
+            mængde, enhed = v
+            # enhed er None når opskriften bruger mængder i flere enheder der ikke kan omregnes
+            dele.append(f"{ing}: {mængde:g} {enhed}" if enhed else f"{ing}: {mængde:g}")
+    return ", ".join(dele)
+
+def find_opskrifter(antal_personer=1, sortering="mangler", side_størrelse=10):
+    """Find opskrifter der kan laves med lageret, de bedste først og en side ad gangen"""
+    if not lager:
+        print("Ingen ingredienser i lageret.\n")
+        return
+
+    opdater_opskrifter()
+    print(f"\nOpskrifter du kan lave til {antal_personer} person(er) ({SORTERINGER[sortering].lower()}):")
+
+    side, cursor = søg_opskrifter(antal_personer, side_størrelse, sortering)
+    if not side:
+        print("Ingen opskrifter kan laves med det lager, du har.\n")
+        return
+
+    while True:
+        for navn, mangler in side:
+            if not mangler:
+                print(f"- {navn} (du har alle ingredienser)")
+            else:
+                print(f"- {navn} (mangler: {mangler_tekst(mangler)})")
+        if cursor is None or input("Vis flere? (j/n): ").strip().lower() != "j":
+            break
+        side, cursor = søg_opskrifter(antal_personer, side_størrelse, sortering, cursor)
+
+def tilføj_opskrift_yml():
+    """Tilføj en ny opskrift som .yml fil"""
+    navn = input("Navn på opskrift: ").strip()
+    ingred_input = input("Ingredienser med mængde (fx pasta:100, tomat:2): ").strip()
+
+    if not navn or not ingred_input:
+        print("Ugyldigt input.\n")
+        return
+
+    ingreds = {}
+    for del_str in ingred_input.split(","):
+        try:
+            ing, mængde = del_str.split(":")
+            ingreds[ing.strip().lower()] = float(mængde.strip())
+        except:
+            print(f"Fejl i input: '{del_str}' springes over.")
+
+    tid = input("Hvor lang tid tager opskriften (minutter)? ").strip()
+    beskrivelse = input("Skriv selve opskriften: ").strip()
+
+    data = {
+        "ingredienser": ingreds,
+        "tid": tid,
+        "opskrift": beskrivelse
+    }
+
+    gem_opskrift(navn, data)
+
+    print(f"Opskrift '{navn}' er tilføjet!\n")
@@ -1,5 +1,7 @@
+import time
+_START = time.perf_counter()  # opstartstiderne måles fra her
+
 import os, sys
-import tkinter as tk
 
 def resource_path(relative_path):
     try:
@@ -8,42 +10,39 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
-root = tk.Tk()
-
-# --- ICON SETUP ---
-icon_path = resource_path("data/icon.ico")
-icon_path = os.path.normpath(icon_path)  # ✅ fix path slashes
-
-if os.path.exists(icon_path):
-    try:
-        root.iconbitmap(icon_path)
-    except Exception as e:
-        print("Could not set icon:", e)
-else:
-    print("Icon file not found:", icon_path)
-
-# (Optional) Taskbar icon fix
-try:
-    import ctypes
-    ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID('FoodSaver.GUI.1.0')
-except Exception:
-    pass
-
-root.title("Food Saver")
-root.mainloop()
-
-
-
 
 # app_phone.py  —  lys, futuristisk, hamburger-menu m. ikoner + animationer
+import bisect
+import queue
+import threading
 import tkinter as tk
+import tkinter.font as tkfont
 from tkinter import ttk, messagebox
 import DB_Handler as DB
+import enheder
 import user_Login as UL
 
 # Telefon-agtig størrelse
 PHONE_W, PHONE_H = 390, 800
 
+# Antal opskrifter pr. bid når søgeresultatet streames fra baggrundstråden
+BID_STØRRELSE = 100
+# Søgekøen tømmes hver FRAME_MS, men højst i FRAME_BUDGET sekunder ad gangen (60 fps)
+FRAME_MS = 16
+FRAME_BUDGET = 0.008
+# Varighed af menuens slide-animation i sekunder
+MENU_ANIM_S = 0.18
+
+# Sekunder fra _START til hvert opstartstrin; udskrives når kataloget er klar
+opstart = {}
+
+def opstart_mærke(trin):
+    opstart[trin] = time.perf_counter() - _START
+
+def opstart_rapport():
+    trin = ("import", "vindue", "første frame", "katalog klar")
+    print("[opstart] " + " | ".join(f"{t} {opstart[t]*1000:.0f} ms" for t in trin if t in opstart))
+
 # Farver (lys tema)
 BG       = "#f3f4f6"   # lys grå baggrund
 CARD     = "#ffffff"   # kort/overflade
@@ -60,6 +59,30 @@ def _mix(c1, c2, t):
     m = (int(a[0]+(b[0]-a[0])*t), int(a[1]+(b[1]-a[1])*t), int(a[2]+(b[2]-a[2])*t))
     return _rgb_to_hex(m)
 
+# (w, h, from_c, to_c, lighten) -> PhotoImage; hver gradient tegnes kun én gang
+_gradienter = {}
+
+def gradient_billede(w, h, from_c, to_c, lighten=0.0):
+    nøgle = (w, h, from_c, to_c, lighten)
+    img = _gradienter.get(nøgle)
+    if img is None:
+        img = tk.PhotoImage(width=w, height=h)
+        steps = 40
+        for i in range(steps):
+            t = i/(steps-1)
+            c = _mix(from_c, to_c, t)
+            if lighten:
+                base = _hex_to_rgb(c)
+                c = _rgb_to_hex(tuple(min(255, int(v*(1+lighten))) for v in base))
+            y0 = int(t*h)
+            y1 = min(h, int(y0 + h/steps + 1))
+            if y1 > y0:
+                img.put(c, to=(0, y0, w, y1))
+        # pseudo- rounded: overlay hvidt hjørne-clip (enkel)
+        img.put(from_c, to=(0, 0, w, 1))
+        _gradienter[nøgle] = img
+    return img
+
 class GradientButton(tk.Canvas):
     """Knappen tegnes som en gradient på en Canvas + let hover-pulse."""
     def __init__(self, parent, text, command, w=200, h=40, r=14, from_c=ACCENT_A, to_c=ACCENT_B):
@@ -67,32 +90,21 @@ class GradientButton(tk.Canvas):
         self.cmd, self.text = command, text
         self.w, self.h, self.r = w, h, r
         self.from_c, self.to_c = from_c, to_c
-        self._draw_grad()
+        # Gradienten er et cachet billede; hover skifter bare billedet ud
+        self.img = gradient_billede(w, h, from_c, to_c)
+        self.img_hover = gradient_billede(w, h, from_c, to_c, lighten=0.08)
+        self.bg_id = self.create_image(0, 0, anchor="nw", image=self.img)
         self.txt_id = self.create_text(w/2, h/2, text=text, fill="#ffffff", font=("Segoe UI Semibold", 10))
         self.bind("<Button-1>", lambda e: self.cmd())
         self.bind("<Enter>", self._hover_on)
         self.bind("<Leave>", self._hover_off)
         self.pulse = False
 
-    def _draw_grad(self, lighten=0.0):
-        self.delete("bg")
-        steps = 40
-        for i in range(steps):
-            t = i/(steps-1)
-            c = _mix(self.from_c, self.to_c, t)
-            if lighten:
-                base = _hex_to_rgb(c)
-                c = _rgb_to_hex(tuple(min(255, int(v*(1+lighten))) for v in base))
-            y0 = int(t*(self.h))
-            self.create_rectangle(0, y0, self.w, y0+self.h/steps+1, fill=c, width=0, tags="bg")
-        # pseudo- rounded: overlay hvidt hjørne-clip (enkel)
-        self.create_rectangle(0,0,self.w,1, fill=self.from_c, width=0, tags="bg")
-
     def _hover_on(self, *_):
-        self._draw_grad(lighten=0.08)
+        self.itemconfigure(self.bg_id, image=self.img_hover)
 
     def _hover_off(self, *_):
-        self._draw_grad()
+        self.itemconfigure(self.bg_id, image=self.img)
 
 class MenuItem(tk.Frame):
     """En let ‘row’ med ikon (Canvas) + label – uden emojis."""
@@ -140,10 +152,156 @@ class MenuItem(tk.Frame):
             c.create_line(3,12,19,12, fill=TEXT, width=3, capstyle="round")
             c.create_line(3,17,19,17, fill=TEXT, width=3, capstyle="round")
 
+class VirtualList(tk.Frame):
+    """
+    Liste der kun tegner de rækker der kan ses. Teksten hentes fra modellen med
+    tekst(i) -> (linje, underlinje eller None), og antallet sættes med sæt_antal(n).
+    Rullepanelet dækker alle n rækker, men der findes kun Canvas-items til én
+    skærmfuld, og de genbruges når der rulles. på_behov(sidste synlige index)
+    kaldes ved hver optegning, så kalderen kan hente flere rækker efterhånden.
+    """
+    def __init__(self, parent, tekst, række_h=24, på_behov=None):
+        super().__init__(parent, bg="#ffffff", highlightthickness=1, highlightbackground=DIM)
+        self.tekst, self.række_h, self.på_behov = tekst, række_h, på_behov
+        self.antal = 0
+        self.valgt = None
+        self.slots = []        # [(baggrund, linje, underlinje)] - genbrugte Canvas-items
+        self._forkortet = {}   # (tekst, bredde) -> tekst der passer i bredden
+        self.font = tkfont.Font(family="Segoe UI", size=10)
+        self.font_lille = tkfont.Font(family="Segoe UI", size=9)
+        self.canvas = tk.Canvas(self, bg="#ffffff", highlightthickness=0, bd=0, yscrollincrement=række_h)
+        self.scroll = ttk.Scrollbar(self, orient="vertical", command=self._yview)
+        self.canvas.configure(yscrollcommand=self.scroll.set)
+        self.scroll.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.tom_id = self.canvas.create_text(10, 10, anchor="nw", text="", fill=SUBTEXT, font=self.font)
+        self.canvas.bind("<Configure>", lambda e: self._tegn())
+        self.canvas.bind("<Button-1>", self._klik)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(seq, self._hjul)
+
+    # ---------- model ----------
+    def sæt_antal(self, n):
+        """Antallet af rækker er ændret (tilføjet/slettet); kun de synlige tegnes igen"""
+        self.antal = n
+        if self.valgt is not None and self.valgt >= n:
+            self.valgt = None
+        self._tegn()
+
+    def opdater(self, i):
+        """Tegner række i igen, hvis den kan ses"""
+        k = i - self._første()
+        if 0 <= k < len(self.slots):
+            self._tegn_række(k, i, self.canvas.winfo_width())
+
+    def vis_tekst(self, tekst):
+        """Tekst der vises når listen er tom"""
+        self.canvas.itemconfigure(self.tom_id, text=tekst)
+
+    def til_top(self):
+        self.canvas.yview_moveto(0)
+
+    def sidste_synlige(self):
+        return self._første() + self.canvas.winfo_height() // self.række_h
+
+    # ---------- tegning ----------
+    def _første(self):
+        return max(0, int(self.canvas.canvasy(0) // self.række_h))
+
+    def _tegn(self):
+        w = self.canvas.winfo_width()
+        self.canvas.configure(scrollregion=(0, 0, w, max(self.antal * self.række_h, 1)))
+        synlige = self.canvas.winfo_height() // self.række_h + 2
+        while len(self.slots) < synlige:
+            self.slots.append((
+                self.canvas.create_rectangle(0, 0, 0, 0, width=0, state="hidden"),
+                self.canvas.create_text(0, 0, anchor="nw", font=self.font, state="hidden"),
+                self.canvas.create_text(0, 0, anchor="nw", font=self.font_lille, state="hidden")))
+        første = self._første()
+        for k in range(len(self.slots)):
+            self._tegn_række(k, første + k, w)
+        self.canvas.itemconfigure(self.tom_id, state="hidden" if self.antal else "normal")
+        if self.på_behov:
+            self.på_behov(første + synlige)
+
+    def _tegn_række(self, k, i, w):
+        bg, linje, under = self.slots[k]
+        if i >= self.antal:
+            for item in self.slots[k]:
+                self.canvas.itemconfigure(item, state="hidden")
+            return
+        tekst, undertekst = self.tekst(i)
+        valgt = i == self.valgt
+        y = i * self.række_h
+        farve = "#ffffff" if valgt else TEXT
+        self.canvas.coords(bg, 0, y, w, y + self.række_h)
+        self.canvas.itemconfigure(bg, state="normal",
+                                  fill=ACCENT_A if valgt else ("#ffffff" if i % 2 == 0 else "#f9fafb"))
+        self.canvas.coords(linje, 10, y + 3)
+        self.canvas.itemconfigure(linje, state="normal", fill=farve,
+                                  text=self._forkort(tekst, self.font, w - 20))
+        if undertekst:
+            self.canvas.coords(under, 18, y + 3 + self.font.metrics("linespace"))
+            self.canvas.itemconfigure(under, state="normal", fill="#ffffff" if valgt else SUBTEXT,
+                                      text=self._forkort(undertekst, self.font_lille, w - 28))
+        else:
+            self.canvas.itemconfigure(under, state="hidden")
+
+    def _forkort(self, tekst, font, bredde):
+        """Skærer teksten af med … så den passer i bredden (kun for de synlige rækker)"""
+        nøgle = (tekst, bredde, font is self.font)
+        kort = self._forkortet.get(nøgle)
+        if kort is None:
+            if len(self._forkortet) > 2000:
+                self._forkortet.clear()
+            kort = tekst
+            if font.measure(tekst) > bredde:
+                lo, hi = 0, len(tekst)
+                while lo < hi:
+                    mid = (lo + hi + 1) // 2
+                    if font.measure(tekst[:mid] + "…") <= bredde:
+                        lo = mid
+                    else:
+                        hi = mid - 1
+                kort = tekst[:lo] + "…"
+            self._forkortet[nøgle] = kort
+        return kort
+
+    # ---------- input ----------
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self._tegn()
+
+    def _hjul(self, e):
+        if e.num == 4:
+            trin = -3
+        elif e.num == 5:
+            trin = 3
+        else:
+            trin = -3 if e.delta > 0 else 3  # Windows/macOS: delta er ±120 pr. hak
+        self.canvas.yview_scroll(trin, "units")
+        self._tegn()
+
+    def _klik(self, e):
+        i = int(self.canvas.canvasy(e.y) // self.række_h)
+        if i < self.antal:
+            gammel, self.valgt = self.valgt, i
+            if gammel is not None:
+                self.opdater(gammel)
+            self.opdater(i)
+
+
 class PhoneApp(tk.Tk):
     def __init__(self):
+        # (Optional) Taskbar icon fix - skal sættes før vinduet oprettes
+        try:
+            import ctypes
+            ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID('FoodSaver.GUI.1.0')
+        except Exception:
+            pass
         super().__init__()
         self.title("Food Saver")
+        self._setup_icon()
         self.geometry(f"{PHONE_W}x{PHONE_H}")
         self.minsize(PHONE_W, PHONE_H)
         self.resizable(False, False)
@@ -179,8 +337,11 @@ class PhoneApp(tk.Tk):
         self.menu_target_y = 56  # lige under topbar
         self.menu_panel.place(x=8, y=self.menu_y, width=PHONE_W-16, height=0)
 
-        self.menu_inner = tk.Frame(self.menu_panel, bg=CARD)
-        self.menu_inner.pack(fill="both", expand=True)
+        # Menuen bygges én gang pr. login-tilstand (logget ind / ude) og genbruges
+        self.menu_inner = None
+        self.menuer = {}
+        self._anim = None
+        self._anim_id = None
         self.backdrop = tk.Frame(self.shell, bg="#000000", width=PHONE_W, height=PHONE_H-56)
         self.backdrop.bind("<Button-1>", lambda e: self.hide_menu())
 
@@ -188,15 +349,46 @@ class PhoneApp(tk.Tk):
         self.content = tk.Frame(self.shell, bg=BG)
         self.content.pack(fill="both", expand=True)
 
-        # Pages
+        # Pages - kun login bygges nu, resten første gang de vises
+        self.page_klasser = {Page.__name__: Page for Page in
+                             (LoginPage, HomePage, LagerPage, OpskrifterPage, TilfoejOpskriftPage)}
         self.pages = {}
-        for Page in (LoginPage, HomePage, LagerPage, OpskrifterPage, TilfoejOpskriftPage):
-            p = Page(self.content, self)
-            self.pages[Page.__name__] = p
-            p.place(relx=0, rely=0, relwidth=1, relheight=1)
+
+        # Kataloget indlæses i baggrunden efter første frame
+        self.katalog_tråd = None
+        self.katalog_fejl = None
 
         # Start låst bag login
         self.show("LoginPage")
+        opstart_mærke("vindue")
+        self.after_idle(self._første_frame)
+
+    def _setup_icon(self):
+        icon_path = resource_path("data/icon.ico")
+        icon_path = os.path.normpath(icon_path)  # ✅ fix path slashes
+
+        if os.path.exists(icon_path):
+            try:
+                self.iconbitmap(icon_path)
+            except Exception as e:
+                print("Could not set icon:", e)
+        else:
+            print("Icon file not found:", icon_path)
+
+    def _første_frame(self):
+        # Idle-køen kører efter login-siden er tegnet
+        opstart_mærke("første frame")
+        self.katalog_tråd = threading.Thread(target=self._varm_katalog, daemon=True)
+        self.katalog_tråd.start()
+
+    def _varm_katalog(self):
+        """Baggrundstråden: indlæser opskriftskataloget mens brugeren logger ind. Rører aldrig Tk."""
+        try:
+            DB.load_opskrifter()
+        except Exception as e:
+            self.katalog_fejl = e
+        opstart_mærke("katalog klar")
+        opstart_rapport()
 
     # ---------- utils ----------
     def _divider(self, parent):
@@ -216,8 +408,18 @@ class PhoneApp(tk.Tk):
 
     # ---------- menu ----------
     def build_menu(self):
-        for w in self.menu_inner.winfo_children():
-            w.destroy()
+        logget_ind = bool(self.bruger_data)
+        menu = self.menuer.get(logget_ind)
+        if menu is None:
+            menu = self.menuer[logget_ind] = self._lav_menu()
+        if menu is not self.menu_inner:
+            if self.menu_inner is not None:
+                self.menu_inner.pack_forget()
+            menu.pack(fill="both", expand=True)
+            self.menu_inner = menu
+
+    def _lav_menu(self):
+        menu = tk.Frame(self.menu_panel, bg=CARD)
         items = []
         if self.bruger_data:
             items = [
@@ -230,11 +432,12 @@ class PhoneApp(tk.Tk):
             items = [("Login / Opret", "home", lambda: self.show("LoginPage"))]
 
         for text, icon, cmd in items:
-            MenuItem(self.menu_inner, text, icon, lambda c=cmd: (self.hide_menu(), c())).pack(fill="x", padx=10, pady=6)
+            MenuItem(menu, text, icon, lambda c=cmd: (self.hide_menu(), c())).pack(fill="x", padx=10, pady=6)
 
         if self.bruger_data:
-            ttk.Separator(self.menu_inner, orient="horizontal").pack(fill="x", padx=10, pady=6)
-            MenuItem(self.menu_inner, "Log ud", "power", self._logout_click).pack(fill="x", padx=10, pady=6)
+            ttk.Separator(menu, orient="horizontal").pack(fill="x", padx=10, pady=6)
+            MenuItem(menu, "Log ud", "power", self._logout_click).pack(fill="x", padx=10, pady=6)
+        return menu
 
     def toggle_menu(self):
         if self.menu_open: self.hide_menu()
@@ -256,29 +459,42 @@ class PhoneApp(tk.Tk):
         self._animate_menu(opening=False)
 
     def _animate_menu(self, opening=True):
-        if opening:
-            if self.menu_y < self.menu_target_y:
-                self.menu_y += 20
-                h = min(220, (self.menu_y - 56) + 220)  # simple height expansion
-                self.menu_panel.place_configure(y=self.menu_y, height=max(0, h))
-                self.after(10, lambda: self._animate_menu(True))
-            else:
-                self.menu_panel.place_configure(y=self.menu_target_y)
-        else:
-            if self.menu_y > -200:
-                self.menu_y -= 20
-                h = max(0, (self.menu_y - 56) + 220)
-                self.menu_panel.place_configure(y=self.menu_y, height=h)
-                self.after(10, lambda: self._animate_menu(False))
-            else:
-                self.menu_open = False
-                self.menu_panel.place_configure(height=0)
-                self.menu_panel.place_forget()
-                self.backdrop.place_forget()
+        # Tween over MENU_ANIM_S sekunder fra hvor menuen er nu; positionen
+        # regnes ud fra tiden, så animationen er lige lang uanset frame rate
+        if self._anim_id:
+            self.after_cancel(self._anim_id)
+        til = self.menu_target_y if opening else -200
+        self._anim = (time.perf_counter(), self.menu_y, til, opening)
+        self._animate_step()
+
+    def _animate_step(self):
+        start, fra, til, opening = self._anim
+        t = min(1.0, (time.perf_counter() - start) / MENU_ANIM_S)
+        e = 1 - (1 - t) ** 3  # ease-out
+        self.menu_y = round(fra + (til - fra) * e)
+        h = max(0, min(220, (self.menu_y - 56) + 220))  # simple height expansion
+        self.menu_panel.place_configure(y=self.menu_y, height=h)
+        if t < 1.0:
+            self._anim_id = self.after(FRAME_MS, self._animate_step)
+            return
+        self._anim_id = None
+        if not opening:
+            self.menu_open = False
+            self.menu_panel.place_configure(height=0)
+            self.menu_panel.place_forget()
+            self.backdrop.place_forget()
 
     # ---------- app state ----------
+    def page(self, name: str):
+        """Siden med navnet; den bygges første gang den bruges"""
+        page = self.pages.get(name)
+        if page is None:
+            page = self.pages[name] = self.page_klasser[name](self.content, self)
+            page.place(relx=0, rely=0, relwidth=1, relheight=1)
+        return page
+
     def show(self, name: str):
-        page = self.pages[name]
+        page = self.page(name)
         page.tkraise()
         self.title_lbl.config(text=getattr(page, "title_text", "Food Saver"))
         if hasattr(page, "on_show"):
@@ -287,16 +503,21 @@ class PhoneApp(tk.Tk):
     def after_login(self, bruger_data):
         self.bruger_data = bruger_data
         DB.lager = {k.lower(): v for k, v in bruger_data.get("lager", {}).items()}
-        try:
-            DB.load_opskrifter()
-        except Exception as e:
-            messagebox.showerror("Fejl", f"Kunne ikke indlæse opskrifter.\n{e}")
+        # Kataloget er allerede varmet i baggrunden (søgningen venter selv på
+        # låsen hvis det ikke er færdigt); fejlede det, prøves igen her
+        if self.katalog_fejl is not None:
+            self.katalog_fejl = None
+            try:
+                DB.load_opskrifter()
+            except Exception as e:
+                messagebox.showerror("Fejl", f"Kunne ikke indlæse opskrifter.\n{e}")
         # nulstil alle inputs ved login (så en ny bruger ikke arver felter)
         self.reset_all_inputs()
         self.hide_menu()
         self.show("HomePage")
 
     def autosave(self):
+        # Fuldt snapshot af brugeren; komprimerer samtidig lagerjournalen
         if self.bruger_data:
             self.bruger_data["lager"] = DB.lager
             UL.gem_bruger(self.bruger_data)
@@ -311,12 +532,12 @@ class PhoneApp(tk.Tk):
 
     def reset_all_inputs(self):
         # ryd loginfelter
-        lp: LoginPage = self.pages["LoginPage"]
+        lp: LoginPage = self.page("LoginPage")
         lp.clear_inputs()
-        # ryd sidefelter
-        self.pages["LagerPage"].reset_inputs()
-        self.pages["OpskrifterPage"].reset_inputs()
-        self.pages["TilfoejOpskriftPage"].reset_inputs()
+        # ryd sidefelter (sider der ikke er bygget endnu har intet at rydde)
+        for name in ("LagerPage", "OpskrifterPage", "TilfoejOpskriftPage"):
+            if name in self.pages:
+                self.pages[name].reset_inputs()
 
 
 # ---------- sider ----------
@@ -425,10 +646,9 @@ class LagerPage(tk.Frame):
         list_wrap = tk.Frame(card, bg=CARD)
         list_wrap.pack(fill="both", expand=True, padx=12, pady=(0,12))
 
-        self.listbox = tk.Listbox(list_wrap, bg="#ffffff", fg=TEXT, bd=0,
-                                  highlightthickness=1, highlightbackground=DIM,
-                                  activestyle="none", selectbackground=ACCENT_A, selectforeground="#ffffff")
-        self.listbox.pack(fill="both", expand=True, padx=8, pady=8)
+        self.varer = []  # lagerets ingredienser sorteret - modellen bag listen
+        self.liste = VirtualList(list_wrap, self._række)
+        self.liste.pack(fill="both", expand=True, padx=8, pady=8)
 
         bottom = tk.Frame(card, bg=CARD)
         bottom.pack(fill="x", padx=12, pady=(0,12))
@@ -438,44 +658,53 @@ class LagerPage(tk.Frame):
     def reset_inputs(self):
         self.ent_ing.delete(0, "end"); self.ent_ing.insert(0, "fx pasta")
         self.ent_amt.delete(0, "end"); self.ent_amt.insert(0, "mængde")
-        self.listbox.delete(0, "end")
+        self.varer = []
+        self.liste.sæt_antal(0)
 
     def on_show(self):
         self.refresh()
 
+    def _række(self, i):
+        ing = self.varer[i]
+        return f"{ing}: {DB.lager.get(ing)}", None
+
     def refresh(self):
-        self.listbox.delete(0, "end")
-        if not DB.lager:
-            self.listbox.insert("end", "Lager er tomt.")
-            return
-        for ing, amt in sorted(DB.lager.items()):
-            self.listbox.insert("end", f"{ing}: {amt}")
+        self.varer = sorted(DB.lager)
+        self.liste.vis_tekst("Lager er tomt.")
+        self.liste.sæt_antal(len(self.varer))
 
     def add_item(self):
         navn = self.ent_ing.get().strip().lower()
         try:
-            amt = float(self.ent_amt.get().strip())
+            amt = enheder.læs_mængde(self.ent_amt.get().strip())
         except:
-            messagebox.showerror("Fejl", "Mængde skal være et tal.")
+            messagebox.showerror("Fejl", "Mængde skal være et tal, evt. med enhed (fx 500 g).")
             return
         if not navn:
             messagebox.showinfo("Info", "Skriv et navn.")
             return
-        DB.tilføj_ingredient(navn, amt, self.app.bruger_data)
-        self.app.autosave()
-        self.refresh()
+        try:
+            DB.tilføj_ingredient(navn, amt, self.app.bruger_data)
+        except ValueError as e:
+            messagebox.showerror("Fejl", str(e))
+            return
+        # Kun den ændrede række tegnes: en eksisterende vare opdateres på plads
+        i = bisect.bisect_left(self.varer, navn)
+        if i < len(self.varer) and self.varer[i] == navn:
+            self.liste.opdater(i)
+        else:
+            self.varer.insert(i, navn)
+            self.liste.sæt_antal(len(self.varer))
 
     def del_selected(self):
-        sel = self.listbox.curselection()
-        if not sel:
+        i = self.liste.valgt
+        if i is None:
             messagebox.showinfo("Info", "Vælg en vare.")
             return
-        line = self.listbox.get(sel[0])
-        if ":" not in line: return
-        navn = line.split(":", 1)[0].strip()
+        navn = self.varer.pop(i)
         DB.slet_ingredient(navn, self.app.bruger_data)
-        self.app.autosave()
-        self.refresh()
+        self.liste.valgt = None
+        self.liste.sæt_antal(len(self.varer))
 
 
 class OpskrifterPage(tk.Frame):
@@ -497,17 +726,49 @@ class OpskrifterPage(tk.Frame):
         self.ent_personer.pack(side="left", padx=8)
         GradientButton(top, "Find", self.find_ops, w=90, h=36).pack(side="left", padx=8)
 
-        self.txt = tk.Text(card, bg="#ffffff", fg=TEXT, bd=0, highlightthickness=1,
-                           highlightbackground=DIM, wrap="word")
-        self.txt.pack(fill="both", expand=True, padx=12, pady=(0,12))
+        sort_row = tk.Frame(card, bg=CARD)
+        sort_row.pack(fill="x", padx=12, pady=(0,12))
+        ttk.Label(sort_row, text="Sortér:", style="Card.TLabel").pack(side="left")
+        self.sorteringer = {tekst: nøgle for nøgle, tekst in DB.SORTERINGER.items()}
+        self.cmb_sort = ttk.Combobox(sort_row, values=list(self.sorteringer), state="readonly")
+        self.cmb_sort.current(0)
+        self.cmb_sort.pack(side="left", padx=8, fill="x", expand=True)
+
+        status_row = tk.Frame(card, bg=CARD)
+        status_row.pack(fill="x", padx=12, pady=(0,8))
+        self.progress = ttk.Progressbar(status_row, mode="determinate", maximum=100)
+        self.progress.pack(side="left", fill="x", expand=True)
+        self.lbl_status = ttk.Label(status_row, text="", style="Card.TLabel", width=14, anchor="e")
+        self.lbl_status.pack(side="right", padx=(8,0))
+
+        # Det rangerede resultat hentes en bid ad gangen, når listen rulles tæt på enden
+        self.resultater = []  # [(navn, mangler)]
+        self.liste = VirtualList(card, self._række, række_h=40, på_behov=self._behov)
+        self.liste.pack(fill="both", expand=True, padx=12, pady=(0,12))
+
+        # Den igangværende søgning: (stop-event, kø) - søgningen kører i en baggrundstråd
+        self._søgning = None
+        self._poller = False
+        self._venter = None  # en bid taget fra køen, der først vises når listen rulles
 
     def reset_inputs(self):
+        self.stop_søgning()
         self.ent_personer.delete(0, "end"); self.ent_personer.insert(0, "2")
-        self.txt.delete("1.0", "end")
+        self.cmb_sort.current(0)
+        self.resultater = []
+        self.liste.vis_tekst("")
+        self.liste.sæt_antal(0)
+        self.progress.stop()
+        self.progress.configure(mode="determinate", value=0)
+        self.lbl_status.configure(text="")
 
     def on_show(self):
-        if not self.txt.get("1.0","end").strip():
-            self.txt.insert("end", "Tryk Find for at se hvad du kan lave.")
+        if not self.resultater and not self._søgning:
+            self.liste.vis_tekst("Tryk Find for at se hvad du kan lave.")
+
+    def _række(self, i):
+        navn, mangler = self.resultater[i]
+        return f"• {navn}", "klar" if not mangler else f"mangler: {DB.mangler_tekst(mangler)}"
 
     def find_ops(self):
         try:
@@ -516,42 +777,119 @@ class OpskrifterPage(tk.Frame):
             messagebox.showerror("Fejl", "Antal personer skal være et tal.")
             return
 
-        try:
-            DB.load_opskrifter()
-        except Exception as e:
-            messagebox.showerror("Fejl", f"Kunne ikke indlæse opskrifter.\n{e}")
-            return
-
-        self.txt.delete("1.0", "end")
+        # Et nyt klik på Find annullerer den søgning der er i gang
+        self.stop_søgning()
+        self.resultater = []
+        self.liste.til_top()
+        self.liste.sæt_antal(0)
+        self.lbl_status.configure(text="")
         if not DB.lager:
-            self.txt.insert("end", "Ingen ingredienser i lageret.\n")
+            self.liste.vis_tekst("Ingen ingredienser i lageret.")
             return
 
-        found = False
-        self.txt.insert("end", f"Opskrifter til {personer} person(er):\n\n")
-        for navn, data in DB.opskrifter.items():
-            ingreds = data.get("ingredienser", {})
-            mangler = {}
-            for ing, m in ingreds.items():
+        sortering = self.sorteringer[self.cmb_sort.get()]
+        self.liste.vis_tekst(f"Søger opskrifter til {personer} person(er)…")
+        self.lbl_status.configure(text="Indlæser…")
+        self.progress.configure(mode="indeterminate")
+        self.progress.start(FRAME_MS)
+
+        # Lille kø: tråden regner højst et par bidder forud for det der bliver vist
+        stop, kø = threading.Event(), queue.Queue(maxsize=2)
+        self._søgning = (stop, kø)
+        threading.Thread(target=self._søg, args=(stop, kø, personer, sortering), daemon=True).start()
+        self._start_poll()
+
+    def stop_søgning(self):
+        if self._søgning:
+            self._søgning[0].set()
+            self._søgning = None
+        self._poller = False
+        self._venter = None
+
+    @staticmethod
+    def _søg(stop, kø, personer, sortering):
+        """Baggrundstråden: indlæser ændringer og sender resultatet i bidder. Rører aldrig Tk."""
+        def send(besked):
+            while not stop.is_set():  # køen er begrænset: vent på UI'et, men giv op ved annullering
                 try:
-                    need = float(m) * float(personer)
-                    have = float(DB.lager.get(ing, 0))
-                except ValueError:
-                    continue  # spring over hvis noget ikke kan konverteres til tal
-
-                if have < need:
-                    mangler[ing] = round(need - have, 2)
-            if not mangler:
-                self.txt.insert("end", f"• {navn}  —  klar\n")
-                found = True
-            elif 0 < len(mangler) < len(ingreds):
-                parts = ", ".join(f"{k}: {v}" for k, v in mangler.items())
-                self.txt.insert("end", f"• {navn}  —  mangler: {parts}\n")
-                found = True
-
-
-        if not found:
-            self.txt.insert("end", "Ingen opskrifter kan laves med det lager, du har.\n")
+                    kø.put(besked, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        try:
+            DB.opdater_opskrifter()
+            if stop.is_set():
+                return  # annulleret mens kataloget blev opdateret: lad næste søgning få låsen
+            for side, i_alt in DB.søg_trinvis(personer, sortering, BID_STØRRELSE, stop=stop):
+                if not send(("bid", side, i_alt)):
+                    return
+            send(("færdig", None, None))
+        except Exception as e:
+            send(("fejl", e, None))
+
+    def _behøver_flere(self):
+        # Mindst én bid klar ud over det der kan ses
+        return len(self.resultater) < self.liste.sidste_synlige() + BID_STØRRELSE
+
+    def _behov(self, _sidste):
+        if self._behøver_flere():
+            self._start_poll()
+
+    def _start_poll(self):
+        if self._søgning and not self._poller:
+            self._poller = True
+            self.after(FRAME_MS, self._poll, *self._søgning)
+
+    def _poll(self, stop, kø):
+        """
+        Tømmer søgekøen i UI-tråden, højst FRAME_BUDGET pr. frame. Bidder vises kun
+        så langt der er rullet; "færdig" og "fejl" behandles altid, så status og
+        tråden ikke venter på at listen rulles.
+        """
+        if stop.is_set():
+            return  # annulleret; tråden stopper selv
+        self._poller = False
+        slut = time.perf_counter() + FRAME_BUDGET
+        while time.perf_counter() < slut:
+            besked, self._venter = self._venter, None
+            if besked is None:
+                try:
+                    besked = kø.get_nowait()
+                except queue.Empty:
+                    break
+            slags, data, i_alt = besked
+            if slags == "bid":
+                if not self._behøver_flere():
+                    self._venter = besked
+                    break
+                self._vis_bid(data, i_alt)
+            elif slags == "færdig":
+                self._søgning_færdig()
+                return
+            else:
+                self._søgning_færdig()
+                messagebox.showerror("Fejl", f"Kunne ikke søge i opskrifter.\n{data}")
+                return
+        if self._venter is None or self._behøver_flere():
+            self._start_poll()  # ellers venter vi på at listen rulles (på_behov)
+
+    def _vis_bid(self, side, i_alt):
+        if not self.resultater:
+            self.progress.stop()
+            self.progress.configure(mode="determinate")
+        self.resultater.extend(side)
+        self.liste.sæt_antal(len(self.resultater))
+        self.progress.configure(value=100 * len(self.resultater) / max(i_alt, 1))
+        self.lbl_status.configure(text=f"{len(self.resultater)} af {i_alt}")
+
+    def _søgning_færdig(self):
+        self._søgning = None
+        self.progress.stop()
+        self.progress.configure(mode="determinate", value=100)
+        if not self.resultater:
+            self.liste.vis_tekst("Ingen opskrifter kan laves med det lager, du har.")
+        self.lbl_status.configure(text=f"{len(self.resultater)} opskrifter")
 
 
 class TilfoejOpskriftPage(tk.Frame):
@@ -613,12 +951,7 @@ class TilfoejOpskriftPage(tk.Frame):
 
         data = {"ingredienser": ingreds, "tid": int(tid) if tid.isdigit() else tid, "opskrift": steps}
         try:
-            import yaml, os
-            filnavn = navn.replace(" ", "_") + ".yml"
-            filsti = os.path.join(DB.opskrift_mappe, filnavn)
-            with open(filsti, "w", encoding="utf-8") as f:
-                yaml.dump(data, f, allow_unicode=True)
-            DB.load_opskrifter()
+            DB.gem_opskrift(navn, data)
             messagebox.showinfo("OK", f"Opskrift '{navn}' gemt.")
             self.reset_inputs()
         except Exception as e:
@@ -626,5 +959,6 @@ class TilfoejOpskriftPage(tk.Frame):
 
 
 if __name__ == "__main__":
+    opstart_mærke("import")
     app = PhoneApp()
     app.mainloop()
@@ -13,20 +13,31 @@ Dependencies:
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import math
+import os
 import re
+import sqlite3
+import queue
 import sys
+import tempfile
+import threading
 import time
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
-from urllib.parse import urljoin
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Any, Container, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
 
-from collections import deque
 import requests
 from bs4 import BeautifulSoup
-import yaml
 from pathlib import Path
 
+import ingrediens_parser
+import lagring
+
 
 # ---------- Helpers ----------
 
@@ -90,16 +101,14 @@ def ensure_list(x: Any) -> List[Any]:
 
 
 def parse_ingredient_line(line: str) -> Dict[str, Any]:
+    """Bruger den fælles parser i ingrediens_parser, så scraper og matcher er enige."""
     s = line.strip()
     if not s:
         return {"name": line}
-    m = re.match(r"^\s*(\d+(?:[.,]\d+)?)\s*([a-zA-ZæøåÆØÅ%]+)?\s+(.*)$", s)
-    if not m:
-        return {"name": s}
-    amount = float(m.group(1).replace(",", "."))
-    unit = m.group(2)
-    name = m.group(3).strip()
-    return {"amount": amount, "unit": unit, "name": name}
+    ing = ingrediens_parser.parse_linje(s)
+    if ing.mængde is None:
+        return {"name": ing.navn or s}
+    return {"amount": ing.mængde, "unit": ing.enhed, "name": ing.navn or s}
 
 
 # ---------- Data models ----------
@@ -148,16 +157,23 @@ class Recipe:
 
         if per_person and self.servings and self.ingredients:
             mapping = {}
+            amounts: Dict[str, Tuple[float, Optional[str]]] = {}
             for line in self.ingredients:
                 parts = parse_ingredient_line(line)
                 name = parts.get("name") or line
                 if "amount" in parts and isinstance(self.servings, int) and self.servings > 0:
                     per = parts["amount"] / float(self.servings)
                     unit = parts.get("unit")
+                    if name in amounts and amounts[name][1] == unit:
+                        # samme ingrediens flere gange (fx smør til dej og til stegning)
+                        per += amounts[name][0]
+                    elif name in mapping:
+                        name = f"{name} ({unit or 'stk'})"
+                    amounts[name] = (per, unit)
                     val = f"{per:g} {unit}" if unit else f"{per:g}"
                     mapping[name] = val
                 else:
-                    mapping[name] = line
+                    mapping.setdefault(name, line)
             data["ingredienser"] = mapping
         else:
             data["ingredienser"] = self.ingredients
@@ -168,22 +184,90 @@ class Recipe:
 
 # ---------- Extraction ----------
 
+def jsonld_from_text(txt: Optional[str]) -> List[Any]:
+    """Indholdet af ét ld+json script -> liste af blokke ([] hvis det ikke er gyldig JSON)."""
+    if not txt:
+        return []
+    try:
+        txt = re.sub(r"<!--.*?-->", "", txt.strip(), flags=re.DOTALL)
+        return ensure_list(json.loads(txt))
+    except Exception:
+        return []
+
+
 def find_jsonld_blocks(soup: BeautifulSoup) -> List[Any]:
     blocks = []
     for tag in soup.find_all("script", type=lambda t: t and "ld+json" in t):
-        try:
-            txt = tag.string or tag.get_text()
-            if not txt:
-                continue
-            txt = txt.strip()
-            txt = re.sub(r"<!--.*?-->", "", txt, flags=re.DOTALL)
-            data = json.loads(txt)
-            blocks.extend(ensure_list(data))
-        except Exception:
-            continue
+        blocks.extend(jsonld_from_text(tag.string or tag.get_text()))
     return blocks
 
 
+class PageExtractor(HTMLParser):
+    """
+    Hurtig vej uden DOM: samler ld+json scripts, <a href> og <title> i én
+    gennemgang af HTML'en. Det er alt hvad crawleren bruger fra en side.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.jsonld: List[str] = []
+        self.hrefs: List[str] = []
+        self.title: Optional[str] = None
+        self._capture: Optional[str] = None  # "script" eller "title" mens vi samler tekst
+        self._buf: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            for k, v in attrs:
+                if k == "href" and v is not None:
+                    self.hrefs.append(v)
+                    break
+        elif tag == "script":
+            if any(k == "type" and v and "ld+json" in v for k, v in attrs):
+                self._capture, self._buf = "script", []
+        elif tag == "title" and self.title is None:
+            self._capture, self._buf = "title", []
+
+    def handle_data(self, data):
+        if self._capture:
+            self._buf.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == self._capture:
+            text = "".join(self._buf)
+            if tag == "script":
+                self.jsonld.append(text)
+            else:
+                self.title = text
+            self._capture = None
+
+    @property
+    def complete(self) -> bool:
+        # Et script eller en titel der aldrig blev lukket = siden er for ødelagt til den hurtige vej
+        return self._capture is None
+
+
+def extract_page(html: str) -> Tuple[List[Any], List[str], Optional[str]]:
+    """
+    (JSON-LD blokke, hrefs, titel) fra en side i én gennemgang.
+    BeautifulSoup bruges kun som fallback hvis HTML'en er for ødelagt.
+    """
+    try:
+        parser = PageExtractor()
+        parser.feed(html)
+        parser.close()
+        if not parser.complete:
+            raise ValueError("ulukket <script> eller <title>")
+    except Exception:
+        soup = BeautifulSoup(html, "html.parser")
+        title = soup.title.get_text() if soup.title else None
+        return find_jsonld_blocks(soup), [a["href"] for a in soup.find_all("a", href=True)], title
+    blocks: List[Any] = []
+    for txt in parser.jsonld:
+        blocks.extend(jsonld_from_text(txt))
+    return blocks, parser.hrefs, parser.title
+
+
 def normalize_instruction_obj(obj: Any) -> List[str]:
     steps: List[str] = []
     if isinstance(obj, str):
@@ -306,103 +390,952 @@ def extract_recipe_from_jsonld(block: Dict[str, Any], source_url: str) -> Recipe
     )
 
 
-# ---------- Scraper + Crawl ----------
-
-def fetch(url: str, timeout: int = 20) -> Optional[str]:
-    headers = {"User-Agent": "Mozilla/5.0"}
+# ---------- Høflighed ----------
+
+class TokenBucket:
+    """Token bucket: højst `rate` forespørgsler i sekundet, med op til `burst` på én gang."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            # Reserver et token (evt. på forskud) og vent uden for låsen
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Én TokenBucket pr. host, så flere tråde aldrig hamrer løs på samme site."""
+
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url: str) -> None:
+        if not self.rate:
+            return
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+
+# ---------- HTTP ----------
+
+_local = threading.local()
+
+
+def session() -> requests.Session:
+    """
+    Én requests.Session pr. tråd: forbindelserne genbruges (keep-alive) i stedet
+    for en ny TCP+TLS forbindelse pr. side. Accept-Encoding sættes af requests
+    (gzip/deflate, og br hvis brotli er installeret).
+    """
+    s = getattr(_local, "session", None)
+    if s is None:
+        s = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+        s.headers["User-Agent"] = "Mozilla/5.0"
+        _local.session = s
+    return s
+
+
+class ValidatorStore:
+    """
+    ETag / Last-Modified pr. URL på disken (SQLite), sammen med sidens links og
+    den fil opskriften blev gemt i, nøglet på (out_dir, canonical_url). Ved en ny
+    crawl sendes If-None-Match / If-Modified-Since; svarer serveren 304, bruges de
+    gemte links og siden hverken parses eller skrives igen.
+
+    Validatorerne gælder kun for den out_dir de blev gemt til (se scope()). Mangler
+    den gemte fil i out_dir, sendes ingen validatorer, så siden hentes og gemmes igen.
+    """
+
+    def __init__(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.lock = threading.Lock()
+        self.not_modified = 0  # antal 304-svar i denne crawl
+        self.refetched = 0     # sider hentet uden validatorer, fordi deres fil manglede
+        self.out_dir = ""
+        self.files: Optional[Container[str]] = None
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        if "out_dir" not in {row[1] for row in self.db.execute("PRAGMA table_info(validators)")}:
+            # Validatorer fra før out_dir var en del af nøglen kan ikke stoles på
+            self.db.execute("DROP TABLE IF EXISTS validators")
+        self.db.execute("CREATE TABLE IF NOT EXISTS validators ("
+                        "out_dir TEXT NOT NULL, url TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+                        "links TEXT NOT NULL, file TEXT, PRIMARY KEY (out_dir, url))")
+
+    def scope(self, out_dir, files: Optional[Container[str]] = None) -> None:
+        """Brug validatorerne for `out_dir`, hvor `files` er de opskrifter der findes der nu."""
+        self.out_dir = os.path.abspath(str(out_dir))
+        self.files = files
+
+    def get(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], List[str]]]:
+        with self.lock:
+            row = self.db.execute("SELECT etag, last_modified, links, file FROM validators "
+                                  "WHERE out_dir = ? AND url = ?", (self.out_dir, canonical_url(url))).fetchone()
+            if row is None:
+                return None
+            if row[3] and self.files is not None and row[3] not in self.files:
+                self.refetched += 1
+                return None
+        return row[0], row[1], json.loads(row[2])
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], links: List[str],
+            file: Optional[str] = None) -> None:
+        self.put_many([(url, etag, last_modified, links, file)])
+
+    def put_many(self, rows: List[Tuple[str, Optional[str], Optional[str], List[str], Optional[str]]]) -> None:
+        """Som put() for en hel bid (url, etag, last_modified, links, file) i én transaktion."""
+        rows = [(self.out_dir, canonical_url(url), etag, last_modified, json.dumps(links), file)
+                for url, etag, last_modified, links, file in rows
+                if etag or last_modified]  # ellers intet at revalidere med
+        if not rows:
+            return
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def clear(self) -> None:
+        """Glem validatorerne for out_dir (--full-refresh)."""
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM validators WHERE out_dir = ?", (self.out_dir,))
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class ReplayCache:
+    """
+    Optagne HTTP-svar på disken, så crawlen kan testes og benchmarkes uden net.
+    Kroppene gemmes indholdsadresseret (objects/ab/<sha256>), så ens sider kun
+    fylder én gang, og index.sqlite3 mapper kanonisk URL -> (status, headers, sha256).
+        record - hent fra nettet som normalt og gem hvert 200-svar
+        replay - svar kun fra cachen; en URL der ikke er optaget er en fejl
+    ETag / Last-Modified gemmes med, så betingede forespørgsler også får 304 i replay.
+    """
+
+    HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+    def __init__(self, path, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Ukendt mode: {mode} (brug 'record' eller 'replay')")
+        self.path = Path(path)
+        self.mode = mode
+        (self.path / "objects").mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path / "index.sqlite3"), check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                        "url TEXT PRIMARY KEY, status INTEGER NOT NULL, headers TEXT NOT NULL, sha256 TEXT NOT NULL)")
+
+    def _object(self, sha: str) -> Path:
+        return self.path / "objects" / sha[:2] / sha
+
+    def put(self, url: str, r: requests.Response) -> None:
+        body = r.content
+        sha = hashlib.sha256(body).hexdigest()
+        obj = self._object(sha)
+        if not obj.exists():
+            obj.parent.mkdir(exist_ok=True)
+            # Eget midlertidigt navn pr. kald: to tråde kan gemme samme krop samtidig
+            with tempfile.NamedTemporaryFile(dir=obj.parent, prefix=sha, suffix=".tmp", delete=False) as f:
+                f.write(body)
+            tmp = Path(f.name)
+            try:
+                tmp.replace(obj)
+            except OSError:
+                # Findes objektet nu, har en anden tråd gemt samme krop (og har det måske åbent)
+                tmp.unlink(missing_ok=True)
+                if not obj.exists():
+                    raise
+        headers = {k: r.headers[k] for k in self.HEADERS if k in r.headers}
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                            (canonical_url(url), r.status_code, json.dumps(headers), sha))
+
+    def get(self, url: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        with self.lock:
+            row = self.db.execute("SELECT status, headers, sha256 FROM responses WHERE url = ?",
+                                  (canonical_url(url),)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), self._object(row[2]).read_bytes()
+
+    def urls(self) -> List[str]:
+        with self.lock:
+            return [url for url, in self.db.execute("SELECT url FROM responses ORDER BY url")]
+
+    def response(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+        """Et requests.Response bygget fra cachen (304 hvis validatorerne matcher), eller None."""
+        hit = self.get(url)
+        if hit is None:
+            return None
+        status, stored, body = hit
+        headers = headers or {}
+        etag, last_modified = stored.get("ETag"), stored.get("Last-Modified")
+        if (etag and headers.get("If-None-Match") == etag) or \
+                (last_modified and headers.get("If-Modified-Since") == last_modified):
+            status, body = 304, b""
+        r = requests.Response()
+        r.status_code = status
+        r._content = body
+        r.headers = requests.structures.CaseInsensitiveDict(stored)
+        r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+        r.url = url
+        return r
+
+    def close(self) -> None:
+        self.db.close()
+
+
+# Sættes med set_replay_cache (WebScraber --record / --replay)
+_replay_cache: Optional[ReplayCache] = None
+
+
+def set_replay_cache(cache: Optional[ReplayCache]) -> None:
+    global _replay_cache
+    _replay_cache = cache
+
+
+def fetch_response(url: str, timeout: int = 20, limiter: Optional[HostRateLimiter] = None,
+                   headers: Optional[Dict[str, str]] = None) -> Optional[requests.Response]:
+    cache = _replay_cache
+    if cache and cache.mode == "replay":
+        # Intet net, og derfor heller ingen grund til at vente på rate limiteren
+        r = cache.response(url, headers)
+        if r is None:
+            sys.stderr.write(f"[fejl] Ikke i replay-cachen: {url}\n")
+        return r
+    if cache:
+        headers = None  # optag altid hele siden, ikke et tomt 304-svar
+    if limiter:
+        limiter.wait(url)
     try:
-        r = requests.get(url, headers=headers, timeout=timeout)
+        r = session().get(url, headers=headers, timeout=timeout)
         r.raise_for_status()
-        return r.text
+        if cache and r.status_code == 200:
+            cache.put(url, r)
+        return r
     except Exception as e:
         sys.stderr.write(f"[fejl] Kunne ikke hente {url}: {e}\n")
         return None
 
 
-def scrape_one(url: str) -> Optional[Recipe]:
-    html = fetch(url)
-    if not html:
-        return None
-    soup = BeautifulSoup(html, "html.parser")
-    blocks = find_jsonld_blocks(soup)
+def fetch(url: str, timeout: int = 20, limiter: Optional[HostRateLimiter] = None) -> Optional[str]:
+    r = fetch_response(url, timeout=timeout, limiter=limiter)
+    return r.text if r is not None else None
+
+
+def scrape_one(url: str, limiter: Optional[HostRateLimiter] = None,
+               html: Optional[str] = None, soup: Optional[BeautifulSoup] = None) -> Optional[Recipe]:
+    """
+    Henter og parser en opskriftsside. Har kalderen allerede hentet siden,
+    gives html (eller et parset soup) med, så siden hverken hentes eller
+    parses igen.
+    """
+    if soup is not None:
+        blocks = find_jsonld_blocks(soup)
+        title = soup.title.get_text() if soup.title else None
+    else:
+        if html is None:
+            html = fetch(url, limiter=limiter)
+        if not html:
+            return None
+        blocks, _, title = extract_page(html)
+    return recipe_from_blocks(url, blocks, title)
+
+
+def recipe_from_blocks(url: str, blocks: List[Any], title: Optional[str]) -> Optional[Recipe]:
     block = pick_recipe_from_jsonld(blocks)
     if not block:
         return None
     recipe = extract_recipe_from_jsonld(block, source_url=url)
-    if not recipe.title and soup.title:
-        recipe.title = clean_space(soup.title.get_text())
+    if not recipe.title and title:
+        recipe.title = clean_space(title)
     return recipe
 
 
-def collect_recipe_links(page_url: str, html: str) -> List[str]:
+def collect_recipe_links(page_url: str, html: str, soup: Optional[BeautifulSoup] = None) -> List[str]:
     """Finder både opskriftslinks og pagination-links."""
-    soup = BeautifulSoup(html, "html.parser")
-    urls = []
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
+    if soup is not None:
+        hrefs = [a["href"] for a in soup.find_all("a", href=True)]
+    else:
+        _, hrefs, _ = extract_page(html)
+    return recipe_links(page_url, hrefs)
+
+
+def recipe_links(page_url: str, hrefs: List[str]) -> List[str]:
+    """Links som fundet (til at hente), én pr. kanonisk URL og sorteret efter den."""
+    urls: Dict[str, str] = {}
+    for href in hrefs:
         full = urljoin(page_url, href)
-        # Opskriftssider
-        if "/opskrifter/" in full and full.endswith("/"):
-            urls.append(full.split("#")[0])
-        # Pagination: fx ?page=2 eller "se flere"
-        if "page=" in full or "se-flere" in full:
-            urls.append(full.split("#")[0])
-    return sorted(set(urls))
-
-
-def write_yaml(recipe: Recipe, out_dir, schema: str = "rich", overwrite: bool = False, per_person: bool = False):
-    out_dir = Path(out_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
-    filename = slugify(recipe.title or "opskrift")
-
-    out_path = out_dir / f"{filename}.yml"
-    if not overwrite and out_path.exists():
-        i = 2
-        while True:
-            candidate = out_dir / f"{filename}-{i}.yml"
-            if not candidate.exists():
-                out_path = candidate
-                break
-            i += 1
+        # Opskriftssider, og pagination: fx ?page=2 eller "se flere"
+        if ("/opskrifter/" in full and full.endswith("/")) or "page=" in full or "se-flere" in full:
+            urls.setdefault(canonical_url(full), full)
+    return [urls[key] for key in sorted(urls)]
 
-    data = recipe.to_yaml_dict_rich() if schema == "rich" else recipe.to_yaml_dict_simple(per_person=per_person)
-    with out_path.open("w", encoding="utf-8") as f:
-        yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
-    return out_path
 
+def recipe_data(recipe: Recipe, schema: str = "rich", per_person: bool = False) -> Dict[str, Any]:
+    return recipe.to_yaml_dict_rich() if schema == "rich" else recipe.to_yaml_dict_simple(per_person=per_person)
 
-def crawl(start_urls: List[str], max_depth: int, sleep: float, schema: str,
-          per_person: bool, overwrite: bool, out_dir: str) -> int:
-    visited = set()
-    queue = deque([(url, 0) for url in start_urls])
-    ok = 0
 
-    while queue:
-        url, depth = queue.popleft()
-        if url in visited or depth > max_depth:
-            continue
-        visited.add(url)
+# ---------- Dubletter ----------
 
-        sys.stderr.write(f"[depth {depth}] Henter {url}\n")
-        html = fetch(url)
-        if not html:
+# Query-parametre der kun bruges til sporing og aldrig ændrer siden
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "mc_cid", "mc_eid",
+                   "igshid", "_ga", "_gl", "yclid", "ref", "ref_src"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+@lru_cache(maxsize=65536)  # de samme navigations-links går igen på hver side
+def canonical_url(url: Optional[str]) -> Optional[str]:
+    """
+    Samme side -> samme URL: små bogstaver i scheme/host, ingen standardport og
+    intet fragment, utm_* og andre sporingsparametre fjernet, resten af
+    query-strengen sorteret, og stier uden filendelse afsluttet med /.
+    Kun en nøgle til dubletter og crawl-tilstand; siden hentes altid med den
+    URL den blev fundet under, da fx den tilføjede / kan give en anden side.
+    """
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or port == DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+    userinfo = parts.netloc.rpartition("@")[0]
+    if userinfo:
+        netloc = f"{userinfo}@{netloc}"
+    path = parts.path or "/"
+    if not path.endswith("/") and "." not in path.rsplit("/", 1)[-1]:
+        path += "/"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def _norm(value: Any) -> str:
+    return re.sub(r"\s+", " ", str(value)).strip().lower()
+
+
+def content_hash(data: Dict[str, Any]) -> Optional[str]:
+    """
+    Hash af den normaliserede titel, ingredienserne og fremgangsmåden (begge
+    YAML-formater samt "opskrift" fra CLI/GUI). Kun indholdet tæller, ikke
+    filnavnet, så en opskrift har samme hash før og efter den er gemt. None hvis
+    der hverken er ingredienser eller fremgangsmåde - så er der intet at
+    sammenligne, og opskriften er aldrig en dublet på indhold.
+    """
+    ingredients = data.get("ingredienser") or []
+    if isinstance(ingredients, dict):
+        ingredients = sorted(f"{_norm(k)}: {_norm(v)}" for k, v in ingredients.items())
+    else:
+        ingredients = [_norm(line) for line in ensure_list(ingredients)]
+    steps = first_non_empty(data.get("fremgangsmåde"), data.get("fremgangsmaade"), data.get("opskrift")) or []
+    steps = [s for s in (_norm(s) for s in ensure_list(steps)) if s]
+    if not ingredients and not steps:
+        return None
+    payload = [_norm(data.get("titel") or ""), ingredients, steps]
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def source_url_of(data: Dict[str, Any]) -> Optional[str]:
+    metadata = data.get("metadata")
+    return canonical_url(metadata.get("kilde_url")) if isinstance(metadata, dict) else None
+
+
+class DedupIndex:
+    """
+    De opskrifter der allerede er gemt, slået op på kanonisk kilde-URL og på
+    indholdshash. Indlæses én gang pr. crawl, så dubletter findes i O(1), og
+    frie filnavne (navn-2.yml, ...) findes uden at stat'e filer i en løkke.
+    """
+
+    def __init__(self, files: Dict[str, Dict[str, Any]]):
+        self.by_url: Dict[str, str] = {}
+        self.by_hash: Dict[str, str] = {}
+        self.hash_of: Dict[str, str] = {}
+        self.files = set()
+        self.next_suffix: Dict[str, int] = {}
+        for name in sorted(files, key=_keep_order):
+            self.add(name, files[name] or {})
+
+    @classmethod
+    def load(cls, out_dir) -> "DedupIndex":
+        try:
+            # Kataloget gemmes ikke: det ville lande i mappen over out_dir
+            posts = lagring.aktiv().load_opskrifter(str(out_dir), gem_katalog=False)
+        except FileNotFoundError:
+            posts = {}
+        files = {name: post[3] for name, post in posts.items()}
+        files.update((name, post[3]) for name, post in lagring.JsonlBundle(str(out_dir)).læs())
+        return cls(files)
+
+    def find(self, url: str, data: Dict[str, Any]) -> Tuple[Optional[str], bool]:
+        """(eksisterende fil, samme_side). samme_side=False betyder samme opskrift fra en anden URL."""
+        name = self.by_url.get(canonical_url(url))
+        if name:
+            return name, True
+        h = content_hash(data)
+        return (self.by_hash.get(h) if h else None), False
+
+    def free_name(self, title: Optional[str]) -> str:
+        stem = slugify(title or "opskrift")
+        name = f"{stem}.yml"
+        i = self.next_suffix.get(stem, 2)
+        while name in self.files:
+            name = f"{stem}-{i}.yml"
+            i += 1
+        self.next_suffix[stem] = i
+        return name
+
+    def add(self, name: str, data: Dict[str, Any], url: Optional[str] = None) -> None:
+        old = self.hash_of.pop(name, None)
+        if old and self.by_hash.get(old) == name:
+            del self.by_hash[old]
+        h = content_hash(data)
+        if h:
+            self.hash_of[name] = h
+            self.by_hash.setdefault(h, name)
+        url = canonical_url(url) or source_url_of(data)
+        if url:
+            self.by_url.setdefault(url, name)
+        self.files.add(name)
+
+
+def _keep_order(name: str):
+    # Den fil der beholdes af en gruppe dubletter: uden -N endelse, derefter korteste navn
+    return (re.search(r"-\d+\.yml$", name) is not None, len(name), name)
+
+
+def collapse_duplicates(out_dir, dry_run: bool = True) -> int:
+    """
+    Finder opskrifter der er dubletter (samme kilde-URL eller samme indhold) og
+    sletter dem hvis dry_run=False. Returnerer antallet.
+    """
+    store = lagring.aktiv()
+    posts = store.load_opskrifter(str(out_dir), gem_katalog=False)
+    keep: Dict[str, str] = {}
+    removed = 0
+    for name in sorted(posts, key=_keep_order):
+        data = posts[name][3] or {}
+        keys = [k for k in (source_url_of(data), content_hash(data)) if k]
+        original = next((keep[k] for k in keys if k in keep), None)
+        if original is None:
+            for k in keys:
+                keep[k] = name
             continue
+        sys.stderr.write(f"  {name} er en dublet af {original}{' (dry run)' if dry_run else ''}\n")
+        if not dry_run:
+            store.slet_opskrift(str(out_dir), name)
+        removed += 1
+    return removed
+
+
+class BloomFilter:
+    """Fast størrelse: `capacity` elementer med højst `error_rate` falske positiver."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _indexes(self, item: str):
+        # Dobbelt hashing (Kirsch-Mitzenmacher): k indekser ud af to 64-bit hashes
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.array[i >> 3] & (1 << (i & 7)) for i in self._indexes(item))
+
+    def add(self, item: str) -> None:
+        for i in self._indexes(item):
+            self.array[i >> 3] |= 1 << (i & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter der vokser (Almeida et al.): når et filter er fuldt, tilføjes et nyt
+    med dobbelt kapacitet og strammere fejlrate, så den samlede fejlrate holdes.
+    Bruger ~1,2 byte pr. URL ved 1 % fejlrate, uanset hvor lange URL'erne er.
+    """
+
+    def __init__(self, initial_capacity: int = 100_000, error_rate: float = 0.01):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.filters: List[BloomFilter] = []
+
+    def __contains__(self, item: str) -> bool:
+        return any(item in f for f in self.filters)
+
+    def add(self, item: str) -> None:
+        if not self.filters or self.filters[-1].count >= self.filters[-1].capacity:
+            n = len(self.filters)
+            self.filters.append(BloomFilter(self.initial_capacity * 2 ** n, self.error_rate * 0.5 ** (n + 1)))
+        self.filters[-1].add(item)
+
+    def clear(self) -> None:
+        self.filters = []
+
+
+class CrawlState:
+    """
+    Crawlens tilstand i SQLite, så en afbrudt crawl kan fortsætte (--resume):
+        frontier  - URL'er der mangler, med dybde (i den rækkefølge de blev fundet)
+        visited   - færdige URL'er med dybde
+        outputs   - source_url -> gemt fil, så en opskrift aldrig gemmes som -2, -3 ...
+    Hver side registreres i én transaktion når den er færdig. Med ":memory:"
+    lever tilstanden kun så længe crawlen kører.
+
+    URL'er nøgles på canonical_url, men frontier husker også URL'en som den blev
+    fundet (fetch_url), og det er den der hentes. Om en URL er set før, afgøres af et
+    skalerbart Bloom filter i hukommelsen; kun når filteret siger "måske", slås
+    den op i frontier/visited på disken. Hukommelsen vokser derfor ikke med
+    URL'ernes længde, og samme side lægges aldrig i køen to gange.
+    """
+
+    def __init__(self, path=":memory:"):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path))
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS frontier (
+                id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, depth INTEGER NOT NULL, fetch_url TEXT);
+            CREATE INDEX IF NOT EXISTS frontier_depth ON frontier(depth, id);
+            CREATE TABLE IF NOT EXISTS visited (
+                url TEXT PRIMARY KEY, depth INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS outputs (
+                source_url TEXT PRIMARY KEY, file TEXT NOT NULL) WITHOUT ROWID;
+        """)
+        if "fetch_url" not in {row[1] for row in self.db.execute("PRAGMA table_info(frontier)")}:
+            self.db.execute("ALTER TABLE frontier ADD COLUMN fetch_url TEXT")  # tilstand fra før kolonnen
+        self.seen = ScalableBloomFilter()
+        for table in ("frontier", "visited"):
+            for url, in self.db.execute(f"SELECT url FROM {table}"):
+                self.seen.add(url)
+
+    def is_seen(self, url: str) -> bool:
+        if url not in self.seen:
+            return False  # Bloom filteret har ingen falske negativer
+        return self.db.execute("SELECT 1 FROM frontier WHERE url = ? UNION ALL "
+                               "SELECT 1 FROM visited WHERE url = ?", (url, url)).fetchone() is not None
+
+    def _enqueue(self, urls: List[str], depth: int) -> None:
+        new = []
+        for url in urls:
+            key = canonical_url(url)
+            if key and not self.is_seen(key):
+                self.seen.add(key)
+                new.append((key, url, depth))
+        self.db.executemany("INSERT OR IGNORE INTO frontier (url, fetch_url, depth) VALUES (?, ?, ?)", new)
+
+    def start(self, urls: List[str]) -> None:
+        """Ny crawl: glemmer frontier og visited, men husker hvilke filer opskrifterne har."""
+        with self.db:
+            self.db.execute("DELETE FROM frontier")
+            self.db.execute("DELETE FROM visited")
+        self.seen.clear()
+        self.add(urls, 0)
+
+    def add(self, urls: List[str], depth: int) -> None:
+        with self.db:
+            self._enqueue(urls, depth)
+
+    def min_depth(self) -> Optional[int]:
+        """Det laveste niveau der mangler i frontier, eller None når crawlen er færdig."""
+        return self.db.execute("SELECT MIN(depth) FROM frontier").fetchone()[0]
+
+    def level_batches(self, depth: int, limit: int = 1000) -> Iterator[List[str]]:
+        """
+        URL'erne på ét niveau i bidder af op til `limit`, i den rækkefølge de blev
+        fundet, så hele frontier aldrig skal ligge i hukommelsen. Bidderne hentes
+        efter id, så det er sikkert at kalde done() mens der itereres.
+        """
+        last = 0
+        while True:
+            rows = self.db.execute("SELECT id, COALESCE(fetch_url, url) FROM frontier WHERE depth = ? AND id > ? "
+                                   "ORDER BY id LIMIT ?", (depth, last, limit)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield [url for _, url in rows]
+
+    def output_file(self, source_url: str) -> Optional[str]:
+        row = self.db.execute("SELECT file FROM outputs WHERE source_url = ?",
+                              (canonical_url(source_url),)).fetchone()
+        return row[0] if row else None
+
+    def done(self, url: str, depth: int, links: List[str], file: Optional[str] = None) -> None:
+        """Siden er færdig: flyt den til visited, læg dens links i frontier og husk filen."""
+        self.done_many([(url, depth, links, file)])
+
+    def done_many(self, pages: List[Tuple[str, int, List[str], Optional[str]]]) -> None:
+        """Som done() for en hel bid (url, depth, links, file) i én transaktion."""
+        with self.db:
+            for url, depth, links, file in pages:
+                url = canonical_url(url)
+                self.db.execute("INSERT OR REPLACE INTO visited VALUES (?, ?)", (url, depth))
+                self.db.execute("DELETE FROM frontier WHERE url = ?", (url,))
+                self._enqueue(links, depth + 1)
+                if file:
+                    self.db.execute("INSERT OR REPLACE INTO outputs VALUES (?, ?)", (url, file))
+
+    def close(self) -> None:
+        self.db.close()
+
+
+# ---------- Pipeline ----------
+
+def fetch_stage(url: str, depth: int, limiter: Optional[HostRateLimiter] = None,
+                validators: Optional[ValidatorStore] = None) -> Tuple[Optional[str], Any]:
+    """
+    Hente-trinnet (I/O). Returnerer (html, (etag, last_modified)) når siden skal
+    parses, og (None, links) når den ikke skal: gemte links ved 304, [] ved fejl.
+    """
+    sys.stderr.write(f"[depth {depth}] Henter {url}\n")
+    cached = validators.get(url) if validators else None
+    headers = {}
+    if cached:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    r = fetch_response(url, limiter=limiter, headers=headers)
+    if r is None:
+        return None, []
+    if r.status_code == 304 and cached:
+        sys.stderr.write("  -> uændret (304)\n")
+        with validators.lock:
+            validators.not_modified += 1
+        return None, cached[2]
+    if not r.text:
+        return None, []
+    return r.text, (r.headers.get("ETag"), r.headers.get("Last-Modified"))
+
+
+def parse_stage(url: str, html: str) -> Tuple[List[str], Optional[Recipe]]:
+    """
+    Parse-trinnet (CPU): links og opskrift fra én gennemgang af siden.
+    Ligger på modulniveau, så den kan sendes til en ProcessPoolExecutor.
+    """
+    blocks, hrefs, title = extract_page(html)
+    return recipe_links(url, hrefs), recipe_from_blocks(url, blocks, title)
+
+
+def _parse_timed(url: str, html: str) -> Tuple[List[str], Optional[Recipe], float]:
+    # parse_stage med CPU-tiden målt der hvor den kører (tråd eller proces)
+    start = time.perf_counter()
+    links, recipe = parse_stage(url, html)
+    return links, recipe, time.perf_counter() - start
 
-        found_links = collect_recipe_links(url, html)
-        if found_links and depth < max_depth:
-            for link in found_links:
-                if link not in visited:
-                    queue.append((link, depth + 1))
 
-        recipe = scrape_one(url)
-        if recipe:
-            path = write_yaml(recipe, out_dir, schema=schema,
-                              overwrite=overwrite, per_person=per_person)
-            sys.stderr.write(f"  -> gemt: {path}\n")
-            ok += 1
+@dataclass
+class CrawlStats:
+    """Tællere for en crawl; tiderne er summeret over alle tråde/processer i trinnet."""
+    pages: int = 0      # hentede sider (inkl. fejl og 304)
+    parsed: int = 0     # parsede sider
+    recipes: int = 0    # skrevne opskrifter
+    fetch_s: float = 0.0
+    parse_s: float = 0.0
+    write_s: float = 0.0
+    wall_s: float = 0.0  # hele crawlen
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, **counts: float) -> None:
+        with self.lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+
+class CrawlPipeline:
+    """
+    Crawlens tre trin, forbundet af begrænsede køer:
+        fetch  - `fetchers` tråde henter sider (I/O; GIL'en frigives under ventetiden)
+        parse  - `parsers` processer kører parse_stage, så parsning skalerer med
+                 antallet af kerner. Med parsers=0 parses i hente-trådene.
+        write  - én skriver: den tråd der itererer over run(), og som får
+                 resultaterne i samme rækkefølge som URL'erne blev lagt i.
+    Der er højst `queue_size` sider undervejs i alt. Er et trin for langsomt,
+    fyldes køen foran det og der lægges ikke flere sider i pipelinen
+    (backpressure). Kødybderne skrives til stderr hvert `report_every` sekund;
+    trinnet med den fulde kø foran sig er flaskehalsen.
+    """
+
+    def __init__(self, fetchers: int = 1, parsers: int = 0, queue_size: int = 64,
+                 limiter: Optional[HostRateLimiter] = None,
+                 validators: Optional[ValidatorStore] = None, report_every: float = 5.0,
+                 stats: Optional[CrawlStats] = None):
+        fetchers = max(1, fetchers)
+        self.queue_size = max(queue_size, fetchers)
+        self.limiter = limiter
+        self.validators = validators
+        self.stats = stats or CrawlStats()
+        self.fetch_q: "queue.Queue" = queue.Queue(self.queue_size)
+        self.write_q: "queue.Queue" = queue.Queue(self.queue_size)
+        self.pool = ProcessPoolExecutor(max_workers=parsers) if parsers > 0 else None
+        self.parsing = 0
+        self.lock = threading.Lock()
+        self.report_every = report_every
+        self.last_report = time.monotonic()
+        self.max_depths = {"fetch": 0, "parse": 0, "write": 0}
+        self.threads = [threading.Thread(target=self._fetch_loop, daemon=True) for _ in range(fetchers)]
+        for t in self.threads:
+            t.start()
+
+    def __enter__(self) -> "CrawlPipeline":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _parsed(self, _future: Future) -> None:
+        with self.lock:
+            self.parsing -= 1
+
+    def _fetch_loop(self) -> None:
+        while True:
+            item = self.fetch_q.get()
+            if item is None:
+                return
+            seq, url, depth = item
+            result: Any = ([], None, None)  # (links, opskrift, parsetid)
+            validator = None
+            try:
+                start = time.perf_counter()
+                html, info = fetch_stage(url, depth, self.limiter, self.validators)
+                self.stats.add(pages=1, fetch_s=time.perf_counter() - start)
+                result = (info, None, None)
+                if html is not None:
+                    if self.pool:
+                        with self.lock:
+                            self.parsing += 1
+                        try:
+                            future = self.pool.submit(_parse_timed, url, html)
+                        except BaseException:
+                            with self.lock:
+                                self.parsing -= 1
+                            raise
+                        future.add_done_callback(self._parsed)
+                        result = future
+                    else:
+                        result = _parse_timed(url, html)
+                    validator = info
+            except Exception as e:
+                sys.stderr.write(f"[fejl] Kunne ikke hente/parse {url}: {e}\n")
+                result, validator = ([], None, None), None
+            finally:
+                # Altid et resultat for seq, ellers venter run() for evigt på det
+                self.write_q.put((seq, url, result, validator))
+
+    def _resolve(self, url: str, result: Any, validator) -> Tuple[List[str], Optional[Recipe], Optional[Tuple]]:
+        if isinstance(result, Future):
+            try:
+                result = result.result()
+            except Exception as e:
+                sys.stderr.write(f"[fejl] Kunne ikke parse {url}: {e}\n")
+                return [], None, None
+        links, recipe, parse_s = result
+        if parse_s is not None:
+            self.stats.add(parsed=1, parse_s=parse_s)
+        return links, recipe, (validator + (links,) if validator else None)
+
+    def run(self, batches: Iterable[List[str]], depth: int,
+            max_depth: int) -> Iterator[Tuple[str, List[str], Optional[Recipe], Optional[Tuple]]]:
+        """
+        Sender alle URL'er i `batches` gennem pipelinen og giver (url, links, opskrift,
+        validator) i samme rækkefølge. validator er (etag, last_modified, links) for
+        en side der blev hentet og parset, og skal gives til ValidatorStore.put når
+        siden er gemt. Bidderne trækkes først, når der er plads i pipelinen.
+        """
+        urls = (url for batch in batches for url in batch)
+        done: Dict[int, Tuple] = {}
+        fed = written = 0
+        while True:
+            while fed - written < self.queue_size:
+                url = next(urls, None)
+                if url is None:
+                    break
+                self.fetch_q.put((fed, url, depth))
+                fed += 1
+            if written == fed:
+                return
+            while written not in done:
+                seq, *rest = self.write_q.get()
+                done[seq] = rest
+            url, result, validator = done.pop(written)
+            written += 1
+            links, recipe, validator = self._resolve(url, result, validator)
+            self.report()
+            yield url, (links if depth < max_depth else []), recipe, validator
+
+    def depths(self) -> Dict[str, int]:
+        """Antal sider der venter på at blive hentet, parset og skrevet lige nu."""
+        return {"fetch": self.fetch_q.qsize(), "parse": self.parsing, "write": self.write_q.qsize()}
+
+    def report(self, force: bool = False) -> None:
+        depths = self.depths()
+        for stage, n in depths.items():
+            self.max_depths[stage] = max(self.max_depths[stage], n)
+        now = time.monotonic()
+        if force or now - self.last_report >= self.report_every:
+            self.last_report = now
+            now_s = "  ".join(f"{k}={v}" for k, v in depths.items())
+            max_s = "  ".join(f"{k}={v}" for k, v in self.max_depths.items())
+            sys.stderr.write(f"[kø] {now_s}  (maks {max_s}, plads {self.queue_size})\n")
+
+    def close(self) -> None:
+        for _ in self.threads:
+            self.fetch_q.put(None)
+        for t in self.threads:
+            t.join()
+        if self.pool:
+            self.pool.shutdown()
+
+
+class RecipeWriter:
+    """
+    Skrive-trinnet. Samler færdige sider og gemmer dem i bidder af `batch_size`:
+    fmt="yaml" gemmer via lagringslaget (.yml filer skrevet atomisk, eller
+    SQLite-rækker i én transaktion), fmt="jsonl" som linjer i et JSONL-bundle i
+    out_dir (lagring.JsonlBundle), som DB_Handler streamer ind.
+    Først når en bids opskrifter er skrevet, registreres siderne i CrawlState og
+    ValidatorStore, så en afbrudt crawl aldrig har besøgte sider uden fil.
+    """
+
+    def __init__(self, out_dir, state: CrawlState, validators: Optional[ValidatorStore] = None,
+                 fmt: str = "yaml", batch_size: int = 50, stats: Optional[CrawlStats] = None):
+        self.out_dir = str(out_dir)
+        self.stats = stats or CrawlStats()
+        self.state = state
+        self.validators = validators
+        self.store = lagring.JsonlBundle(self.out_dir) if fmt == "jsonl" else lagring.aktiv()
+        self.batch_size = batch_size
+        self.recipes: List[Tuple[str, Dict[str, Any]]] = []
+        self.pages: List[Tuple[str, int, List[str], Optional[str]]] = []
+        self.validated: List[Tuple] = []
+
+    def add(self, url: str, depth: int, links: List[str], file: Optional[str] = None,
+            data: Optional[Dict[str, Any]] = None, validator: Optional[Tuple] = None) -> None:
+        if file:
+            self.recipes.append((file, data))
+        self.pages.append((url, depth, links, file))
+        if validator:
+            self.validated.append((url,) + tuple(validator) + (file,))
+        if len(self.pages) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        start = time.perf_counter()
+        if self.recipes:
+            paths = self.store.gem_opskrifter(self.out_dir, self.recipes)
+            for path in dict.fromkeys(paths):
+                sys.stderr.write(f"  -> gemt: {path}\n")
+        if self.validators:
+            self.validators.put_many(self.validated)
+        self.state.done_many(self.pages)
+        self.stats.add(recipes=len(self.recipes), write_s=time.perf_counter() - start)
+        self.recipes, self.pages, self.validated = [], [], []
 
-        if sleep:
-            time.sleep(sleep)
+
+def crawl(start_urls: List[str], max_depth: int, sleep: float, schema: str,
+          per_person: bool, overwrite: bool, out_dir: str,
+          concurrency: int = 1, rate: Optional[float] = None,
+          validators: Optional[ValidatorStore] = None,
+          state: Optional[CrawlState] = None, resume: bool = False,
+          parse_workers: int = 0, queue_size: int = 64, fmt: str = "yaml",
+          stats: Optional[CrawlStats] = None) -> int:
+    """
+    Bredde-først crawl, ét dybdeniveau ad gangen, gennem en CrawlPipeline:
+    op til `concurrency` tråde henter, `parse_workers` processer parser og
+    denne tråd skriver i bidder (RecipeWriter, fmt "yaml" eller "jsonl").
+    Links og opskrifter behandles i samme rækkefølge som ved en sekventiel
+    crawl, så filnavne og dybder er de samme.
+    Høflighed styres pr. host af en token bucket (`rate` forespørgsler/sek,
+    default 1/sleep), i stedet for en global pause. Med en ValidatorStore bliver
+    uændrede sider (304) hverken parset eller skrevet igen, så længe deres fil
+    stadig ligger i out_dir.
+
+    Frontier, besøgte sider og gemte filer ligger i `state` (CrawlState). Med
+    resume=True fortsætter crawlen fra statens frontier i stedet for start_urls,
+    og allerede besøgte sider hentes ikke igen.
+
+    Gives en CrawlStats, tælles sider, opskrifter og tid pr. trin op i den.
+    """
+    if rate is None and sleep:
+        rate = 1.0 / sleep
+    limiter = HostRateLimiter(rate)
+    state = state or CrawlState()
+    dedup = DedupIndex.load(out_dir)
+    if validators:
+        validators.scope(out_dir, dedup.files)
+    if resume:
+        state.add(start_urls, 0)
+    else:
+        state.start(list(dict.fromkeys(start_urls)))
+    stats = stats or CrawlStats()
+    start = time.perf_counter()
+    writer = RecipeWriter(out_dir, state, validators, fmt, stats=stats)
+    ok = 0
+
+    with CrawlPipeline(concurrency, parse_workers, queue_size, limiter, validators, stats=stats) as pipeline:
+        while True:
+            depth = state.min_depth()
+            if depth is None or depth > max_depth:
+                break
+            for url, links, recipe, validator in pipeline.run(state.level_batches(depth), depth, max_depth):
+                file = data = None
+                if recipe:
+                    data = recipe_data(recipe, schema, per_person)
+                    file, same_page = state.output_file(url), True
+                    if file is None:
+                        file, same_page = dedup.find(url, data)
+                    if file and not same_page:
+                        # Samme opskrift nået via en anden URL: gem den ikke igen
+                        sys.stderr.write(f"  -> dublet af {file}, springes over\n")
+                        file = None
+                    else:
+                        # Kendt side: opdateres i sin egen fil. Ny side: nyt ledigt navn
+                        if file is None:
+                            file = f"{slugify(recipe.title or 'opskrift')}.yml" if overwrite \
+                                else dedup.free_name(recipe.title)
+                        dedup.add(file, data, url)
+                        ok += 1
+                writer.add(url, depth, links, file, data, validator)
+            # Niveauet skal ligge i frontier før det næste kan startes
+            writer.flush()
+        pipeline.report(force=True)
+    stats.add(wall_s=time.perf_counter() - start)
 
     return ok
 
@@ -415,7 +1348,7 @@ def main(argv: Optional[List[str]] = None) -> int:
     parser.add_argument("--urls-file", help="Sti til tekstfil med URLer, en pr linje")
     parser.add_argument(
         "--out-dir",
-        default=r"C:\Users\oller\OneDrive\Desktop\KOD - Food saver\DB\Opskrifter",
+        default=lagring.OPSKRIFT_MAPPE,
         help="Mappe til .yml output"
     )
     parser.add_argument("--schema", choices=["rich", "simple"], default="rich",
@@ -423,11 +1356,45 @@ def main(argv: Optional[List[str]] = None) -> int:
     parser.add_argument("--per-person", action="store_true",
                         help="Ved simple schema: ingredienser pr. person")
     parser.add_argument("--overwrite", action="store_true", help="Overskriv eksisterende filer")
-    parser.add_argument("--sleep", type=float, default=0.0, help="Pause i sekunder mellem forespørgsler")
+    parser.add_argument("--sleep", type=float, default=0.0,
+                        help="Pause i sekunder mellem forespørgsler til samme host")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Antal sider der hentes samtidig (default 1)")
+    parser.add_argument("--format", choices=["yaml", "jsonl"], default="yaml",
+                        help="yaml: én fil pr. opskrift; jsonl: ét sharded NDJSON-bundle i --out-dir")
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="Antal processer der parser sider (default 0: parses i hente-trådene)")
+    parser.add_argument("--queue-size", type=int, default=64,
+                        help="Maks antal sider undervejs mellem pipelinens trin (default 64)")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Højst så mange forespørgsler i sekundet pr. host (default 1/--sleep)")
+    parser.add_argument("--validators", default=str(Path(lagring.DB_MAPPE) / "http_validators.sqlite3"),
+                        help="Fil med ETag/Last-Modified fra sidste crawl (uændrede sider springes over)")
+    parser.add_argument("--full-refresh", action="store_true",
+                        help="Hent og gem alle sider igen, også dem der er uændrede")
+    parser.add_argument("--state", default=str(Path(lagring.DB_MAPPE) / "crawl_state.sqlite3"),
+                        help="Fil med crawlens frontier, besøgte sider og gemte filer")
+    parser.add_argument("--resume", action="store_true",
+                        help="Fortsæt en afbrudt crawl fra --state i stedet for at starte forfra")
+    parser.add_argument("--collapse-duplicates", action="store_true",
+                        help="Vis dubletter (samme kilde-URL eller indhold) i --out-dir og afslut")
+    parser.add_argument("--apply", action="store_true",
+                        help="Med --collapse-duplicates: slet dubletterne i stedet for kun at vise dem")
+    cache = parser.add_mutually_exclusive_group()
+    cache.add_argument("--record", metavar="DIR",
+                       help="Gem alle hentede sider i en replay-cache i DIR (til offline test/benchmark)")
+    cache.add_argument("--replay", metavar="DIR",
+                       help="Hent kun fra replay-cachen i DIR, uden netværk")
     parser.add_argument("--depth", type=int, default=5, help="Hvor dybt crawleren må følge links (default 5)")
     args = parser.parse_args(argv)
 
     out_dir = args.out_dir
+    if args.collapse_duplicates:
+        removed = collapse_duplicates(out_dir, dry_run=not args.apply)
+        verb = "slettet" if args.apply else "ville blive slettet (brug --apply for at slette)"
+        sys.stderr.write(f"{removed} dubletter {verb} i {out_dir}\n")
+        return 0
+
     all_urls: List[str] = []
     all_urls.extend(args.urls or [])
     if args.urls_file:
@@ -441,16 +1408,37 @@ def main(argv: Optional[List[str]] = None) -> int:
             sys.stderr.write(f"[fejl] Kunne ikke læse {args.urls_file}: {e}\n")
             return 2
 
-    if not all_urls:
-        sys.stderr.write("Brug: angiv mindst én URL eller en --urls-file\n")
+    if not all_urls and not args.resume:
+        sys.stderr.write("Brug: angiv mindst én URL eller en --urls-file (eller --resume)\n")
         return 1
 
-    ok = crawl(all_urls, max_depth=args.depth, sleep=args.sleep,
-               schema=args.schema, per_person=args.per_person,
-               overwrite=args.overwrite, out_dir=out_dir)
-
-    sys.stderr.write(f"Færdig. {ok} opskrifter gemt i {out_dir}\n")
-    return 0 if ok > 0 else 3
+    replay = None
+    if args.record or args.replay:
+        replay = ReplayCache(args.record or args.replay, "record" if args.record else "replay")
+        set_replay_cache(replay)
+    validators = ValidatorStore(args.validators)
+    state = CrawlState(args.state)
+    if args.full_refresh:
+        validators.scope(out_dir)
+        validators.clear()
+    try:
+        ok = crawl(all_urls, max_depth=args.depth, sleep=args.sleep,
+                   schema=args.schema, per_person=args.per_person,
+                   overwrite=args.overwrite, out_dir=out_dir,
+                   concurrency=args.concurrency, rate=args.rate,
+                   parse_workers=args.parse_workers, queue_size=args.queue_size, fmt=args.format,
+                   validators=validators, state=state, resume=args.resume)
+        unchanged, refetched = validators.not_modified, validators.refetched
+    finally:
+        validators.close()
+        state.close()
+        if replay:
+            set_replay_cache(None)
+            replay.close()
+
+    sys.stderr.write(f"Færdig. {ok} opskrifter gemt i {out_dir} ({unchanged} sider uændrede"
+                     f"{f', {refetched} hentet igen fordi filen manglede' if refetched else ''})\n")
+    return 0 if ok > 0 or unchanged > 0 else 3
 
 
 if __name__ == "__main__":
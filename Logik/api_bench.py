@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lokal belastningstest af server.py (anmodninger/sek og p50/p99-svartid).
+
+Opretter `--brugere` testbrugere med hvert sit lager og lader `--forbindelser`
+samtidige keep-alive forbindelser søge opskrifter og ændre lagre i `--sekunder`.
+Uden --url startes serveren selv i en underproces med brugerne i en midlertidig
+mappe, så de rigtige brugere ikke røres.
+
+Eksempler (fra Logik-mappen):
+    python api_bench.py --brugere 50 --forbindelser 32 --sekunder 10
+    python server.py --port 8080 --bruger-mappe /tmp/bench_brugere
+    python api_bench.py --url http://127.0.0.1:8080 --søgeandel 0.5
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode, urlsplit
+
+INGREDIENSER = ["hvedemel", "sukker", "smør", "mælk", "æg", "løg", "hvidløg", "gulerødder",
+                "kartofler", "tomater", "fløde", "parmesan", "pasta", "ris", "kyllingebryst",
+                "hakket oksekød", "citron", "persille", "basilikum", "olivenolie"]
+MÆNGDER = ["500 g", "1 l", "2 dl", "6 stk", "250 g", "3 spsk", 4]
+
+
+class Klient:
+    """Én keep-alive forbindelse til serveren; én anmodning ad gangen"""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def kald(self, metode: str, sti: str, krop=None, token: Optional[str] = None) -> Tuple[int, dict]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(krop, ensure_ascii=False).encode("utf-8") if krop is not None else b""
+        hoved = f"{metode} {sti} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nContent-Length: {len(data)}\r\n"
+        if krop is not None:
+            hoved += "Content-Type: application/json\r\n"
+        if token:
+            hoved += f"Authorization: Bearer {token}\r\n"
+        self.writer.write(hoved.encode("latin-1") + b"\r\n" + data)
+        svar = await self.reader.readuntil(b"\r\n\r\n")
+        linjer = svar.decode("latin-1").split("\r\n")
+        status = int(linjer[0].split(" ", 2)[1])
+        headers = dict((k.strip().lower(), v.strip()) for k, v in
+                       (linje.split(":", 1) for linje in linjer[1:] if ":" in linje))
+        krop_svar = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            await self.luk()
+        return status, json.loads(krop_svar or b"{}")
+
+    async def luk(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+async def opret_brugere(host: str, port: int, antal: int, rnd: random.Random) -> List[str]:
+    """Opretter og logger testbrugerne ind, hver med et tilfældigt lager; giver deres tokens"""
+    klient = Klient(host, port)
+    tokens = []
+    try:
+        for i in range(antal):
+            bruger = {"brugernavn": f"bench-{i}", "password": "bench"}
+            status, svar = await klient.kald("POST", "/brugere", bruger)
+            if status not in (201, 409):
+                raise RuntimeError(f"Kunne ikke oprette {bruger['brugernavn']}: {svar}")
+            status, svar = await klient.kald("POST", "/login", bruger)
+            if status != 200:
+                raise RuntimeError(f"Kunne ikke logge {bruger['brugernavn']} ind: {svar}")
+            token = svar["token"]
+            for ing in rnd.sample(INGREDIENSER, rnd.randint(5, 10)):
+                await klient.kald("PUT", f"/lager/{quote(ing)}", {"mængde": rnd.choice(MÆNGDER)}, token)
+            tokens.append(token)
+    finally:
+        await klient.luk()
+    return tokens
+
+
+async def arbejder(host: str, port: int, tokens: List[str], args, slut: float, opvarmet: float,
+                   målinger: Dict[str, List[float]], fejl: Dict[str, int], rnd: random.Random) -> None:
+    klient = Klient(host, port)
+    try:
+        while True:
+            start = time.perf_counter()
+            if start >= slut:
+                return
+            token = rnd.choice(tokens)
+            if rnd.random() < args.søgeandel:
+                art = "søg"
+                query = urlencode({"personer": rnd.randint(1, 4), "antal": args.antal,
+                                   "sortering": rnd.choice(["mangler", "mængde", "tid", "forbrug"])})
+                status, _ = await klient.kald("GET", f"/opskrifter?{query}", token=token)
+            else:
+                art = "lager"
+                # PUT sætter mængden; POST ville give 409 når enhederne ikke passer sammen
+                status, _ = await klient.kald("PUT", f"/lager/{quote(rnd.choice(INGREDIENSER))}",
+                                              {"mængde": rnd.choice(MÆNGDER)}, token)
+            if start < opvarmet:
+                continue
+            målinger[art].append(time.perf_counter() - start)
+            if status >= 400:
+                fejl[art] += 1
+    finally:
+        await klient.luk()
+
+
+def percentil(sorteret: List[float], p: float) -> float:
+    return sorteret[max(0, math.ceil(p / 100 * len(sorteret)) - 1)]
+
+
+def rapport(målinger: Dict[str, List[float]], fejl: Dict[str, int], sekunder: float) -> None:
+    alle = sorted(t for tider in målinger.values() for t in tider)
+    if not alle:
+        print("Ingen anmodninger gennemført")
+        return
+    print(f"{len(alle)} anmodninger på {sekunder:.1f} s: {len(alle) / sekunder:.0f} anmodninger/sek")
+    print(f"{'':8}{'antal':>8}{'fejl':>6}{'p50 ms':>9}{'p99 ms':>9}{'maks ms':>9}")
+    for art, tider in sorted(målinger.items()) + [("i alt", alle)]:
+        tider = sorted(tider)
+        n_fejl = sum(fejl.values()) if art == "i alt" else fejl[art]
+        print(f"{art:8}{len(tider):>8}{n_fejl:>6}{percentil(tider, 50) * 1000:>9.2f}"
+              f"{percentil(tider, 99) * 1000:>9.2f}{tider[-1] * 1000:>9.2f}")
+
+
+def start_server(bruger_mappe: str) -> Tuple[subprocess.Popen, str]:
+    """server.py i en underproces på en ledig port; giver (proces, url)"""
+    proces = subprocess.Popen([sys.executable, str(Path(__file__).with_name("server.py")), "--port", "0",
+                               "--opdater", "0", "--bruger-mappe", bruger_mappe],
+                              stderr=subprocess.PIPE, text=True, encoding="utf-8")
+    for linje in proces.stderr:
+        sys.stderr.write(linje)
+        træf = re.search(r"lytter på (http://\S+)", linje)
+        if træf:
+            # Resten af serverens log videresendes, så pipen aldrig bliver fuld
+            threading.Thread(target=lambda: sys.stderr.writelines(proces.stderr), daemon=True).start()
+            return proces, træf.group(1)
+    proces.wait()
+    raise RuntimeError(f"server.py stoppede (kode {proces.returncode})")
+
+
+async def kør(url: str, args) -> None:
+    dele = urlsplit(url)
+    host, port = dele.hostname, dele.port or 80
+    rnd = random.Random(args.seed)
+    tokens = await opret_brugere(host, port, args.brugere, rnd)
+
+    målinger: Dict[str, List[float]] = defaultdict(list)
+    fejl: Dict[str, int] = defaultdict(int)
+    start = time.perf_counter()
+    opvarmet = start + args.opvarmning
+    slut = opvarmet + args.sekunder
+    await asyncio.gather(*(arbejder(host, port, tokens, args, slut, opvarmet, målinger, fejl,
+                                    random.Random(args.seed + i + 1))
+                           for i in range(args.forbindelser)))
+    rapport(målinger, fejl, time.perf_counter() - opvarmet)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Belastningstest af server.py")
+    parser.add_argument("--url", help="En kørende server (ellers startes en midlertidig)")
+    parser.add_argument("--brugere", type=int, default=20, help="Antal testbrugere")
+    parser.add_argument("--forbindelser", type=int, default=16, help="Samtidige forbindelser")
+    parser.add_argument("--sekunder", type=float, default=10.0, help="Målingens længde")
+    parser.add_argument("--opvarmning", type=float, default=1.0, help="Sekunder før målingen starter")
+    parser.add_argument("--søgeandel", type=float, default=0.8, help="Andel af anmodninger der er søgninger")
+    parser.add_argument("--antal", type=int, default=10, help="Opskrifter pr. søgning")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    proces, mappe = None, None
+    try:
+        url = args.url
+        if not url:
+            mappe = tempfile.mkdtemp(prefix="api_bench_")
+            proces, url = start_server(mappe)
+        asyncio.run(kør(url, args))
+    finally:
+        if proces:
+            proces.terminate()
+            proces.wait()
+        if mappe:
+            shutil.rmtree(mappe, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
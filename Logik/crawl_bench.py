@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark af hele WebScraber.crawl (hent -> parse -> skriv), uden live-sitet.
+
+To kilder til siderne:
+    --replay DIR   en replay-cache optaget med `WebScraber.py --record DIR ...`;
+                   intet net, så målingen viser parse- og skrivetiden
+    (ellers)       en lokal stand-in server med syntetiske opskriftssider og en
+                   fast svartid pr. side, til test af concurrency og rate limits
+
+Rapporterer sider/sek, og ms pr. side for hent og parse og ms pr. opskrift
+for skriv. Hvert gennemløb skriver til en ny midlertidig mappe.
+
+Eksempler (fra Logik-mappen):
+    python WebScraber.py --record bench_cache https://www.valdemarsro.dk/opskrifter/ --depth 2
+    python crawl_bench.py run --replay bench_cache https://www.valdemarsro.dk/opskrifter/ --depth 2
+    python crawl_bench.py run --pages 300 --latency 0.05 --concurrency 8 --parse-workers 4
+    python crawl_bench.py serve --pages 300 --port 8765
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlsplit
+
+import WebScraber as ws
+
+INGREDIENSER = ["hvedemel", "sukker", "smør", "mælk", "æg", "løg", "hvidløg", "gulerødder",
+                "kartofler", "tomater", "fløde", "parmesan", "pasta", "ris", "kyllingebryst",
+                "hakket oksekød", "citron", "persille", "basilikum", "olivenolie"]
+ENHEDER = ["g", "dl", "stk", "spsk", "tsk"]
+
+
+def syntetisk_opskrift(i: int, pages: int) -> str:
+    """En opskriftsside med JSON-LD; ingredienserne varierer, så ingen sider er dubletter."""
+    ingr = [f"{(i * 7 + j * 3) % 500 + 1} {ENHEDER[(i + j) % len(ENHEDER)]} "
+            f"{INGREDIENSER[(i * 3 + j * 5) % len(INGREDIENSER)]}" for j in range(4 + i % 6)]
+    ld = {"@context": "https://schema.org", "@type": "Recipe", "name": f"Ret nummer {i}",
+          "recipeYield": str(2 + i % 4), "recipeIngredient": ingr, "totalTime": f"PT{10 + i % 50}M",
+          "recipeInstructions": [{"@type": "HowToStep", "text": f"Trin {n + 1} af ret {i}."} for n in range(3)]}
+    links = "".join(f'<li><a href="/opskrifter/ret-{(i + k) % pages}/">Ret {(i + k) % pages}</a></li>'
+                    for k in (1, 2, 3))
+    fyld = "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>" * 40
+    return (f'<!doctype html><html><head><title>Ret nummer {i}</title>'
+            f'<script type="application/ld+json">{json.dumps(ld, ensure_ascii=False)}</script></head>'
+            f'<body><nav><a href="/">Forside</a><a href="/opskrifter/">Opskrifter</a></nav>'
+            f'<article>{fyld}</article><ul>{links}</ul></body></html>')
+
+
+def syntetisk_oversigt(side: int, pages: int, pr_side: int = 50) -> str:
+    start = side * pr_side
+    links = "".join(f'<a href="/opskrifter/ret-{i}/">Ret {i}</a>' for i in range(start, min(start + pr_side, pages)))
+    if start + pr_side < pages:
+        links += f'<a href="/opskrifter/?page={side + 2}">Se flere</a>'
+    return f"<html><head><title>Opskrifter</title></head><body>{links}</body></html>"
+
+
+class StandInServer:
+    """
+    Lokal HTTP-server (én tråd pr. forbindelse, keep-alive) der ligner sitet:
+    /opskrifter/ med pagination og /opskrifter/ret-N/ med JSON-LD. Med en
+    ReplayCache serveres de optagne sider i stedet, med sitets egen adresse
+    skrevet om til serverens. Svarer 304 på If-None-Match, og venter `latency`
+    sekunder pr. forespørgsel.
+    """
+
+    def __init__(self, pages: int = 200, latency: float = 0.0, port: int = 0,
+                 cache: Optional[ws.ReplayCache] = None):
+        self.pages = pages
+        self.latency = latency
+        self.cache = cache
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.paths = {}
+        if cache:
+            for url in cache.urls():
+                parts = urlsplit(url)
+                self.paths[parts.path + (f"?{parts.query}" if parts.query else "")] = url
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                found = server.body(self.path)
+                if found is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body, content_type = found
+                etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def body(self, path: str):
+        """(krop, content-type) for en sti, eller None"""
+        if self.cache:
+            url = self.paths.get(path)
+            hit = self.cache.get(url) if url else None
+            if hit is None:
+                return None
+            _, headers, body = hit
+            parts = urlsplit(url)
+            body = body.replace(f"{parts.scheme}://{parts.netloc}".encode(), self.base_url.encode())
+            return body, headers.get("Content-Type", "text/html; charset=utf-8")
+        parts = urlsplit(path)
+        if parts.path == "/opskrifter/":
+            side = int(dict(p.split("=", 1) for p in parts.query.split("&") if "=" in p).get("page", 1)) - 1
+            html = syntetisk_oversigt(side, self.pages)
+        elif parts.path.startswith("/opskrifter/ret-"):
+            try:
+                i = int(parts.path.rstrip("/").rsplit("-", 1)[1])
+            except ValueError:
+                return None
+            if not 0 <= i < self.pages:
+                return None
+            html = syntetisk_opskrift(i, self.pages)
+        else:
+            return None
+        return html.encode("utf-8"), "text/html; charset=utf-8"
+
+    def start(self) -> "StandInServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def run_once(urls, args) -> ws.CrawlStats:
+    out_dir = tempfile.mkdtemp(prefix="crawl_bench_")
+    stats = ws.CrawlStats()
+    state = ws.CrawlState()
+    try:
+        ws.crawl(urls, max_depth=args.depth, sleep=0, schema=args.schema, per_person=False,
+                 overwrite=False, out_dir=out_dir, concurrency=args.concurrency, rate=args.rate,
+                 state=state, parse_workers=args.parse_workers, queue_size=args.queue_size,
+                 fmt=args.format, stats=stats)
+    finally:
+        state.close()
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return stats
+
+
+def report(stats: ws.CrawlStats, runs: int) -> None:
+    def ms(total, n):
+        return total / n * 1000 if n else 0.0
+    print(f"{stats.pages} sider, {stats.recipes} opskrifter, {stats.wall_s:.2f} s (bedste af {runs})")
+    print(f"sider/sek         : {stats.pages / stats.wall_s:8.1f}")
+    print(f"hent  ms/side     : {ms(stats.fetch_s, stats.pages):8.2f}  (summeret over trådene)")
+    print(f"parse ms/side     : {ms(stats.parse_s, stats.parsed):8.2f}")
+    print(f"skriv ms/opskrift : {ms(stats.write_s, stats.recipes):8.2f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reproducerbar benchmark af WebScraber.crawl")
+    under = parser.add_subparsers(dest="kommando", required=True)
+
+    serve = under.add_parser("serve", help="Start stand-in serveren og vent")
+    run = under.add_parser("run", help="Kør crawlen og mål den")
+    for p in (serve, run):
+        p.add_argument("--pages", type=int, default=200, help="Antal syntetiske opskriftssider")
+        p.add_argument("--latency", type=float, default=0.0, help="Svartid pr. side i sekunder")
+        p.add_argument("--cache", help="Servér en replay-cache i stedet for syntetiske sider")
+    serve.add_argument("--port", type=int, default=8765)
+
+    run.add_argument("urls", nargs="*", help="Start-URLer (kun med --replay)")
+    run.add_argument("--replay", metavar="DIR", help="Kør offline fra en replay-cache")
+    run.add_argument("--runs", type=int, default=3, help="Antal gennemløb; det bedste tæller")
+    run.add_argument("--depth", type=int, default=5)
+    run.add_argument("--schema", choices=["rich", "simple"], default="rich")
+    run.add_argument("--format", choices=["yaml", "jsonl"], default="yaml")
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--parse-workers", type=int, default=0)
+    run.add_argument("--queue-size", type=int, default=64)
+    run.add_argument("--rate", type=float, default=None, help="Forespørgsler/sek pr. host (default ubegrænset)")
+    args = parser.parse_args(argv)
+
+    cache = ws.ReplayCache(args.cache) if getattr(args, "cache", None) else None
+    if args.kommando == "serve":
+        server = StandInServer(args.pages, args.latency, args.port, cache).start()
+        sys.stderr.write(f"Stand-in server på {server.base_url}/opskrifter/ (Ctrl+C stopper)\n")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            server.stop()
+        return 0
+
+    server = None
+    if args.replay:
+        if not args.urls:
+            sys.stderr.write("Brug: angiv start-URLerne der blev optaget\n")
+            return 1
+        replay = ws.ReplayCache(args.replay)
+        ws.set_replay_cache(replay)
+        urls = args.urls
+    else:
+        server = StandInServer(args.pages, args.latency, cache=cache).start()
+        urls = [f"{server.base_url}/opskrifter/"]
+
+    try:
+        resultater = [run_once(urls, args) for _ in range(args.runs)]
+    finally:
+        if server:
+            server.stop()
+        if args.replay:
+            ws.set_replay_cache(None)
+            replay.close()
+
+    report(min(resultater, key=lambda s: s.wall_s), args.runs)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
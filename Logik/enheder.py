@@ -0,0 +1,177 @@
+# enheder.py
+"""
+Enhedssystem til sammenligning af lager og opskrifter.
+
+Alle mængder omregnes til én basisenhed pr. dimension:
+    masse    -> "g"
+    volumen  -> "ml"
+    antal    -> "stk"
+Enheder der ikke kan omregnes (dåse, bundt, skive, ...) er deres egen dimension.
+
+For ingredienser med en kendt densitet (g/ml) kan volumen og masse omregnes til
+hinanden, så "2 dl hvedemel" i en opskrift kan sammenlignes med "500 g" på lager.
+
+Omregningen sker én gang når kataloget og lageret indlæses; matchningen slår
+kun det færdige tal op for lagerets dimension.
+"""
+import hashlib
+
+from ingrediens_parser import parse_mængde
+
+MASSE, VOLUMEN, ANTAL = "g", "ml", "stk"
+
+# enhed -> (dimension, faktor til basisenheden)
+ENHEDER = {
+    "mg": (MASSE, 0.001),
+    "g": (MASSE, 1.0),
+    "kg": (MASSE, 1000.0),
+    "ml": (VOLUMEN, 1.0),
+    "cl": (VOLUMEN, 10.0),
+    "dl": (VOLUMEN, 100.0),
+    "l": (VOLUMEN, 1000.0),
+    "tsk": (VOLUMEN, 5.0),
+    "spsk": (VOLUMEN, 15.0),
+    "knivspids": (VOLUMEN, 0.5),
+    "nip": (VOLUMEN, 0.5),
+    None: (ANTAL, 1.0),
+    "stk": (ANTAL, 1.0),
+}
+
+# Densitet i g/ml. Slås op på hele navnet og derefter på sidste ord
+# ("flydende honning" -> "honning").
+DENSITET = {
+    "vand": 1.0,
+    "mælk": 1.03,
+    "kærnemælk": 1.03,
+    "fløde": 1.0,
+    "piskefløde": 1.0,
+    "madlavningsfløde": 1.0,
+    "yoghurt": 1.03,
+    "skyr": 1.05,
+    "creme fraiche": 1.0,
+    "fraiche": 1.0,
+    "olie": 0.92,
+    "olivenolie": 0.92,
+    "rapsolie": 0.92,
+    "smør": 0.91,
+    "honning": 1.42,
+    "sirup": 1.37,
+    "sukker": 0.85,
+    "rørsukker": 0.85,
+    "farin": 0.72,
+    "flormelis": 0.56,
+    "hvedemel": 0.55,
+    "mel": 0.55,
+    "rugmel": 0.52,
+    "majsstivelse": 0.55,
+    "kakao": 0.45,
+    "havregryn": 0.40,
+    "ris": 0.85,
+    "salt": 1.2,
+    "bagepulver": 0.9,
+    "natron": 0.9,
+    "sojasauce": 1.15,
+    "eddike": 1.01,
+    "bouillon": 1.0,
+    "grøntsagsbouillon": 1.0,
+    "hønsebouillon": 1.0,
+    "kaffe": 1.0,
+    "hytteost": 1.0,
+}
+
+# Ændres tabellerne, skal kataloget genberegne sine omregnede værdier
+FINGERPRINT = hashlib.sha1(repr((sorted(ENHEDER.items(), key=str), sorted(DENSITET.items()))).encode()).hexdigest()
+
+
+def densitet(navn):
+    if not navn:
+        return None
+    if navn in DENSITET:
+        return DENSITET[navn]
+    return DENSITET.get(navn.rsplit(" ", 1)[-1])
+
+
+def til_base(mængde, enhed):
+    """(2, 'dl') -> (200.0, 'ml'). Ukendte enheder bliver deres egen dimension."""
+    dim, faktor = ENHEDER.get(enhed, (enhed, 1.0))
+    return mængde * faktor, dim
+
+
+def behov(navn, mængde, enhed):
+    """
+    Forhåndsberegner en opskriftsmængde i alle dimensioner den kan omregnes til:
+    {None: værdi i opskriftens egen dimension, dimension: værdi, ...}.
+    None-nøglen bruges når lagerets mængde er et rent tal uden enhed.
+    Returnerer None hvis mængden er ukendt.
+    """
+    if mængde is None:
+        return None
+    værdi, dim = til_base(mængde, enhed)
+    resultat = {None: værdi, dim: værdi}
+    d = densitet(navn)
+    if d:
+        if dim == VOLUMEN:
+            resultat[MASSE] = værdi * d
+        elif dim == MASSE:
+            resultat[VOLUMEN] = værdi / d
+    return resultat
+
+
+def egen_dimension(behov_):
+    """Opskriftens egen dimension: første nøgle efter None i et behov-dict"""
+    return next((k for k in behov_ if k is not None), None)
+
+
+def læg_behov_sammen(a, b):
+    """
+    Summerer to behov for samme ingrediens. Kun dimensioner begge kan omregnes til
+    beholdes, så "2 dl mælk" + "1 stk mælk" kun kan dækkes af et lager uden enhed,
+    men None-totalen har altid begge mængder. Et ukendt behov (None) lægger intet til.
+    """
+    if a is None or b is None:
+        return b if a is None else a
+    resultat = {k: a[k] + b[k] for k in a if k in b}
+    # None-totalen er i a's egen dimension; b omregnes dertil når det kan lade sig gøre
+    resultat[None] = a[None] + b.get(egen_dimension(a), b[None])
+    return resultat
+
+
+def lager_mængde(værdi):
+    """
+    En lagerværdi er enten et tal (uden enhed) eller en tekst som "500 g" / "1,5 l".
+    Returnerer (værdi i basisenhed, dimension), hvor dimension er None for rene tal.
+    """
+    if isinstance(værdi, (int, float)):
+        return float(værdi), None
+    mængde, enhed, rest = parse_mængde(str(værdi))
+    if mængde is None or (rest and enhed is None):
+        raise ValueError(f"Ugyldig mængde: {værdi}")
+    if enhed is None:
+        return mængde, None
+    return til_base(mængde, enhed)
+
+
+def læs_mængde(tekst):
+    """Brugerinput -> lagerværdi: "500" -> 500.0, "500 g" -> "500 g". ValueError hvis ugyldig."""
+    try:
+        return float(tekst)
+    except ValueError:
+        lager_mængde(tekst)
+        return tekst.strip()
+
+
+def læg_sammen(gammel, ny):
+    """
+    Lægger to lagerværdier sammen. Bliver i basisenheden når begge har enheder.
+    ValueError hvis de ikke kan lægges sammen (fx "2 stk" til "500 g", eller et
+    tal uden enhed til en mængde med enhed), så intet af lageret går tabt.
+    """
+    if gammel is None:
+        return ny
+    g_værdi, g_dim = lager_mængde(gammel)
+    n_værdi, n_dim = lager_mængde(ny)
+    if g_dim != n_dim:
+        raise ValueError(f"Kan ikke lægge {ny} til {gammel}: enhederne passer ikke sammen")
+    if g_dim is None:
+        return g_værdi + n_værdi
+    return f"{g_værdi + n_værdi:g} {g_dim}"
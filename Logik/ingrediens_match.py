@@ -0,0 +1,152 @@
+# ingrediens_match.py
+"""
+Synonym- og fuzzy-matchning af ingrediensnavne.
+
+Både lagerets og opskrifternes navne gøres til en "stamme":
+    - beskrivende ord fjernes   ("hakkede tomater" -> "tomater")
+    - procenter og tal fjernes  ("yoghurt 10%"     -> "yoghurt")
+    - synonymer slås sammen     ("parmigiano reggiano" -> "parmesan")
+    - ental/flertal foldes      ("tomater" og "tomat" -> "tomat")
+
+Hver stamme får et heltals-ID i en Ordbog, så matchningen kun sammenligner
+heltal. Lagernavne der ikke findes præcist, slås op i et trigram-index
+("mozarella" -> "mozzarella"). Hver unik tekst slås kun op én gang pr. ordbog.
+"""
+import re
+from functools import lru_cache
+
+# Ord der beskriver tilberedning, form eller kvalitet og ikke selve ingrediensen
+BESKRIVENDE = frozenset("""
+    groft grov fint fin friskkværnet groftkværnet friskpresset frisk friske fintrevet groftrevet
+    groftrevne revet revne finthakket finthakkede grofthakket grofthakkede hakket hakkede
+    stødt tørret tørrede soltørrede frysetørrede lufttørret fintsnittet fintsnittede snittet
+    rensede renset blødt bløde kogte kogt kogende koncentreret ristet ristede frosne frossen
+    skrællede skrællet skyllede skyllet knust knuste smeltet røget syltede syltet fintklippet
+    klippet fintstrimlet fintstrimlede strimlet strimlede sammenpisket sammenpiskede optøede
+    afdryppede pillede smuttede smuldret flåede sigtet knækkede skrubbede dampede stegt
+    koldt kold lune lunt flydende usaltede saltede salte usprøjtet usprøjtede økologisk økologiske
+    små lille store stor stort hele hel nye løse moden modne evt fx ca og/eller
+""".split())
+
+# Hele navne (efter rensning) der betyder det samme
+SYNONYMER = {
+    "fraiche": "creme fraiche",
+    "crème fraiche": "creme fraiche",
+    "crème fraîche": "creme fraiche",
+    "parmigiano reggiano": "parmesan",
+    "parmigiano": "parmesan",
+    "parmesanost": "parmesan",
+    "spaghetti": "pasta",
+    "spagetti": "pasta",
+    "penne": "pasta",
+    "fusilli": "pasta",
+    "tagliatelle": "pasta",
+    "makaroni": "pasta",
+    "kyllingebrystfileter": "kyllingebryst",
+    "kyllingefileter": "kyllingebryst",
+    "kyllingebryster": "kyllingebryst",
+    "kyllingefilet": "kyllingebryst",
+    "hvedemel tipo 00": "hvedemel",
+    # Uregelmæssige flertalsformer der ikke kan foldes med endelser
+    "kartoffel": "kartofler",
+    "gulerod": "gulerødder",
+    "mandel": "mandler",
+    "nød": "nødder",
+}
+
+_ENDELSER = ("erne", "ene", "er", "e", "r")
+FUZZY_GRÆNSE = 0.7
+
+_RENS_RE = re.compile(r"[\d.,]+\s*%|\d+(?:[.,]\d+)?|[()\[\]]")
+_MELLEMRUM_RE = re.compile(r"\s+")
+
+
+def _fold(ord_):
+    """Fælles stamme for ental og flertal: 'tomater'/'tomat' -> 'tomat', 'pærer'/'pære' -> 'pær'"""
+    for endelse in _ENDELSER:
+        if ord_.endswith(endelse) and len(ord_) - len(endelse) >= 3:
+            return ord_[:-len(endelse)]
+    return ord_
+
+
+@lru_cache(maxsize=None)
+def stamme(navn):
+    """Normaliserer et (allerede kanonisk) ingrediensnavn til den nøgle der matches på."""
+    tekst = _RENS_RE.sub(" ", navn.lower())
+    ord_ = [o.strip("-") for o in _MELLEMRUM_RE.split(tekst) if o.strip("-")]
+    rest = [o for o in ord_ if o not in BESKRIVENDE] or ord_
+    tekst = " ".join(rest)
+    tekst = SYNONYMER.get(tekst, tekst)
+    return " ".join(_fold(o) for o in tekst.split())
+
+
+def trigrammer(tekst):
+    tekst = f"  {tekst} "
+    return {tekst[i:i + 3] for i in range(len(tekst) - 2)}
+
+
+class Ordbog:
+    """Tildeler ingrediens-ID'er og slår lagernavne op (præcist, ellers fuzzy)."""
+
+    def __init__(self):
+        self._ids = {}         # stamme -> id
+        self._navne = []       # id -> visningsnavn (korteste navn set for stammen)
+        self._trigrammer = []  # id -> trigrammer for stammen
+        self._trigram_index = {}  # trigram -> {id, ...}
+        self._cache = {}       # rå tekst -> id (opskrifter)
+        self._opslag = {}      # rå tekst -> id eller None (lager)
+
+    def __len__(self):
+        return len(self._navne)
+
+    def id(self, navn):
+        """ID for et opskriftsnavn; nye stammer bliver tilføjet."""
+        ing_id = self._cache.get(navn)
+        if ing_id is None:
+            s = stamme(navn)
+            ing_id = self._ids.get(s)
+            if ing_id is None:
+                ing_id = self._tilføj(s, navn)
+            elif len(navn) < len(self._navne[ing_id]):
+                self._navne[ing_id] = navn
+            self._cache[navn] = ing_id
+        return ing_id
+
+    def _tilføj(self, s, navn):
+        ing_id = len(self._navne)
+        self._ids[s] = ing_id
+        self._navne.append(navn)
+        grams = trigrammer(s)
+        self._trigrammer.append(grams)
+        for g in grams:
+            self._trigram_index.setdefault(g, set()).add(ing_id)
+        self._opslag.clear()  # tidligere fuzzy-opslag kan have fået et bedre match
+        return ing_id
+
+    def slå_op(self, navn):
+        """ID for et lagernavn, eller None hvis ingen opskrift bruger noget lignende."""
+        if navn in self._opslag:
+            return self._opslag[navn]
+        s = stamme(navn)
+        ing_id = self._ids.get(s)
+        if ing_id is None:
+            ing_id = self._fuzzy(s)
+        self._opslag[navn] = ing_id
+        return ing_id
+
+    def _fuzzy(self, s):
+        """Bedste stamme efter Dice-lighed på trigrammer, hvis den er over FUZZY_GRÆNSE."""
+        grams = trigrammer(s)
+        fælles = {}
+        for g in grams:
+            for ing_id in self._trigram_index.get(g, ()):
+                fælles[ing_id] = fælles.get(ing_id, 0) + 1
+        bedste, bedste_score = None, FUZZY_GRÆNSE
+        for ing_id, antal in fælles.items():
+            score = 2 * antal / (len(grams) + len(self._trigrammer[ing_id]))
+            if score >= bedste_score:
+                bedste, bedste_score = ing_id, score
+        return bedste
+
+    def navn(self, ing_id):
+        return self._navne[ing_id]
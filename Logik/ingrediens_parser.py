@@ -0,0 +1,152 @@
+# ingrediens_parser.py
+"""
+Fælles parser for ingredienslinjer og -mængder.
+
+Bruges både af WebScraber (når en linje som "1½ dl piskefløde" skal omregnes pr.
+person) og af DB_Handler/katalog (når en opskrifts "ingredienser" skal gøres til
+tal). Resultatet er altid en Ingrediens(navn, mængde, enhed, hint):
+
+    navn    kanonisk navn, fx "løg" for "løg (ca. 200 g)"
+    mængde  float eller None hvis mængden ikke kan læses
+    enhed   normaliseret enhed ("g", "kg", "dl", "l", "spsk", "tsk", "stk", "dåse", ...)
+            eller None for et rent antal
+    hint    (mængde, enhed) fra en "ca. N g" parentes, ellers None
+
+Alle regex er kompileret én gang og resultaterne caches, så hver unik tekst
+kun parses én gang pr. proces.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+Ingrediens = namedtuple("Ingrediens", "navn mængde enhed hint")
+
+BRØKER = {"½": 0.5, "¼": 0.25, "¾": 0.75, "⅓": 1 / 3, "⅔": 2 / 3, "⅛": 0.125}
+
+# Alle stavemåder -> normaliseret enhed
+ENHEDER = {
+    "g": "g", "gr": "g", "gr.": "g", "gram": "g",
+    "kg": "kg", "kilo": "kg",
+    "mg": "mg",
+    "ml": "ml", "cl": "cl", "dl": "dl",
+    "l": "l", "liter": "l",
+    "spsk": "spsk", "spsk.": "spsk", "skefuld": "spsk",
+    "tsk": "tsk", "tsk.": "tsk",
+    "stk": "stk", "stk.": "stk", "styk": "stk",
+    "dåse": "dåse", "dåser": "dåse",
+    "fed": "fed",
+    "knivspids": "knivspids", "nip": "nip",
+    "bundt": "bundt", "bundter": "bundt",
+    "skive": "skive", "skiver": "skive",
+    "håndfuld": "håndfuld", "håndfulde": "håndfuld",
+    "pakke": "pakke", "pakker": "pakke", "pk": "pakke", "pk.": "pakke",
+    "bakke": "bakke", "bakker": "bakke",
+    "pose": "pose", "poser": "pose",
+    "glas": "glas", "flaske": "flaske", "flasker": "flaske",
+    "plade": "plade", "plader": "plade",
+    "stilk": "stilk", "stilke": "stilk",
+    "kvist": "kvist", "kviste": "kvist",
+}
+
+# Ord en nøgle kan starte med, når den gamle scraper har lagt selve ingrediensen
+# i værdien, fx "i tern: 0.25 pære" eller "eller kylling (ca. 1100 g): 1 høne"
+_FORLED = ("i ", "til ", "eller ", "uden ", "med ", "skåret ", "delt ", "fx ", "evt. ", "a ")
+
+_TAL = r"(?:\d+/\d+|\d+(?:[.,]\d+)?\s*[½¼¾⅓⅔⅛]?|[½¼¾⅓⅔⅛])"
+_MÆNGDE_RE = re.compile(
+    rf"^\s*(?:ca\.?\s*)?(?P<a>{_TAL})(?:\s*(?:-|–|til)\s*(?P<b>{_TAL}))?\s*(?P<rest>.*)$",
+    re.IGNORECASE,
+)
+_ORD_RE = re.compile(r"^(?P<ord>[^\s,()]+)\s*(?P<rest>.*)$")
+_PARENTES_RE = re.compile(r"\(([^)]*)\)")
+_HINT_RE = re.compile(rf"ca\.?\s*(?P<tal>{_TAL})\s*(?P<enhed>kg|g|dl|ml|l|spsk|tsk)\b", re.IGNORECASE)
+_KLIP_RE = re.compile(r",|\s-\s|\s–\s|\s(?:i|til|eller|uden|med|skåret|fx|evt\.?)\s")
+_MELLEMRUM_RE = re.compile(r"\s+")
+
+
+def _tal(tekst):
+    """'1½' -> 1.5, '0,5' -> 0.5, '1/2' -> 0.5"""
+    tekst = tekst.strip().replace(",", ".")
+    if "/" in tekst:
+        tæller, nævner = tekst.split("/", 1)
+        return float(tæller) / float(nævner) if float(nævner) else None
+    brøk = 0.0
+    if tekst and tekst[-1] in BRØKER:
+        brøk = BRØKER[tekst[-1]]
+        tekst = tekst[:-1].strip()
+    return (float(tekst) if tekst else 0.0) + brøk
+
+
+def parse_mængde(tekst):
+    """Returnerer (mængde, enhed, resten af teksten). Intervaller som '2-3' giver midten."""
+    m = _MÆNGDE_RE.match(tekst)
+    if not m:
+        return None, None, tekst.strip()
+    mængde = _tal(m.group("a"))
+    if m.group("b"):
+        mængde = (mængde + _tal(m.group("b"))) / 2
+    rest = m.group("rest")
+    enhed = None
+    o = _ORD_RE.match(rest)
+    if o and o.group("ord").lower() in ENHEDER:
+        enhed = ENHEDER[o.group("ord").lower()]
+        rest = o.group("rest")
+    return mængde, enhed, rest.strip()
+
+
+@lru_cache(maxsize=None)
+def kanonisk_navn(tekst):
+    """'Løg (ca. 200 g)' -> 'løg', 'tørret pasta, fx spaghetti' -> 'tørret pasta'"""
+    tekst = _PARENTES_RE.sub(" ", str(tekst).lower())
+    tekst = _MELLEMRUM_RE.sub(" ", tekst).strip()
+    for forled in ("fx ", "evt. ", "ca. "):
+        if tekst.startswith(forled):
+            tekst = tekst[len(forled):]
+    tekst = _KLIP_RE.split(f" {tekst} ", maxsplit=1)[0]
+    return tekst.strip(" .:;-")
+
+
+def _hint(tekst):
+    for parentes in _PARENTES_RE.findall(tekst):
+        m = _HINT_RE.search(parentes)
+        if m:
+            return (_tal(m.group("tal")), ENHEDER[m.group("enhed").lower()])
+    return None
+
+
+@lru_cache(maxsize=None)
+def parse_linje(linje):
+    """Parser en hel ingredienslinje, fx '2-3 fed hvidløg' eller '½ dl piskefløde'."""
+    linje = _MELLEMRUM_RE.sub(" ", str(linje)).strip()
+    mængde, enhed, rest = parse_mængde(linje)
+    return Ingrediens(kanonisk_navn(rest) or kanonisk_navn(linje), mængde, enhed, _hint(linje))
+
+
+@lru_cache(maxsize=None)
+def parse_post(nøgle, værdi):
+    """
+    Parser én post fra en opskrifts "ingredienser", fx ("løg", "0.5") eller
+    ("i tern", "0.25 pære"). Mængden er pr. person som i YAML-filen.
+    """
+    nøgle_tekst = _MELLEMRUM_RE.sub(" ", str(nøgle)).strip()
+    hint = _hint(nøgle_tekst)
+
+    if isinstance(værdi, (int, float)) and not isinstance(værdi, bool):
+        return Ingrediens(kanonisk_navn(nøgle_tekst), float(værdi), None, hint)
+    if værdi is None:
+        return Ingrediens(kanonisk_navn(nøgle_tekst), None, None, hint)
+
+    værdi_tekst = _MELLEMRUM_RE.sub(" ", str(værdi)).strip()
+    if værdi_tekst == nøgle_tekst:
+        # Rå linje som scraperen ikke kunne omregne: mængden gælder hele opskriften,
+        # så vi kender ikke mængden pr. person.
+        ing = parse_linje(nøgle_tekst)
+        return Ingrediens(ing.navn, None, ing.enhed, ing.hint)
+
+    mængde, enhed, rest = parse_mængde(værdi_tekst)
+    navn = kanonisk_navn(nøgle_tekst)
+    if rest and enhed is None:
+        # "0.25 pære" under nøglen "i tern": ordet efter tallet er selve ingrediensen
+        if not navn or nøgle_tekst.lower().startswith(_FORLED):
+            navn = kanonisk_navn(rest)
+    return Ingrediens(navn, mængde, enhed, hint)
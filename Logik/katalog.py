@@ -0,0 +1,283 @@
+# katalog.py
+"""
+Kompileret opskriftskatalog.
+
+I stedet for at køre yaml.safe_load på hver eneste .yml fil i opskriftsmappen
+ved hver indlæsning, gemmes de parsede opskrifter i én binær fil (pickle).
+Hver post er nøglet på filens mtime og størrelse, så kun filer der er ændret,
+tilføjet eller slettet siden sidst bliver læst fra YAML igen.
+
+Er katalogfilen ødelagt eller af en gammel version, falder vi tilbage til at
+læse alt fra YAML og skriver et nyt katalog.
+
+KatalogWatcher holder et indlæst katalog opdateret med deltaer (tilføjede,
+ændrede og slettede filer) via inotify på Linux, ellers via en billig mtime-poll.
+
+Genopbyg manuelt (fra Logik-mappen):
+    python -m katalog            # opdater kun ændrede filer
+    python -m katalog --fuld     # læs alle filer fra YAML igen
+"""
+import argparse
+import os
+import pickle
+import struct
+import sys
+import time
+
+import yaml
+
+import enheder
+import ingrediens_parser
+
+try:
+    from yaml import CSafeLoader as _YamlLoader  # libyaml er meget hurtigere
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Bumpes når postformatet ændres, så gamle katalogfiler bliver genopbygget
+KATALOG_VERSION = 3
+KATALOG_FILNAVN = "opskrifter.katalog"
+
+
+def katalog_sti(mappe):
+    """Katalogfilen ligger ved siden af opskriftsmappen (fx DB/opskrifter.katalog)."""
+    return os.path.join(os.path.dirname(os.path.abspath(mappe)), KATALOG_FILNAVN)
+
+
+def opskrift_navn(fil):
+    return fil.replace(".yml", "").replace("_", " ")
+
+
+def læs_yaml(sti):
+    with open(sti, "r", encoding="utf-8-sig") as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+
+def parse_ingredienser(data):
+    """
+    Forhåndsparser en opskrifts ingredienser til tuples
+    (navn, mængde pr. person, enhed, behov), hvor behov er mængden omregnet til
+    basisenheder (se enheder.behov), så matchningen kun skal sammenligne tal.
+    """
+    ingreds = (data or {}).get("ingredienser") or {}
+    if isinstance(ingreds, dict):
+        parsed = [tuple(ingrediens_parser.parse_post(str(k), v))[:3] for k, v in ingreds.items()]
+    else:
+        # "rich" schema: liste af hele linjer med mængder for hele opskriften
+        portioner = data.get("portioner")
+        parsed = []
+        for linje in ingreds:
+            navn, mængde, enhed, _ = ingrediens_parser.parse_linje(str(linje))
+            if mængde is not None:
+                mængde = mængde / portioner if isinstance(portioner, int) and portioner > 0 else None
+            parsed.append((navn, mængde, enhed))
+    return tuple((navn, mængde, enhed, enheder.behov(navn, mængde, enhed)) for navn, mængde, enhed in parsed)
+
+
+def lav_post(fil, sti, stat):
+    """En post er en ren tuple: (mtime_ns, størrelse, navn, data, ingredienser)."""
+    data = læs_yaml(sti)
+    return (stat.st_mtime_ns, stat.st_size, opskrift_navn(fil), data, parse_ingredienser(data))
+
+
+def læs_katalog(sti):
+    """Læser katalogfilen. Returnerer {} hvis den mangler, er ødelagt eller forældet."""
+    try:
+        with open(sti, "rb") as f:
+            katalog = pickle.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Katalog '{sti}' kunne ikke læses ({e}) - genopbygger fra YAML.", file=sys.stderr)
+        return {}
+    if not isinstance(katalog, dict) or katalog.get("version") != KATALOG_VERSION:
+        return {}
+    if katalog.get("enheder") != enheder.FINGERPRINT:
+        return {}  # enheds- eller densitetstabellen er ændret siden kataloget blev bygget
+    filer = katalog.get("filer")
+    return filer if isinstance(filer, dict) else {}
+
+
+def gem_katalog(sti, filer):
+    """Skriver til en midlertidig fil og omdøber, så et halvt skrevet katalog aldrig ses."""
+    tmp = sti + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": KATALOG_VERSION, "enheder": enheder.FINGERPRINT, "filer": filer},
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, sti)
+
+
+def load_katalog(mappe, sti=None, fuld=False, gem=True):
+    """
+    Returnerer {filnavn: post} for alle .yml filer i mappen.
+    Kun filer hvis mtime/størrelse ikke matcher katalogets post læses fra YAML.
+    Med gem=False læses et eksisterende katalog, men der skrives intet nyt
+    (til mapper der ikke er appens egen, fx WebScrabers --out-dir).
+    """
+    sti = sti or katalog_sti(mappe)
+    gamle = {} if fuld else læs_katalog(sti)
+    filer = {}
+    ændret = False
+
+    with os.scandir(mappe) as it:
+        for entry in it:
+            if not entry.name.endswith(".yml"):
+                continue
+            st = entry.stat()
+            post = gamle.get(entry.name)
+            if post is None or post[0] != st.st_mtime_ns or post[1] != st.st_size:
+                post = lav_post(entry.name, entry.path, st)
+                ændret = True
+            filer[entry.name] = post
+
+    if gem and (ændret or len(filer) != len(gamle)):
+        try:
+            gem_katalog(sti, filer)
+        except OSError as e:
+            print(f"Kunne ikke gemme katalog '{sti}': {e}", file=sys.stderr)
+    return filer
+
+
+# ---------- Inkrementel opdatering ----------
+
+class _Inotify:
+    """Minimal inotify-wrapper via ctypes (kun Linux). Giver navnene på ændrede filer."""
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = 0o2000000
+    _HOVED = struct.Struct("iIII")
+
+    def __init__(self, mappe):
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)  # libc er allerede linket ind i python
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 fejlede")
+        maske = self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO | self.IN_DELETE
+        if libc.inotify_add_watch(self.fd, os.fsencode(mappe), maske) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch fejlede")
+
+    @classmethod
+    def åbn(cls, mappe):
+        """Returnerer None hvis inotify ikke findes (Windows, macOS, ...)"""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return cls(mappe)
+        except (OSError, AttributeError):
+            return None
+
+    def læs(self):
+        """Returnerer (filnavne, overløb). Ved overløb må kalderen lave en fuld scan."""
+        navne, overløb = set(), False
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            i = 0
+            while i + self._HOVED.size <= len(buf):
+                _, maske, _, længde = self._HOVED.unpack_from(buf, i)
+                i += self._HOVED.size
+                navn = buf[i:i + længde].rstrip(b"\0")
+                i += længde
+                if maske & self.IN_Q_OVERFLOW:
+                    overløb = True
+                elif navn:
+                    navne.add(os.fsdecode(navn))
+        return navne, overløb
+
+    def luk(self):
+        os.close(self.fd)
+
+
+class KatalogWatcher:
+    """
+    Holder {filnavn: post} i sync med opskriftsmappen uden fulde genindlæsninger.
+    ændringer() returnerer kun det der er sket siden sidste kald.
+    """
+
+    def __init__(self, mappe, filer, sti=None):
+        self.mappe = mappe
+        self.filer = filer
+        self.sti = sti or katalog_sti(mappe)
+        self._inotify = _Inotify.åbn(mappe)
+
+    @property
+    def metode(self):
+        return "inotify" if self._inotify else "poll"
+
+    def _tjek(self, fil, ændrede, slettede):
+        sti = os.path.join(self.mappe, fil)
+        try:
+            st = os.stat(sti)
+        except FileNotFoundError:
+            if self.filer.pop(fil, None) is not None:
+                slettede.append(fil)
+            return
+        post = self.filer.get(fil)
+        if post is None or post[0] != st.st_mtime_ns or post[1] != st.st_size:
+            post = lav_post(fil, sti, st)
+            self.filer[fil] = post
+            ændrede[fil] = post
+
+    def ændringer(self):
+        """Returnerer ({filnavn: post} for nye/ændrede filer, [slettede filnavne])"""
+        ændrede, slettede = {}, []
+        if self._inotify:
+            navne, overløb = self._inotify.læs()
+            if overløb:
+                navne = set(self.filer) | set(os.listdir(self.mappe))
+        else:
+            # mtime-poll: én stat pr. fil, kun ændrede filer parses
+            navne = set(self.filer) | set(os.listdir(self.mappe))
+        for fil in navne:
+            if fil.endswith(".yml"):
+                self._tjek(fil, ændrede, slettede)
+        if ændrede or slettede:
+            self.gem()
+        return ændrede, slettede
+
+    def registrer(self, sti):
+        """Registrerer en netop skrevet fil i kataloget. Returnerer (filnavn, post)."""
+        fil = os.path.basename(sti)
+        post = lav_post(fil, sti, os.stat(sti))
+        self.filer[fil] = post
+        self.gem()
+        return fil, post
+
+    def gem(self):
+        try:
+            gem_katalog(self.sti, self.filer)
+        except OSError as e:
+            print(f"Kunne ikke gemme katalog '{self.sti}': {e}", file=sys.stderr)
+
+    def luk(self):
+        if self._inotify:
+            self._inotify.luk()
+            self._inotify = None
+
+
+def main(argv=None):
+    import DB_Handler  # importeres først her for at undgå cirkulær import
+
+    parser = argparse.ArgumentParser(description="Genopbyg det kompilerede opskriftskatalog")
+    parser.add_argument("--mappe", default=DB_Handler.opskrift_mappe, help="Mappe med .yml opskrifter")
+    parser.add_argument("--katalog", default=None, help="Sti til katalogfilen")
+    parser.add_argument("--fuld", action="store_true", help="Ignorer eksisterende katalog og læs alt fra YAML")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    filer = load_katalog(args.mappe, sti=args.katalog, fuld=args.fuld)
+    tid = time.perf_counter() - start
+    print(f"{len(filer)} opskrifter i kataloget ({tid * 1000:.0f} ms): {args.katalog or katalog_sti(args.mappe)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
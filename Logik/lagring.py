@@ -0,0 +1,578 @@
+# lagring.py
+"""
+Lagringslag for opskrifter, brugere og lagre.
+
+To backends med samme metoder:
+    YamlLagring    - de oprindelige filer: DB/Opskrifter/*.yml og DB/users/<navn>.yml
+    SqliteLagring  - én SQLite-fil (DB/foodsaver.sqlite3) med tabellerne
+                     recipes, recipe_ingredients (indekseret på ingrediens),
+                     users og pantry_items
+
+Backend vælges med miljøvariablen FOODSAVER_LAGRING ("yaml" eller "sqlite",
+default "yaml"). Datamappen er DB ved siden af Logik-mappen og kan flyttes med
+FOODSAVER_DB.
+
+Med SQLite bliver en ændring i lageret til én rækkeopdatering i stedet for at
+hele brugerfilen skrives igen, og opskrifterne indlæses med to forespørgsler
+uden at nogen YAML skal parses.
+
+Med YAML skrives ændringer i lageret til en journal pr. bruger
+(DB/users/<navn>.journal.jsonl, én JSON-linje pr. ændring) i stedet for hele
+brugerfilen. Ændringer samles og skrives højst hvert FLUSH_SEKUNDER (og ved
+logout/afslutning), og journalen komprimeres ind i brugerfilen når den bliver
+lang. Et nedbrud kan derfor højst miste den sidste samling ændringer.
+
+Opskrifter skrives altid til en midlertidig fil der omdøbes på plads, så et
+nedbrud aldrig efterlader en halvt skrevet .yml. gem_opskrifter gemmer en hel
+bid på én gang (WebScraber's skrive-trin). JsonlBundle er et alternativ til
+.yml filerne: opskrifterne som linjer i et sharded NDJSON-bundle
+(opskrifter-00000.jsonl, ...) med færdigparsede ingredienser, som
+DB_Handler streamer ind sammen med lagringens egne opskrifter.
+
+Importér den eksisterende YAML-mappe (fra Logik-mappen):
+    python -m lagring importer
+"""
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import yaml
+
+import enheder
+import katalog
+
+try:
+    from yaml import CSafeDumper as _YamlDumper  # libyaml er meget hurtigere
+except ImportError:
+    from yaml import SafeDumper as _YamlDumper
+
+DB_MAPPE = os.environ.get("FOODSAVER_DB") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "DB")
+OPSKRIFT_MAPPE = os.path.join(DB_MAPPE, "Opskrifter")
+BRUGER_MAPPE = os.path.join(DB_MAPPE, "users")
+SQLITE_STI = os.path.join(DB_MAPPE, "foodsaver.sqlite3")
+
+BACKEND = os.environ.get("FOODSAVER_LAGRING", "yaml")
+
+# Opskrifts-bundlet: filnavne og maks størrelse pr. shard før der startes et nyt
+BUNDLE_MØNSTER = "opskrifter-{:05d}.jsonl"
+BUNDLE_SHARD_BYTES = 64 * 1024 * 1024
+
+# Lagerjournalen (kun YAML): sekunder mellem flush, og antal linjer før den komprimeres
+FLUSH_SEKUNDER = 2.0
+KOMPRIMER_LINJER = 200
+
+
+def ledigt_filnavn(findes, filnavn, overskriv=False):
+    """'navn.yml' -> 'navn-2.yml', 'navn-3.yml', ... indtil findes(filnavn) er falsk"""
+    if overskriv or not findes(filnavn):
+        return filnavn
+    stamme, endelse = os.path.splitext(filnavn)
+    i = 2
+    while findes(f"{stamme}-{i}{endelse}"):
+        i += 1
+    return f"{stamme}-{i}{endelse}"
+
+
+class YamlLagring:
+    """Én YAML-fil pr. opskrift og pr. bruger (det oprindelige format)."""
+
+    navn = "yaml"
+
+    def __init__(self, bruger_mappe=BRUGER_MAPPE):
+        self.bruger_mappe = bruger_mappe
+        self._lås = threading.RLock()
+        self._ventende = {}        # brugernavn -> {ingrediens: journalpost} der ikke er skrevet endnu
+        self._brugere = {}         # brugernavn -> bruger_data til komprimering, kun indtil næste flush
+        self._journal_linjer = {}  # brugernavn -> antal linjer i journalen på disken
+        self._timer = None
+        atexit.register(self.flush)
+
+    def _bruger_sti(self, brugernavn):
+        return os.path.join(self.bruger_mappe, f"{brugernavn}.yml")
+
+    def _journal_sti(self, brugernavn):
+        return os.path.join(self.bruger_mappe, f"{brugernavn}.journal.jsonl")
+
+    # ---------- brugere ----------
+    def load_bruger(self, brugernavn):
+        """Brugerfilen med journalens ændringer lagt ovenpå"""
+        self.flush()
+        filsti = self._bruger_sti(brugernavn)
+        if not os.path.exists(filsti):
+            return None
+        with open(filsti, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+        linjer, ødelagt = 0, False
+        try:
+            with open(self._journal_sti(brugernavn), "r", encoding="utf-8") as f:
+                for linje in f:
+                    try:
+                        post = json.loads(linje)
+                    except ValueError:
+                        ødelagt = True  # halvt skrevet sidste linje efter et nedbrud
+                        break
+                    lager = data.setdefault("lager", {})
+                    if post.get("slet"):
+                        lager.pop(post["ingrediens"], None)
+                    else:
+                        lager[post["ingrediens"]] = post["mængde"]
+                    linjer += 1
+        except FileNotFoundError:
+            pass
+        if ødelagt:
+            self.gem_bruger(data)  # nyt snapshot, så nye linjer ikke hænger fast efter den halve
+        else:
+            with self._lås:
+                self._journal_linjer[brugernavn] = linjer
+        return data
+
+    def gem_bruger(self, data):
+        """Skriver hele brugeren (et nyt snapshot) og tømmer journalen"""
+        brugernavn = data["brugernavn"]
+        with self._lås:
+            self._ventende.pop(brugernavn, None)
+            self._brugere.pop(brugernavn, None)
+            os.makedirs(self.bruger_mappe, exist_ok=True)
+            filsti = self._bruger_sti(brugernavn)
+            tmp = filsti + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                yaml.dump(data, f, allow_unicode=True)
+            os.replace(tmp, filsti)
+            # Journalen slettes først efter snapshottet; et nedbrud imellem afspiller
+            # blot de samme ændringer igen (posterne er absolutte mængder)
+            try:
+                os.remove(self._journal_sti(brugernavn))
+            except FileNotFoundError:
+                pass
+            # Uden journal er antallet 0; brugeren glemmes, så en server med mange
+            # brugere ikke husker alle der nogensinde har været logget ind
+            self._journal_linjer.pop(brugernavn, None)
+
+    def gem_lager_post(self, bruger_data, ingrediens):
+        """
+        Lægger ændringen i kø til journalen. Flere ændringer af samme ingrediens
+        inden næste flush bliver til én linje.
+        """
+        brugernavn = bruger_data["brugernavn"]
+        lager = bruger_data.get("lager") or {}
+        if ingrediens in lager:
+            post = {"ingrediens": ingrediens, "mængde": lager[ingrediens]}
+        else:
+            post = {"ingrediens": ingrediens, "slet": True}
+        with self._lås:
+            self._ventende.setdefault(brugernavn, {})[ingrediens] = post
+            # Komprimeringen i flush kører på timer-tråden; den får en kopi, så
+            # yaml.dump aldrig ser lageret (DB_Handler.lager) ændre sig undervejs
+            self._brugere[brugernavn] = {**bruger_data, "lager": dict(lager)}
+            if self._timer is None:
+                self._timer = threading.Timer(FLUSH_SEKUNDER, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Skriver de ventende ændringer til journalerne (én append + fsync pr. bruger)"""
+        with self._lås:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            ventende, self._ventende = self._ventende, {}
+            # gem_lager_post lægger et nyt snapshot med hver ændring; de gamle skal ikke gemmes
+            brugere, self._brugere = self._brugere, {}
+            for brugernavn, poster in ventende.items():
+                with open(self._journal_sti(brugernavn), "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(p, ensure_ascii=False) + "\n" for p in poster.values()))
+                    f.flush()
+                    os.fsync(f.fileno())
+                linjer = self._journal_linjer.get(brugernavn, 0) + len(poster)
+                self._journal_linjer[brugernavn] = linjer
+                if linjer >= KOMPRIMER_LINJER and brugernavn in brugere:
+                    self.gem_bruger(brugere[brugernavn])
+
+    # ---------- opskrifter ----------
+    def load_opskrifter(self, mappe, gem_katalog=True):
+        return katalog.load_katalog(mappe, gem=gem_katalog)
+
+    def watcher(self, mappe, filer):
+        return katalog.KatalogWatcher(mappe, filer)
+
+    def gem_opskrift(self, mappe, filnavn, data, overskriv=True):
+        """Skriver opskriften som .yml og returnerer stien"""
+        os.makedirs(mappe, exist_ok=True)
+        filnavn = ledigt_filnavn(lambda f: os.path.exists(os.path.join(mappe, f)), filnavn, overskriv)
+        return self._skriv_opskrift(os.path.join(mappe, filnavn), data)
+
+    def gem_opskrifter(self, mappe, poster):
+        """
+        Skriver en bid [(filnavn, data)] på én gang. Filnavnene bruges som de er
+        (kalderen har allerede fundet ledige navne). Returnerer stierne.
+        """
+        os.makedirs(mappe, exist_ok=True)
+        return [self._skriv_opskrift(os.path.join(mappe, filnavn), data) for filnavn, data in poster]
+
+    def _skriv_opskrift(self, filsti, data):
+        # Midlertidig fil + omdøbning: filen er enten den gamle eller den nye, aldrig halv
+        tmp = filsti + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            yaml.dump(data, f, Dumper=_YamlDumper, allow_unicode=True, sort_keys=False)
+        os.replace(tmp, filsti)
+        return filsti
+
+    def slet_opskrift(self, mappe, filnavn):
+        os.remove(os.path.join(mappe, filnavn))
+
+    def luk(self):
+        pass
+
+
+SKEMA = """
+CREATE TABLE IF NOT EXISTS recipes (
+    id      INTEGER PRIMARY KEY,
+    fil     TEXT NOT NULL UNIQUE,
+    data    TEXT NOT NULL,
+    ændret  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recipe_ingredients (
+    recipe_id   INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    position    INTEGER NOT NULL,
+    ingrediens  TEXT NOT NULL,
+    mængde      REAL,
+    enhed       TEXT,
+    PRIMARY KEY (recipe_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS recipe_ingredients_ingrediens ON recipe_ingredients(ingrediens);
+CREATE TABLE IF NOT EXISTS users (
+    brugernavn     TEXT PRIMARY KEY,
+    password_hash  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pantry_items (
+    brugernavn  TEXT NOT NULL REFERENCES users(brugernavn) ON DELETE CASCADE,
+    ingrediens  TEXT NOT NULL,
+    mængde      NOT NULL,  -- tal eller tekst med enhed ("500 g"), som i YAML
+    PRIMARY KEY (brugernavn, ingrediens)
+) WITHOUT ROWID;
+"""
+
+
+class SqliteLagring:
+    """Alt i én SQLite-database. Ingredienserne gemmes færdigparsede."""
+
+    navn = "sqlite"
+
+    def __init__(self, sti=SQLITE_STI):
+        self.sti = sti
+        os.makedirs(os.path.dirname(os.path.abspath(sti)), exist_ok=True)
+        self.db = sqlite3.connect(sti, check_same_thread=False)
+        self._lås = threading.Lock()
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.executescript(SKEMA)
+
+    # ---------- brugere ----------
+    def load_bruger(self, brugernavn):
+        with self._lås:
+            række = self.db.execute("SELECT password_hash FROM users WHERE brugernavn = ?",
+                                    (brugernavn,)).fetchone()
+            if række is None:
+                return None
+            lager = dict(self.db.execute(
+                "SELECT ingrediens, mængde FROM pantry_items WHERE brugernavn = ? ORDER BY ingrediens",
+                (brugernavn,)))
+        return {"brugernavn": brugernavn, "lager": lager, "password_hash": række[0]}
+
+    def gem_bruger(self, data):
+        brugernavn = data["brugernavn"]
+        with self._lås, self.db:
+            self.db.execute("INSERT INTO users (brugernavn, password_hash) VALUES (?, ?) "
+                            "ON CONFLICT (brugernavn) DO UPDATE SET password_hash = excluded.password_hash",
+                            (brugernavn, data["password_hash"]))
+            self.db.execute("DELETE FROM pantry_items WHERE brugernavn = ?", (brugernavn,))
+            self.db.executemany("INSERT INTO pantry_items VALUES (?, ?, ?)",
+                                [(brugernavn, ing, m) for ing, m in (data.get("lager") or {}).items()])
+
+    def gem_lager_post(self, bruger_data, ingrediens):
+        """Gemmer kun den ene ingrediens: opdaterer/indsætter rækken, eller sletter den"""
+        brugernavn = bruger_data["brugernavn"]
+        lager = bruger_data.get("lager") or {}
+        with self._lås, self.db:
+            if ingrediens in lager:
+                self.db.execute("INSERT INTO pantry_items VALUES (?, ?, ?) "
+                                "ON CONFLICT (brugernavn, ingrediens) DO UPDATE SET mængde = excluded.mængde",
+                                (brugernavn, ingrediens, lager[ingrediens]))
+            else:
+                self.db.execute("DELETE FROM pantry_items WHERE brugernavn = ? AND ingrediens = ?",
+                                (brugernavn, ingrediens))
+
+    def flush(self):
+        pass  # hver ændring er allerede sin egen transaktion
+
+    # ---------- opskrifter ----------
+    def _poster(self, hvor="", parametre=()):
+        """{fil: post} med samme postformat som kataloget; ingredienserne er allerede parset"""
+        with self._lås:
+            opskrifter = self.db.execute(f"SELECT id, fil, data, ændret FROM recipes {hvor}", parametre).fetchall()
+            ingredienser = {}
+            for recipe_id, navn, mængde, enhed in self.db.execute(
+                    "SELECT recipe_id, ingrediens, mængde, enhed FROM recipe_ingredients "
+                    f"WHERE recipe_id IN (SELECT id FROM recipes {hvor}) ORDER BY recipe_id, position", parametre):
+                ingredienser.setdefault(recipe_id, []).append(
+                    (navn, mængde, enhed, enheder.behov(navn, mængde, enhed)))
+        return {fil: (ændret, 0, katalog.opskrift_navn(fil), json.loads(data), tuple(ingredienser.get(i, ())))
+                for i, fil, data, ændret in opskrifter}
+
+    def load_opskrifter(self, mappe=None, gem_katalog=True):
+        return self._poster()
+
+    def watcher(self, mappe, filer):
+        return SqliteWatcher(self, mappe, filer)
+
+    def gem_opskrift(self, mappe, filnavn, data, overskriv=True):
+        """Gemmer (eller erstatter) opskriften og dens ingredienser i én transaktion"""
+        ingredienser = katalog.parse_ingredienser(data)
+        with self._lås, self.db:
+            filnavn = ledigt_filnavn(
+                lambda f: self.db.execute("SELECT 1 FROM recipes WHERE fil = ?", (f,)).fetchone(),
+                filnavn, overskriv)
+            self.db.execute(
+                "INSERT INTO recipes (fil, data, ændret) VALUES (?, ?, ?) "
+                "ON CONFLICT (fil) DO UPDATE SET data = excluded.data, ændret = excluded.ændret",
+                (filnavn, json.dumps(data, ensure_ascii=False, default=str), time.time_ns()))
+            recipe_id = self.db.execute("SELECT id FROM recipes WHERE fil = ?", (filnavn,)).fetchone()[0]
+            self.db.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,))
+            self.db.executemany(
+                "INSERT INTO recipe_ingredients VALUES (?, ?, ?, ?, ?)",
+                [(recipe_id, i, navn, mængde, enhed)
+                 for i, (navn, mængde, enhed, _) in enumerate(ingredienser) if navn])
+        return os.path.join(mappe, filnavn)
+
+    def gem_opskrifter(self, mappe, poster):
+        """Gemmer en bid [(filnavn, data)] i én transaktion. Returnerer stierne."""
+        with self._lås, self.db:
+            for filnavn, data in poster:
+                ingredienser = katalog.parse_ingredienser(data)
+                self.db.execute(
+                    "INSERT INTO recipes (fil, data, ændret) VALUES (?, ?, ?) "
+                    "ON CONFLICT (fil) DO UPDATE SET data = excluded.data, ændret = excluded.ændret",
+                    (filnavn, json.dumps(data, ensure_ascii=False, default=str), time.time_ns()))
+                recipe_id = self.db.execute("SELECT id FROM recipes WHERE fil = ?", (filnavn,)).fetchone()[0]
+                self.db.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,))
+                self.db.executemany(
+                    "INSERT INTO recipe_ingredients VALUES (?, ?, ?, ?, ?)",
+                    [(recipe_id, i, navn, mængde, enhed)
+                     for i, (navn, mængde, enhed, _) in enumerate(ingredienser) if navn])
+        return [os.path.join(mappe, filnavn) for filnavn, _ in poster]
+
+    def slet_opskrift(self, mappe, filnavn):
+        with self._lås, self.db:
+            self.db.execute("DELETE FROM recipes WHERE fil = ?", (filnavn,))
+
+    def importer(self, opskrift_mappe=OPSKRIFT_MAPPE, bruger_mappe=BRUGER_MAPPE):
+        """Læser den eksisterende YAML-mappe ind. Returnerer (antal opskrifter, antal brugere)."""
+        opskrifter = brugere = 0
+        for fil, post in sorted(katalog.load_katalog(opskrift_mappe).items()):
+            self.gem_opskrift(opskrift_mappe, fil, post[3] or {})
+            opskrifter += 1
+        yaml_lagring = YamlLagring(bruger_mappe)
+        if os.path.isdir(bruger_mappe):
+            for fil in sorted(os.listdir(bruger_mappe)):
+                if fil.endswith(".yml"):
+                    data = yaml_lagring.load_bruger(fil[:-4])
+                    if data:
+                        self.gem_bruger(data)
+                        brugere += 1
+        return opskrifter, brugere
+
+    def luk(self):
+        self.db.close()
+
+
+class SqliteWatcher:
+    """Som KatalogWatcher, men finder ændrede opskrifter på deres ændret-tidsstempel."""
+
+    metode = "sqlite"
+
+    def __init__(self, lagring, mappe, filer):
+        self.lagring = lagring
+        self.mappe = mappe
+        self.filer = filer
+
+    def ændringer(self):
+        """Returnerer ({filnavn: post} for nye/ændrede opskrifter, [slettede filnavne])"""
+        with self.lagring._lås:
+            nu = dict(self.lagring.db.execute("SELECT fil, ændret FROM recipes"))
+        slettede = [fil for fil in self.filer if fil not in nu]
+        for fil in slettede:
+            del self.filer[fil]
+        nye = [fil for fil, ændret in nu.items() if fil not in self.filer or self.filer[fil][0] != ændret]
+        ændrede = {}
+        for i in range(0, len(nye), 500):  # SQLite har en grænse for antal parametre
+            del_ = nye[i:i + 500]
+            ændrede.update(self.lagring._poster(f"WHERE fil IN ({','.join('?' * len(del_))})", del_))
+        self.filer.update(ændrede)
+        return ændrede, slettede
+
+    def registrer(self, sti):
+        fil = os.path.basename(sti)
+        post = self.lagring._poster("WHERE fil = ?", (fil,))[fil]
+        self.filer[fil] = post
+        return fil, post
+
+    def luk(self):
+        pass
+
+
+class JsonlBundle:
+    """
+    Opskrifter som NDJSON i mappen: én linje {"fil", "data", "ingredienser"} pr.
+    opskrift, fordelt på shards af højst BUNDLE_SHARD_BYTES. Der skrives kun i
+    enden af den sidste shard (én append + fsync pr. bid), og en senere linje
+    for samme fil erstatter en tidligere. Ingredienserne gemmes færdigparsede,
+    så indlæsningen hverken parser YAML eller ingredienslinjer.
+    """
+
+    def __init__(self, mappe):
+        self.mappe = mappe
+        self._sti = None  # shard der skrives i, dens nummer og størrelse
+        self._nr = 0
+        self._størrelse = 0
+        self._læst = {}  # shard -> antal bytes der er læst (hele linjer), til læs_nye
+
+    def shards(self):
+        try:
+            navne = sorted(f for f in os.listdir(self.mappe)
+                           if f.startswith("opskrifter-") and f.endswith(".jsonl"))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.mappe, f) for f in navne]
+
+    @staticmethod
+    def _reparer(sti):
+        """Skærer en halv sidste linje (efter et nedbrud) af, så næste linje ikke klistres på."""
+        with open(sti, "rb+") as f:
+            størrelse = f.seek(0, os.SEEK_END)
+            if størrelse == 0:
+                return 0
+            f.seek(størrelse - 1)
+            if f.read(1) == b"\n":
+                return størrelse
+            start = max(0, størrelse - 1024 * 1024)
+            f.seek(start)
+            hale = f.read()
+            størrelse = start + hale.rfind(b"\n") + 1
+            f.truncate(størrelse)
+            return størrelse
+
+    def _shard(self):
+        if self._sti is None:
+            shards = self.shards()
+            self._nr = max(len(shards) - 1, 0)
+            self._sti = os.path.join(self.mappe, BUNDLE_MØNSTER.format(self._nr))
+            self._størrelse = self._reparer(self._sti) if shards else 0
+        if self._størrelse >= BUNDLE_SHARD_BYTES:
+            self._nr += 1
+            self._sti = os.path.join(self.mappe, BUNDLE_MØNSTER.format(self._nr))
+            self._størrelse = 0
+        return self._sti
+
+    def gem_opskrifter(self, mappe, poster):
+        """
+        Tilføjer en bid [(filnavn, data)] til bundlet (samme kald som backendenes
+        gem_opskrifter; mappe er bundlets egen). Returnerer shardens sti pr. opskrift.
+        """
+        os.makedirs(self.mappe, exist_ok=True)
+        linjer = []
+        for filnavn, data in poster:
+            ingredienser = [list(ing[:3]) for ing in katalog.parse_ingredienser(data)]
+            linjer.append(json.dumps({"fil": filnavn, "data": data, "ingredienser": ingredienser},
+                                     ensure_ascii=False, default=str) + "\n")
+        sti = self._shard()
+        blok = "".join(linjer).encode("utf-8")
+        with open(sti, "ab") as f:
+            f.write(blok)
+            f.flush()
+            os.fsync(f.fileno())
+        self._størrelse += len(blok)
+        return [sti] * len(poster)
+
+    def læs(self):
+        """Streamer (filnavn, post) med katalogets postformat, én linje ad gangen."""
+        self._læst = {}
+        return self.læs_nye()
+
+    def læs_nye(self):
+        """
+        Som læs(), men kun de linjer der er tilføjet siden sidste læs()/læs_nye():
+        hver shard læses fra den byte-position den nåede til. En halv sidste linje
+        læses først, når den er skrevet færdig.
+        """
+        for sti in self.shards():
+            position = self._læst.get(sti, 0)
+            with open(sti, "rb") as f:
+                if f.seek(0, os.SEEK_END) < position:
+                    position = 0  # shard'en er skrevet forfra: læs den igen
+                f.seek(position)
+                for linje in f:
+                    if not linje.endswith(b"\n"):
+                        break  # halvt skrevet sidste linje (eller efter et nedbrud)
+                    position += len(linje)
+                    self._læst[sti] = position
+                    try:
+                        række = json.loads(linje)
+                    except ValueError:
+                        continue
+                    fil = række["fil"]
+                    ingredienser = tuple((navn, mængde, enhed, enheder.behov(navn, mængde, enhed))
+                                         for navn, mængde, enhed in række.get("ingredienser") or ())
+                    yield fil, (0, 0, katalog.opskrift_navn(fil), række.get("data"), ingredienser)
+
+
+_aktiv = None
+_aktiv_lås = threading.Lock()
+
+
+def aktiv():
+    """
+    Den valgte backend (se BACKEND). Oprettes første gang den bruges, under en
+    lås: GUI'ens baggrundstråd og login kan spørge samtidig, og to instanser
+    ville have hver sin journal-kø og timer.
+    """
+    global _aktiv
+    backend = _aktiv
+    if backend is not None and backend.navn == BACKEND:
+        return backend
+    with _aktiv_lås:
+        if _aktiv is None or _aktiv.navn != BACKEND:
+            if BACKEND == "sqlite":
+                _aktiv = SqliteLagring()
+            elif BACKEND == "yaml":
+                _aktiv = YamlLagring()
+            else:
+                raise ValueError(f"Ukendt lagring: {BACKEND} (brug 'yaml' eller 'sqlite')")
+        return _aktiv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Food Saver lagring")
+    under = parser.add_subparsers(dest="kommando", required=True)
+    imp = under.add_parser("importer", help="Importér YAML-opskrifter og brugere til SQLite")
+    imp.add_argument("--opskrifter", default=OPSKRIFT_MAPPE, help="Mappe med .yml opskrifter")
+    imp.add_argument("--brugere", default=BRUGER_MAPPE, help="Mappe med brugerfiler")
+    imp.add_argument("--db", default=SQLITE_STI, help="Sti til SQLite-databasen")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    db = SqliteLagring(args.db)
+    opskrifter, brugere = db.importer(args.opskrifter, args.brugere)
+    db.luk()
+    tid = time.perf_counter() - start
+    print(f"{opskrifter} opskrifter og {brugere} brugere importeret til {args.db} ({tid:.1f} s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
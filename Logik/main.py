@@ -1,6 +1,7 @@
 # main.py
 
 import DB_Handler
+import enheder
 import user_Login as UL
 
 def start_app():
@@ -37,12 +38,12 @@ def start_app():
 
         if valg == "1":
             navn = input("Navn på ingrediens: ").strip().lower()
-            mængde = input(f"Mængde af {navn}: ").strip()
+            mængde = input(f"Mængde af {navn} (fx 2 eller 500 g): ").strip()
             try:
-                mængde = float(mængde)
+                mængde = enheder.læs_mængde(mængde)
                 DB_Handler.tilføj_ingredient(navn, mængde, bruger_data)  
-            except ValueError:
-                print("Ugyldig mængde.\n")
+            except ValueError as e:
+                print(f"{e}\n")
 
         elif valg == "2":
             navn = input("Navn på ingrediens du vil slette: ").strip().lower()
@@ -54,11 +55,17 @@ def start_app():
 
         elif valg == "4":
             antal = input("Hvor mange personer skal opskriften være til? ").strip()
+            sorteringer = list(DB_Handler.SORTERINGER)
+            print("Sortér efter:")
+            for i, sortering in enumerate(sorteringer, 1):
+                print(f"{i}. {DB_Handler.SORTERINGER[sortering]}")
+            sort_valg = input("Vælg (Enter = 1): ").strip() or "1"
             try:
                 antal = int(antal)
-                DB_Handler.find_opskrifter(antal_personer=antal)
-            except ValueError:
-                print("Ugyldigt antal.\n")
+                sortering = sorteringer[int(sort_valg) - 1]
+                DB_Handler.find_opskrifter(antal_personer=antal, sortering=sortering)
+            except (ValueError, IndexError):
+                print("Ugyldigt antal eller sortering.\n")
 
         elif valg == "5":
             DB_Handler.tilføj_opskrift_yml()
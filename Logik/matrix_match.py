@@ -0,0 +1,116 @@
+# matrix_match.py
+"""
+Vektoriseret matchning med NumPy.
+
+Kataloget lægges ud som en sparse opskrift x ingrediens-matrix (COO-arrays
+sorteret efter ingrediens, dvs. CSC-agtigt), hvor hver ikke-nul celle har
+behovet pr. person i alle dimensioner (NaN hvor det ikke kan omregnes).
+
+En forespørgsel skalerer med antal personer, trækker lagerets mængder fra,
+klipper ved nul og summerer pr. opskrift med np.bincount. Kun lagerets
+kolonner bliver rørt, så prisen følger antallet af ikke-nul celler for de
+ingredienser man har - uden en Python-løkke over opskrifterne.
+
+NumPy er valgfri: er den ikke installeret, er TILGÆNGELIG False og DB_Handler
+bruger det rene Python-index.
+"""
+try:
+    import numpy as np
+except ImportError:  # NumPy er en valgfri afhængighed
+    np = None
+
+TILGÆNGELIG = np is not None
+
+
+class OpskriftMatrix:
+    """Sparse opskrift x ingrediens-matrix bygget ud fra DB_Handler.opskrift_krav."""
+
+    def __init__(self, opskrift_krav):
+        if np is None:
+            raise RuntimeError("NumPy er ikke installeret")
+        self.navne = list(opskrift_krav)
+        kolonner = {}
+        dimensioner = {None: 0}
+        rækker, kols = [], []
+        værdi_celle, værdi_dim, værdier = [], [], []
+        for række, krav in enumerate(opskrift_krav.values()):
+            for ing, behov in krav.items():
+                if behov:
+                    celle = len(rækker)
+                    for dim, værdi in behov.items():
+                        værdi_celle.append(celle)
+                        værdi_dim.append(dimensioner.setdefault(dim, len(dimensioner)))
+                        værdier.append(værdi)
+                rækker.append(række)
+                kols.append(kolonner.setdefault(ing, len(kolonner)))
+
+        self.kolonner = kolonner
+        self.dimensioner = dimensioner
+        behov = np.full((len(rækker), len(dimensioner)), np.nan)
+        behov[værdi_celle, værdi_dim] = værdier
+
+        # Sortér cellerne efter kolonne, så kolonne k ligger i [kol_start[k], kol_start[k+1])
+        kols = np.asarray(kols, dtype=np.int32)
+        orden = np.argsort(kols, kind="stable")
+        self.rækker = np.asarray(rækker, dtype=np.int32)[orden]
+        self.behov = behov[orden]
+        self.kol_start = np.searchsorted(kols[orden], np.arange(len(kolonner) + 1)).astype(np.int64)
+
+        n = len(self.navne)
+        self.antal_ingredienser = np.bincount(self.rækker, minlength=n)
+        # Samlet behov i opskriftens egen dimension (ukendte mængder tæller 0)
+        self.total_behov = np.bincount(self.rækker, weights=np.nan_to_num(self.behov[:, 0]), minlength=n)
+
+    def beregn(self, lager_forberedt, antal_personer=1):
+        """
+        lager_forberedt er {ingrediens: (værdi, dimension)} fra DB_Handler.forbered_lager.
+        Returnerer (dækket, mangler_antal, mangler_total, klar) som arrays pr. opskrift.
+        """
+        n = len(self.navne)
+        intervaller, har, dims = [], [], []
+        for ing, (værdi, dim) in lager_forberedt.items():
+            kol = self.kolonner.get(ing)
+            if kol is None:
+                continue
+            a, b = self.kol_start[kol], self.kol_start[kol + 1]
+            intervaller.append(np.arange(a, b))
+            har.append(np.full(b - a, værdi))
+            dims.append(np.full(b - a, self.dimensioner.get(dim, -1), dtype=np.int64))
+
+        if not intervaller:
+            nul = np.zeros(n)
+            return nul, self.antal_ingredienser.astype(float), self.total_behov * antal_personer, nul.astype(bool)
+
+        celler = np.concatenate(intervaller)
+        har = np.concatenate(har)
+        dims = np.concatenate(dims)
+        rækker = self.rækker[celler]
+
+        # Behov i lagerets dimension; -1 (dimension ingen opskrift bruger) giver NaN
+        behov = np.where(dims >= 0, self.behov[celler, np.maximum(dims, 0)], np.nan) * antal_personer
+        egen = self.behov[celler, 0] * antal_personer
+        ukendt = np.isnan(egen)  # opskriftens mængde er ukendt: det er nok at have ingrediensen
+        # Kan lagerets mængde ikke omregnes til opskriftens, mangler hele mængden
+        uforenelig = np.isnan(behov) & ~ukendt
+        underskud = np.where(uforenelig, egen, np.clip(np.nan_to_num(behov) - har, 0.0, None))
+        underskud = np.where(ukendt, 0.0, underskud)
+        dækket_celle = ukendt | (~uforenelig & (underskud == 0.0))
+
+        dækket = np.bincount(rækker, weights=dækket_celle, minlength=n)
+        mangler_antal = self.antal_ingredienser - dækket
+        # Manglende mængde: alt hvad lageret ikke har + underskuddet på det det har
+        har_egen = np.bincount(rækker, weights=np.nan_to_num(self.behov[celler, 0]), minlength=n)
+        mangler_total = (self.total_behov - har_egen) * antal_personer + np.bincount(rækker, weights=underskud, minlength=n)
+        klar = (mangler_antal == 0) & (self.antal_ingredienser > 0)
+        return dækket, mangler_antal, mangler_total, klar
+
+    def statistik(self, lager_forberedt, antal_personer=1):
+        """
+        Som DB_Handler's Python-løkke: {opskriftsnavn: (dækkede, manglende, manglende mængde)}
+        for opskrifter hvor mindst én ingrediens er dækket.
+        """
+        dækket, mangler_antal, mangler_total, _ = self.beregn(lager_forberedt, antal_personer)
+        rækker = np.flatnonzero(dækket)
+        return {self.navne[r]: (d, m, t) for r, d, m, t in zip(
+            rækker.tolist(), dækket[rækker].astype(int).tolist(),
+            mangler_antal[rækker].astype(int).tolist(), mangler_total[rækker].tolist())}
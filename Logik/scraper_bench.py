@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mikrobenchmark for sideudtræk i WebScraber (sider/sek).
+
+Sammenligner den gamle vej (fuldt BeautifulSoup-DOM til links + JSON-LD) med
+den hurtige WebScraber.extract_page på gemte fixture-sider, og tjekker at de
+to giver de samme links og opskrifter.
+
+Gem fixture-sider (URL'erne huskes i index.json i mappen):
+    python scraper_bench.py --save fixtures https://www.valdemarsro.dk/... ...
+Kør benchmark:
+    python scraper_bench.py fixtures --runs 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from bs4 import BeautifulSoup
+
+import WebScraber as ws
+
+INDEX = "index.json"
+
+
+def save_fixtures(out_dir: Path, urls: List[str]) -> int:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index_path = out_dir / INDEX
+    index: Dict[str, str] = json.loads(index_path.read_text(encoding="utf-8")) if index_path.exists() else {}
+    for url in urls:
+        html = ws.fetch(url)
+        if not html:
+            continue
+        name = f"{ws.slugify(url.split('://', 1)[-1])}.html"
+        (out_dir / name).write_text(html, encoding="utf-8")
+        index[name] = url
+        sys.stderr.write(f"  -> gemt: {out_dir / name}\n")
+    index_path.write_text(json.dumps(index, indent=2, ensure_ascii=False), encoding="utf-8")
+    return len(index)
+
+
+def load_fixtures(fixture_dir: Path, base_url: str) -> List[Tuple[str, str]]:
+    index_path = fixture_dir / INDEX
+    index: Dict[str, str] = json.loads(index_path.read_text(encoding="utf-8")) if index_path.exists() else {}
+    return [(index.get(p.name, base_url), p.read_text(encoding="utf-8"))
+            for p in sorted(fixture_dir.glob("*.html"))]
+
+
+def soup_path(url: str, html: str):
+    # Den gamle vej: ét fuldt DOM pr. side
+    soup = BeautifulSoup(html, "html.parser")
+    return ws.collect_recipe_links(url, html, soup=soup), ws.scrape_one(url, soup=soup)
+
+
+def fast_path(url: str, html: str):
+    blocks, hrefs, title = ws.extract_page(html)
+    return ws.recipe_links(url, hrefs), ws.recipe_from_blocks(url, blocks, title)
+
+
+def bench(fn: Callable, pages: List[Tuple[str, str]], runs: int) -> float:
+    """Bedste af `runs` gennemløb, i sider pr. sekund."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        for url, html in pages:
+            fn(url, html)
+        best = min(best, time.perf_counter() - start)
+    return len(pages) / best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark af JSON-LD/link-udtræk på gemte sider")
+    parser.add_argument("fixtures", help="Mappe med gemte .html sider")
+    parser.add_argument("urls", nargs="*", help="URLer der skal gemmes (kun med --save)")
+    parser.add_argument("--save", action="store_true", help="Hent URLerne og gem dem som fixtures")
+    parser.add_argument("--runs", type=int, default=5, help="Antal gennemløb; det bedste tæller")
+    parser.add_argument("--base-url", default="https://www.valdemarsro.dk/",
+                        help="URL for sider der ikke står i index.json")
+    args = parser.parse_args(argv)
+
+    fixture_dir = Path(args.fixtures)
+    if args.save:
+        n = save_fixtures(fixture_dir, args.urls)
+        sys.stderr.write(f"{n} fixture-sider i {fixture_dir}\n")
+        return 0
+
+    pages = load_fixtures(fixture_dir, args.base_url)
+    if not pages:
+        sys.stderr.write(f"Ingen .html sider i {fixture_dir}\n")
+        return 1
+
+    forskellige = [url for url, html in pages if soup_path(url, html) != fast_path(url, html)]
+    for url in forskellige:
+        sys.stderr.write(f"[advarsel] Forskelligt resultat for {url}\n")
+
+    size = sum(len(html) for _, html in pages) / len(pages) / 1024
+    soup_rate = bench(soup_path, pages, args.runs)
+    fast_rate = bench(fast_path, pages, args.runs)
+    print(f"{len(pages)} sider, gns. {size:.0f} KiB")
+    print(f"BeautifulSoup DOM : {soup_rate:8.1f} sider/sek")
+    print(f"extract_page      : {fast_rate:8.1f} sider/sek  ({fast_rate / soup_rate:.1f}x)")
+    return 1 if forskellige else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
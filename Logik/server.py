@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Food Saver som HTTP/JSON-tjeneste for mange brugere i én proces (kun asyncio fra
+standardbiblioteket).
+
+Kataloget og indexene i DB_Handler indlæses én gang og deles af alle. Hver bruger
+har sit eget lager i sin session, som gives med til søgningen (lager_=...), så
+DB_Handler.lager aldrig bruges. Søgning og lagring kører i trådpuljen, så
+event-loopet kun parser og svarer.
+
+    POST   /brugere             {"brugernavn", "password"}   opret konto
+    POST   /login               {"brugernavn", "password"}   -> {"token"}
+    POST   /logout
+    GET    /lager                                            -> {"lager": {ingrediens: mængde}}
+    POST   /lager               {"ingrediens", "mængde"}     læg til det der er
+    PUT    /lager/<ingrediens>  {"mængde"}                   sæt mængden
+    DELETE /lager/<ingrediens>
+    GET    /opskrifter?personer=2&antal=10&sortering=mangler&cursor=...
+                                 -> {"opskrifter": [{"navn", "mangler"}], "cursor"}
+    GET    /status                                           -> {"opskrifter", "brugere", "sessioner"}
+
+Alt undtagen /brugere, /login og /status kræver "Authorization: Bearer <token>".
+En session udløber efter --session-ttl sekunder uden brug.
+mangler er {ingrediens: [mængde, enhed] eller null} som i DB_Handler.søg_opskrifter,
+og cursor gives med igen for at få næste side (null når der ikke er flere).
+
+Eksempel (fra Logik-mappen):
+    python server.py --port 8080
+    python server.py --port 8080 --bruger-mappe /tmp/bench_brugere   # til api_bench.py
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import re
+import secrets
+import sys
+import time
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Dict, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import DB_Handler as DB
+import enheder
+import lagring
+import user_Login as UL
+
+MAKS_HOVED = 16 * 1024
+MAKS_KROP = 64 * 1024
+MAKS_ANTAL = 100
+SESSION_TTL = 3600.0
+
+
+class HttpFejl(Exception):
+    """Afbryder en anmodning med en HTTP-status og en fejltekst til klienten"""
+
+    def __init__(self, status: int, besked: str):
+        super().__init__(besked)
+        self.status = status
+
+
+@dataclass
+class Anmodning:
+    metode: str
+    sti: str
+    query: Dict[str, list]
+    headers: Dict[str, str]
+    krop: bytes
+    parametre: tuple = ()
+    bruger: Optional[dict] = None
+    token: Optional[str] = None
+    _json: Optional[dict] = field(default=None, repr=False)
+
+    def json(self) -> dict:
+        if self._json is None:
+            try:
+                self._json = json.loads(self.krop or b"{}")
+            except ValueError:
+                raise HttpFejl(400, "Kroppen er ikke gyldig JSON")
+            if not isinstance(self._json, dict):
+                raise HttpFejl(400, "Kroppen skal være et JSON-objekt")
+        return self._json
+
+    def felt(self, navn: str):
+        værdi = self.json().get(navn)
+        if værdi is None or værdi == "":
+            raise HttpFejl(400, f"Mangler feltet '{navn}'")
+        return værdi
+
+    def tal(self, navn: str, standard: int, mindst: int = 1, højst: Optional[int] = None) -> int:
+        try:
+            værdi = int(self.query.get(navn, [standard])[0])
+        except ValueError:
+            raise HttpFejl(400, f"'{navn}' skal være et heltal")
+        if værdi < mindst or (højst is not None and værdi > højst):
+            raise HttpFejl(400, f"'{navn}' skal være mellem {mindst} og {højst}" if højst
+                           else f"'{navn}' skal være mindst {mindst}")
+        return værdi
+
+
+def pak_cursor(cursor) -> Optional[str]:
+    """DB_Handler-cursoren som en uigennemsigtig tekst til klienten"""
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(cursor, ensure_ascii=False).encode()).decode()
+
+
+def pak_cursor_ud(tekst: str):
+    try:
+        sortering, personer, nøgle = json.loads(base64.urlsafe_b64decode(tekst.encode()))
+    except (ValueError, TypeError):
+        raise HttpFejl(400, "Ugyldig cursor")
+    # Nøglen er (score, score, navn) som i DB_Handler._SCORE; andet ville give TypeError i søgningen
+    if not (isinstance(sortering, str) and type(personer) is int and isinstance(nøgle, list)
+            and len(nøgle) == 3 and isinstance(nøgle[2], str)
+            and all(type(v) in (int, float) for v in nøgle[:2])):
+        raise HttpFejl(400, "Ugyldig cursor")
+    return sortering, personer, tuple(nøgle)
+
+
+def mængde(værdi):
+    """Lagermængden fra klienten, tjekket med enheder.lager_mængde"""
+    if isinstance(værdi, bool) or not isinstance(værdi, (int, float, str)):
+        raise HttpFejl(400, "'mængde' skal være et tal eller en tekst som \"500 g\"")
+    try:
+        enheder.lager_mængde(værdi)
+    except ValueError as e:
+        raise HttpFejl(400, str(e))
+    return værdi
+
+
+class Tjeneste:
+    """
+    Ruterne og den delte tilstand: sessioner (token -> [brugernavn, udløbstid]) og
+    de indloggede brugeres data (brugernavn -> bruger_data), så to sessioner for
+    samme bruger deler ét lager. Lageret gemmes post for post med
+    lagring.gem_lager_post, og som et fuldt snapshot når brugerens sidste session slutter.
+    """
+
+    def __init__(self, db=None, opdater: float = 10.0, session_ttl: float = SESSION_TTL):
+        self.db = db or lagring.aktiv()
+        self.opdater = opdater
+        self.session_ttl = session_ttl
+        self.sessioner: Dict[str, list] = {}
+        self.brugere: Dict[str, dict] = {}
+        self.ruter = [
+            ("POST", r"/brugere", self.opret, False),
+            ("POST", r"/login", self.login, False),
+            ("POST", r"/logout", self.logout, True),
+            ("GET", r"/lager", self.vis_lager, True),
+            ("POST", r"/lager", self.tilføj, True),
+            ("PUT", r"/lager/([^/]+)", self.sæt, True),
+            ("DELETE", r"/lager/([^/]+)", self.slet, True),
+            ("GET", r"/opskrifter", self.søg, True),
+            ("GET", r"/status", self.status, False),
+        ]
+        self.ruter = [(metode, re.compile(mønster + r"/?"), handler, login)
+                      for metode, mønster, handler, login in self.ruter]
+
+    # ---------- brugere ----------
+    async def opret(self, a: Anmodning):
+        navn, pwd = str(a.felt("brugernavn")).strip(), str(a.felt("password"))
+        if not re.fullmatch(r"[\w.-]+", navn):
+            raise HttpFejl(400, "Brugernavnet må kun indeholde bogstaver, tal, '.', '-' og '_'")
+        if await asyncio.to_thread(self.db.load_bruger, navn):
+            raise HttpFejl(409, "Brugernavn findes allerede")
+        data = {"brugernavn": navn, "password_hash": UL.hash_password(pwd), "lager": {}}
+        await asyncio.to_thread(self.db.gem_bruger, data)
+        return 201, {"brugernavn": navn}
+
+    async def login(self, a: Anmodning):
+        navn, pwd = str(a.felt("brugernavn")).strip(), str(a.felt("password"))
+        data = self.brugere.get(navn)
+        if data is None:
+            if not re.fullmatch(r"[\w.-]+", navn):
+                raise HttpFejl(401, "Forkert brugernavn eller password")
+            data = await asyncio.to_thread(self.db.load_bruger, navn)
+        if not data or data.get("password_hash") != UL.hash_password(pwd):
+            raise HttpFejl(401, "Forkert brugernavn eller password")
+        if navn not in self.brugere:
+            data["lager"] = {k.lower(): v for k, v in (data.get("lager") or {}).items()}
+            self.brugere[navn] = data
+        token = secrets.token_urlsafe(24)
+        self.sessioner[token] = [navn, time.monotonic() + self.session_ttl]
+        return 200, {"token": token}
+
+    async def logout(self, a: Anmodning):
+        await self._afslut(a.token)
+        return 200, {}
+
+    def _logget_ind(self, navn: str) -> bool:
+        return any(s[0] == navn for s in self.sessioner.values())
+
+    async def _afslut(self, token: str) -> None:
+        """Fjerner sessionen. Var det brugerens sidste, gemmes et fuldt snapshot og brugeren glemmes."""
+        session = self.sessioner.pop(token, None)
+        if session is None or self._logget_ind(session[0]):
+            return
+        navn = session[0]
+        data = self.brugere[navn]
+        await asyncio.to_thread(self.db.gem_bruger, {**data, "lager": dict(data["lager"])})
+        # Først glemt når snapshottet er skrevet: et login imens genbruger data
+        # i stedet for at læse et forældet lager fra disken
+        if not self._logget_ind(navn):
+            self.brugere.pop(navn, None)
+
+    # ---------- lager ----------
+    async def vis_lager(self, a: Anmodning):
+        return 200, {"lager": a.bruger["lager"]}
+
+    async def _gem(self, bruger: dict, navn: str):
+        await asyncio.to_thread(self.db.gem_lager_post, bruger, navn)
+
+    async def tilføj(self, a: Anmodning):
+        navn = str(a.felt("ingrediens")).strip().lower()
+        lager = a.bruger["lager"]
+        try:
+            lager[navn] = enheder.læg_sammen(lager.get(navn), mængde(a.felt("mængde")))
+        except ValueError as e:
+            raise HttpFejl(409, str(e))
+        await self._gem(a.bruger, navn)
+        return 200, {"ingrediens": navn, "mængde": lager[navn]}
+
+    async def sæt(self, a: Anmodning):
+        navn = a.parametre[0].strip().lower()
+        a.bruger["lager"][navn] = mængde(a.felt("mængde"))
+        await self._gem(a.bruger, navn)
+        return 200, {"ingrediens": navn, "mængde": a.bruger["lager"][navn]}
+
+    async def slet(self, a: Anmodning):
+        navn = a.parametre[0].strip().lower()
+        if a.bruger["lager"].pop(navn, None) is None:
+            raise HttpFejl(404, f"{navn} findes ikke i lageret")
+        await self._gem(a.bruger, navn)
+        return 200, {}
+
+    # ---------- opskrifter ----------
+    async def søg(self, a: Anmodning):
+        personer = a.tal("personer", 1)
+        antal = a.tal("antal", 10, højst=MAKS_ANTAL)
+        sortering = a.query.get("sortering", ["mangler"])[0]
+        if sortering not in DB.SORTERINGER:
+            raise HttpFejl(400, f"Ukendt sortering: {sortering} (brug {', '.join(DB.SORTERINGER)})")
+        cursor = a.query.get("cursor", [None])[0]
+        cursor = pak_cursor_ud(cursor) if cursor else None
+        # Kopi af lageret: tråden må ikke se det ændre sig under søgningen
+        lager = dict(a.bruger["lager"])
+        try:
+            side, næste = await asyncio.to_thread(DB.søg_opskrifter, personer, antal, sortering,
+                                                  cursor, lager_=lager)
+        except ValueError as e:
+            raise HttpFejl(400, str(e))
+        return 200, {"opskrifter": [{"navn": navn, "mangler": mangler} for navn, mangler in side],
+                     "cursor": pak_cursor(næste)}
+
+    async def status(self, a: Anmodning):
+        return 200, {"opskrifter": len(DB.opskrift_krav), "brugere": len(self.brugere),
+                     "sessioner": len(self.sessioner)}
+
+    # ---------- HTTP ----------
+    async def håndter(self, metode: str, mål: str, headers: Dict[str, str], krop: bytes):
+        """(status, JSON-svar) for én anmodning"""
+        dele = urlsplit(mål)
+        sti = unquote(dele.path)
+        a = Anmodning(metode, sti, parse_qs(dele.query), headers, krop)
+        try:
+            tilladt = False
+            for r_metode, mønster, handler, kræver_login in self.ruter:
+                træf = mønster.fullmatch(sti)
+                if not træf:
+                    continue
+                tilladt = True
+                if r_metode != metode:
+                    continue
+                if kræver_login:
+                    auth = headers.get("authorization", "")
+                    a.token = auth[7:].strip() if auth[:7].lower() == "bearer " else None
+                    session = self.sessioner.get(a.token)
+                    nu = time.monotonic()
+                    if session is None or session[1] < nu:
+                        if session is not None:
+                            await self._afslut(a.token)
+                        raise HttpFejl(401, "Log ind først")
+                    session[1] = nu + self.session_ttl
+                    a.bruger = self.brugere[session[0]]
+                a.parametre = træf.groups()
+                return await handler(a)
+            if tilladt:
+                raise HttpFejl(405, f"{metode} understøttes ikke på {sti}")
+            raise HttpFejl(404, f"Ukendt sti: {sti}")
+        except HttpFejl as e:
+            return e.status, {"fejl": str(e)}
+        except Exception as e:
+            sys.stderr.write(f"[fejl] {metode} {sti}: {e!r}\n")
+            return 500, {"fejl": "Intern fejl"}
+
+    async def forbindelse(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Én klientforbindelse; HTTP/1.1 keep-alive, én anmodning ad gangen"""
+        try:
+            while True:
+                try:
+                    hoved = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    self._svar(writer, 431, {"fejl": "For store headers"}, False)
+                    return
+                linjer = hoved.decode("latin-1").split("\r\n")
+                try:
+                    metode, mål, version = linjer[0].split(" ", 2)
+                except ValueError:
+                    self._svar(writer, 400, {"fejl": "Ugyldig anmodning"}, False)
+                    return
+                headers = {}
+                for linje in linjer[1:]:
+                    if ":" in linje:
+                        k, v = linje.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                try:
+                    længde = int(headers.get("content-length") or 0)
+                except ValueError:
+                    længde = -1
+                if not 0 <= længde <= MAKS_KROP:
+                    self._svar(writer, 413 if længde > 0 else 400, {"fejl": "Ugyldig Content-Length"}, False)
+                    return
+                try:
+                    krop = await reader.readexactly(længde) if længde else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                status, svar = await self.håndter(metode.upper(), mål, headers, krop)
+                forbindelse = headers.get("connection", "").lower()
+                hold = forbindelse == "keep-alive" or (version.strip() == "HTTP/1.1" and forbindelse != "close")
+                self._svar(writer, status, svar, hold)
+                await writer.drain()
+                if not hold:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _svar(writer: asyncio.StreamWriter, status: int, svar: dict, hold: bool) -> None:
+        data = json.dumps(svar, ensure_ascii=False).encode("utf-8")
+        hoved = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                 f"Content-Type: application/json; charset=utf-8\r\n"
+                 f"Content-Length: {len(data)}\r\n"
+                 f"Connection: {'keep-alive' if hold else 'close'}\r\n\r\n")
+        writer.write(hoved.encode("latin-1") + data)
+
+    async def _opdater_katalog(self):
+        # Nye eller ændrede opskrifter på disken lægges ind som deltaer
+        while True:
+            await asyncio.sleep(self.opdater)
+            try:
+                await asyncio.to_thread(DB.opdater_opskrifter)
+            except Exception as e:
+                sys.stderr.write(f"[fejl] opdatering af kataloget: {e!r}\n")
+
+    async def _ryd_sessioner(self):
+        # Udløbne sessioner afsluttes, også dem der aldrig bliver brugt igen
+        while True:
+            await asyncio.sleep(min(60.0, self.session_ttl))
+            nu = time.monotonic()
+            for token in [t for t, (_, udløb) in self.sessioner.items() if udløb < nu]:
+                try:
+                    await self._afslut(token)
+                except Exception as e:
+                    sys.stderr.write(f"[fejl] afslutning af session: {e!r}\n")
+
+    async def kør(self, host: str, port: int) -> None:
+        start = time.perf_counter()
+        await asyncio.to_thread(DB.load_opskrifter)
+        sys.stderr.write(f"[server] {len(DB.opskrift_krav)} opskrifter indlæst "
+                         f"på {time.perf_counter() - start:.1f} s\n")
+        server = await asyncio.start_server(self.forbindelse, host, port, limit=MAKS_HOVED)
+        værts, port = server.sockets[0].getsockname()[:2]
+        sys.stderr.write(f"[server] lytter på http://{værts}:{port}\n")
+        sys.stderr.flush()
+        opgaver = [asyncio.create_task(self._ryd_sessioner())]
+        if self.opdater > 0:
+            opgaver.append(asyncio.create_task(self._opdater_katalog()))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for opgave in opgaver:
+                opgave.cancel()
+            self.db.flush()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Food Saver HTTP/JSON-tjeneste")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 vælger en ledig port")
+    parser.add_argument("--opdater", type=float, default=10.0,
+                        help="Sekunder mellem tjek for ændrede opskrifter (0 slår det fra)")
+    parser.add_argument("--session-ttl", type=float, default=SESSION_TTL,
+                        help="Sekunder uden brug før en session udløber")
+    parser.add_argument("--bruger-mappe", help="Gem brugere her i stedet for i DB/users (kun yaml-lagring)")
+    args = parser.parse_args(argv)
+
+    db = lagring.YamlLagring(args.bruger_mappe) if args.bruger_mappe else None
+    try:
+        asyncio.run(Tjeneste(db, args.opdater, args.session_ttl).kør(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
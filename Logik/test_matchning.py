@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Enheder, matchning og søgning på et lille syntetisk katalog.
+
+Kør fra Logik-mappen:
+    python -m pytest -q
+"""
+import random
+
+import pytest
+
+import DB_Handler as DB
+import enheder
+import matrix_match
+import server
+
+INGREDIENSER = ["mælk", "hvedemel", "sukker", "smør", "æg", "løg", "salt", "tomater"]
+MÆNGDER = [(2, "dl"), (500, "g"), (1, "l"), (3, None), (1, "tsk"), (None, None), (1, "dåse")]
+LAGER = [1, 4, 500, "2 dl", "1 l", "250 g", "2 stk", "1 kg", "3 spsk", "1 dåse"]
+
+
+def post(navn, ingredienser, tid=None):
+    """Et katalogpost som katalog.load_katalog giver dem"""
+    ingredienser = [(ing, m, e, enheder.behov(ing, m, e)) for ing, m, e in ingredienser]
+    return 0, 0, navn, {"titel": navn, "tid": tid}, ingredienser
+
+
+@pytest.fixture(scope="module")
+def katalog():
+    rnd = random.Random(7)
+    poster = []
+    for i in range(300):
+        ings = [(ing, *rnd.choice(MÆNGDER)) for ing in rnd.sample(INGREDIENSER, rnd.randint(1, 5))]
+        if i % 10 == 0:
+            ings.append((ings[0][0], *rnd.choice(MÆNGDER)))  # samme ingrediens to gange
+        poster.append(post(f"ret {i:03d}", ings, tid=rnd.choice([None, 10, 25, 60])))
+    DB.byg_index(poster)
+    return poster
+
+
+def tilfældige_lagre(n, seed=1):
+    rnd = random.Random(seed)
+    for _ in range(n):
+        yield {ing: rnd.choice(LAGER) for ing in rnd.sample(INGREDIENSER, rnd.randint(1, len(INGREDIENSER)))}
+
+
+def test_læs_mængde():
+    assert enheder.læs_mængde("500") == 500.0
+    assert enheder.lager_mængde(enheder.læs_mængde("1,5")) == (1.5, None)
+    assert enheder.lager_mængde(enheder.læs_mængde("2 dl")) == (200.0, "ml")
+    assert enheder.læs_mængde(" 500 g ") == "500 g"
+    for ugyldig in ("", "abc", "2 æbler"):
+        with pytest.raises(ValueError):
+            enheder.læs_mængde(ugyldig)
+
+
+def test_læg_sammen():
+    assert enheder.læg_sammen(None, "1 l") == "1 l"
+    assert enheder.læg_sammen("500 g", "1 kg") == "1500 g"
+    assert enheder.læg_sammen("2 dl", "1 l") == "1200 ml"
+    assert enheder.læg_sammen(2, 3) == 5.0
+    for gammel, ny in (("2 stk", "500 g"), (2, "500 g"), ("500 g", 2)):
+        with pytest.raises(ValueError):
+            enheder.læg_sammen(gammel, ny)
+
+
+def test_læg_behov_sammen():
+    mælk_dl = enheder.behov("mælk", 2, "dl")
+    mælk_stk = enheder.behov("mælk", 1, "stk")
+    assert enheder.læg_behov_sammen(mælk_dl, mælk_dl)["ml"] == 400
+    # Kan ikke omregnes: ingen fælles dimension, men begge mængder er med i totalen
+    assert enheder.læg_behov_sammen(mælk_dl, mælk_stk) == {None: 201.0}
+    assert enheder.læg_behov_sammen(None, mælk_stk) == mælk_stk
+    assert enheder.læg_behov_sammen(mælk_stk, None) == mælk_stk
+    mel = enheder.læg_behov_sammen(enheder.behov("hvedemel", 200, "g"), enheder.behov("hvedemel", 1, "dl"))
+    assert mel[None] == mel["g"] == pytest.approx(255.0)
+
+
+@pytest.mark.skipif(not matrix_match.TILGÆNGELIG, reason="numpy er ikke installeret")
+@pytest.mark.parametrize("personer", [1, 3])
+def test_numpy_statistik_er_som_python(katalog, personer):
+    for lager in tilfældige_lagre(40):
+        lager_ = DB.forbered_lager(lager)
+        python = DB._statistik(lager_, personer, backend="python")
+        numpy = DB._statistik(lager_, personer, backend="numpy")
+        assert python.keys() == numpy.keys()
+        for navn, (dækket, mangler, mængde) in python.items():
+            assert numpy[navn][:2] == (dækket, mangler), (lager, navn)
+            assert numpy[navn][2] == pytest.approx(mængde), (lager, navn)
+
+
+@pytest.mark.parametrize("sortering", list(DB.SORTERINGER))
+def test_cursor_giver_hele_resultatet_side_for_side(katalog, sortering):
+    lager = next(tilfældige_lagre(1, seed=3))
+    alle, cursor = DB.søg_opskrifter(2, 10_000, sortering, lager_=lager)
+    assert cursor is None and alle
+
+    sider, cursor = [], None
+    while True:
+        # Gennem serverens uigennemsigtige cursor, som en klient ville gøre
+        side, cursor = DB.søg_opskrifter(2, 7, sortering, server.pak_cursor_ud(cursor) if cursor else None,
+                                         lager_=lager)
+        sider.extend(side)
+        cursor = server.pak_cursor(cursor)
+        if cursor is None:
+            break
+    assert sider == alle
+    assert [s for bid, _ in DB.søg_trinvis(2, sortering, bid=25, lager_=lager) for s in bid] == alle
+
+
+def test_cursor_fra_en_anden_søgning_afvises(katalog):
+    lager = next(tilfældige_lagre(1, seed=3))
+    _, cursor = DB.søg_opskrifter(2, 5, "mangler", lager_=lager)
+    assert cursor is not None
+    with pytest.raises(ValueError):
+        DB.søg_opskrifter(2, 5, "tid", cursor, lager_=lager)
+    with pytest.raises(ValueError):
+        DB.søg_opskrifter(2, 0, "mangler", lager_=lager)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Crawleren mod crawl_bench.StandInServer: filer, dubletter og 304.
+
+Kør fra Logik-mappen:
+    python -m pytest -q
+"""
+import os
+
+import pytest
+import yaml
+
+import WebScraber as ws
+from crawl_bench import StandInServer
+
+PAGES = 6
+
+
+@pytest.fixture(scope="module")
+def server():
+    s = StandInServer(pages=PAGES).start()
+    yield s
+    s.stop()
+
+
+def crawl(server, out_dir, validators=None, **kwargs):
+    state = ws.CrawlState()
+    try:
+        return ws.crawl([server.base_url + "/opskrifter/"], max_depth=2, sleep=0, schema="rich",
+                        per_person=False, overwrite=False, out_dir=str(out_dir),
+                        validators=validators, state=state, **kwargs)
+    finally:
+        state.close()
+
+
+def yml_files(out_dir):
+    return sorted(f for f in os.listdir(out_dir) if f.endswith(".yml"))
+
+
+def test_crawl_writes_one_file_per_recipe(server, tmp_path):
+    assert crawl(server, tmp_path) == PAGES
+    files = yml_files(tmp_path)
+    assert files == sorted(f"ret-nummer-{i}.yml" for i in range(PAGES))
+    with open(tmp_path / "ret-nummer-3.yml", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+    assert data["titel"] == "Ret nummer 3"
+    assert data["metadata"]["kilde_url"] == server.base_url + "/opskrifter/ret-3/"
+
+
+@pytest.mark.parametrize("kwargs", [{"concurrency": 4}, {"concurrency": 2, "parse_workers": 2}])
+def test_pipeline_writes_the_same_files(server, tmp_path, kwargs):
+    crawl(server, tmp_path / "seq")
+    assert crawl(server, tmp_path / "par", **kwargs) == PAGES
+    assert yml_files(tmp_path / "par") == yml_files(tmp_path / "seq")
+
+
+def test_recrawl_updates_files_in_place(server, tmp_path):
+    crawl(server, tmp_path)
+    # Ny CrawlState: siderne genkendes på kilde-URL'en i de gemte filer, ikke på navn-2.yml
+    assert crawl(server, tmp_path) == PAGES
+    assert len(yml_files(tmp_path)) == PAGES
+
+
+def test_dedup_finds_same_content_from_another_url():
+    data = {"ingredienser": ["2 dl mælk", "1 æg"], "fremgangsmåde": ["Pisk det sammen."]}
+    index = ws.DedupIndex({"pandekager.yml": dict(data, metadata={"kilde_url": "https://a.dk/p/"})})
+    assert index.find("https://a.dk/p/?utm_source=nyhedsbrev", data) == ("pandekager.yml", True)
+    assert index.find("https://b.dk/andet/", data) == ("pandekager.yml", False)
+    # Uden titel skal opslaget hashe som add() gjorde
+    uden_titel = ws.DedupIndex({"x.yml": data})
+    assert uden_titel.find("https://c.dk/", dict(data)) == ("x.yml", False)
+    assert index.free_name("Pandekager") == "pandekager-2.yml"
+
+
+def test_not_modified_pages_are_skipped(server, tmp_path):
+    validators = ws.ValidatorStore(tmp_path / "validators.sqlite3")
+    try:
+        out = tmp_path / "out"
+        assert crawl(server, out, validators) == PAGES
+        assert validators.not_modified == 0
+
+        before = server.requests
+        assert crawl(server, out, validators) == 0
+        assert validators.not_modified == PAGES + 1  # oversigten og alle opskrifter
+        assert server.requests - before == PAGES + 1  # links genbrugt fra de gemte validatorer
+        assert len(yml_files(out)) == PAGES
+
+        # En anden out_dir har ingen validatorer: alt hentes og gemmes
+        validators.not_modified = 0
+        assert crawl(server, tmp_path / "andet", validators) == PAGES
+        assert validators.not_modified == 0
+
+        # Mangler en fil, hentes dens side igen uden validatorer
+        os.remove(out / "ret-nummer-2.yml")
+        assert crawl(server, out, validators) == 1
+        assert validators.refetched == 1
+        assert (out / "ret-nummer-2.yml").exists()
+    finally:
+        validators.close()
+
+
+def test_canonical_url():
+    assert ws.canonical_url("HTTPS://Www.Eks.dk:443/a/?utm_source=x&b=2&a=1#top") == "https://www.eks.dk/a/?a=1&b=2"
+    assert ws.canonical_url("http://eks.dk") == "http://eks.dk/"
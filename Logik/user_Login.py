@@ -1,14 +1,12 @@
 # user_Login.py
 
-import yaml
-import os
 import hashlib
-import msvcrt  # Kun på Windows til stjerner i terminalen
 
-DB_USERS = r"C:\Users\oller\OneDrive\Desktop\KOD - Food saver\DB\Users"
+import lagring
 
 def password_input(prompt="Password: "):
     """Indtast password med * som feedback i terminalen"""
+    import msvcrt  # Kun på Windows til stjerner i terminalen; importeres først her så server.py kan køre alle steder
     print(prompt, end="", flush=True)
     pwd = ""
     while True:
@@ -29,16 +27,10 @@ def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def gem_bruger(data):
-    filsti = os.path.join(DB_USERS, f"{data['brugernavn']}.yml")
-    with open(filsti, "w", encoding="utf-8") as f:
-        yaml.dump(data, f, allow_unicode=True)
+    lagring.aktiv().gem_bruger(data)
 
 def load_bruger(brugernavn):
-    filsti = os.path.join(DB_USERS, f"{brugernavn}.yml")
-    if os.path.exists(filsti):
-        with open(filsti, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f)
-    return None
+    return lagring.aktiv().load_bruger(brugernavn)
 
 def opret_bruger():
     print("=== Opret konto ===")